@@ -2,14 +2,14 @@ import os
 from flask import Flask
 
 
-def create_app():
+def create_app(warmup: bool | None = None):
     app = Flask(__name__)
     app.config.update(
         SECRET_KEY=os.environ.get("SECRET_KEY", "yolo-playground-secret-key"),
         UPLOAD_FOLDER="data/uploads",
         DATASET_FOLDER="data/datasets",
         RESULTS_FOLDER="static/results",
-        MAX_CONTENT_LENGTH=10 * 1024 * 1024,  # ← 10 MB hard limit
+        MAX_CONTENT_LENGTH=10 * 1024 * 1024,  # ← 10 MB per request; big zips go through chunked upload
     )
     for d in [
         app.config["UPLOAD_FOLDER"],
@@ -21,16 +21,35 @@ def create_app():
 
     from routes.upload import upload_bp
     from routes.train import train_bp
-    from routes.detect import detect_bp
+    from routes.detect import detect_bp, sock
+    from routes.video import video_bp
+    from routes.evaluate import eval_bp
 
     app.register_blueprint(upload_bp, url_prefix="/upload")
     app.register_blueprint(train_bp, url_prefix="/train")
     app.register_blueprint(detect_bp, url_prefix="/detect")
+    app.register_blueprint(video_bp, url_prefix="/detect/video")
+    app.register_blueprint(eval_bp, url_prefix="/detect/evaluate")
+    sock.init_app(app)
+
+    if warmup is None:
+        warmup = os.environ.get("YOLO_WARMUP", "0") == "1"
+    if warmup:
+        import threading
+        from routes.detect import warmup_models
+        threading.Thread(target=warmup_models, daemon=True).start()
 
     @app.errorhandler(413)
     def too_large(e):
         from flask import jsonify
-        return jsonify({"error": "File exceeds the 10 MB upload limit."}), 413
+        return jsonify({"error": "Request exceeds the 10 MB limit — use the chunked upload "
+                                 "(/upload/init) for larger files."}), 413
+
+    @app.route("/metrics")
+    def metrics():
+        from flask import Response
+        from utils.metrics import registry
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
 
     @app.route("/")
     def index():
@@ -41,5 +60,6 @@ def create_app():
 
 
 if __name__ == "__main__":
+    # Development server — production runs gunicorn (see gunicorn.conf.py)
     app = create_app()
     app.run(host="0.0.0.0", port=7860, debug=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1,61 @@
+# Inference benchmark CLI — e.g.
+#   python bench.py --sizes n s --imgsz 320 640 --batch 1 4 --backends pytorch onnx
+#   python bench.py --codec --imgsz 640
+import argparse, json, sys
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark YOLO inference on this host.")
+    ap.add_argument("--sizes",    nargs="+", default=["n"], choices=["n", "s", "m", "l", "x"])
+    ap.add_argument("--imgsz",    nargs="+", type=int, default=[640])
+    ap.add_argument("--batch",    nargs="+", type=int, default=[1])
+    ap.add_argument("--backends", nargs="+", default=["pytorch"],
+                    choices=["pytorch", "onnx", "openvino"])
+    ap.add_argument("--threads",  nargs="+", type=int, default=[0],
+                    help="torch intra-op threads; 0 = library default")
+    ap.add_argument("--model",    default=None, help="custom .pt instead of pretrained yolo11{size}.pt")
+    ap.add_argument("--images",   default=None, help="folder of images (default: synthetic)")
+    ap.add_argument("--iters",    type=int, default=30)
+    ap.add_argument("--warmup",   type=int, default=3)
+    ap.add_argument("--export",   action="store_true",
+                    help="export missing ONNX / OpenVINO artifacts before benchmarking")
+    ap.add_argument("--codec",    action="store_true",
+                    help="only run the webcam decode/encode micro-benchmark (PIL vs OpenCV)")
+    ap.add_argument("--out",      default=None, help="write JSON here instead of stdout")
+    args = ap.parse_args(argv)
+
+    if args.codec:
+        report = _codec(args)
+    else:
+        from routes.detect import DEVICE, bench_loader
+        from utils.benchmark import run_suite, load_images, synthetic_images
+
+        images = load_images(args.images) if args.images else synthetic_images()
+        report = run_suite(
+            bench_loader(args.model, export_missing=args.export),
+            sizes=args.sizes, imgsz=args.imgsz, batches=args.batch,
+            backends=args.backends, threads=[t or None for t in args.threads],
+            images=images, iters=args.iters, warmup=args.warmup, device=DEVICE,
+        )
+
+    out = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out)
+    else:
+        sys.stdout.write(out + "\n")
+
+
+def _codec(args) -> dict:
+    """Decode/encode round trip on the first JPEG in --images (or a synthetic 720p frame)."""
+    from pathlib import Path
+    from utils.benchmark import codec_bench
+    raw = None
+    if args.images:
+        jpegs = sorted(p for p in Path(args.images).rglob("*") if p.suffix.lower() in (".jpg", ".jpeg"))
+        raw   = jpegs[0].read_bytes() if jpegs else None
+    return codec_bench(raw, max_w=args.imgsz[0], iters=args.iters)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Production server config — gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Pre-fork gthread workers: each process serves requests from a thread pool
+# while idle keep-alive connections (between requests) wait in gunicorn's event
+# loop.  Inside a worker every forward pass goes through the micro-batcher's
+# single thread and its bounded queue, so ordinary request threads only hold
+# on for decode/encode and their own batch — a full queue answers 503 instead
+# of piling up.
+#
+# Limit: an open SSE progress stream or webcam WebSocket occupies one pool
+# thread for as long as it lasts — gthread cannot park it.  Both are capped
+# per worker (YOLO_SSE_MAX, YOLO_WS_MAX in utils/sse.py; extra clients poll
+# or fall back to POST), and the pool is sized above those caps so streams
+# can never take every thread away from ordinary requests.
+import os
+from utils.sse import SSE_MAX, WS_MAX
+
+bind             = f"0.0.0.0:{os.environ.get('PORT', 7860)}"
+workers          = int(os.environ.get("YOLO_WEB_WORKERS", 2))
+worker_class     = "gthread"
+# Threads for ordinary (short) requests, on top of the stream caps
+_request_threads = int(os.environ.get("YOLO_WEB_REQUEST_THREADS", 8))
+threads          = int(os.environ.get("YOLO_WEB_THREADS", 0)) or SSE_MAX + WS_MAX + _request_threads
+if threads < SSE_MAX + WS_MAX + 1:
+    raise ValueError(f"YOLO_WEB_THREADS={threads} leaves no thread for requests once "
+                     f"YOLO_SSE_MAX + YOLO_WS_MAX ({SSE_MAX + WS_MAX}) streams are open")
+# SSE / WebSocket connections are long-lived; gthread heartbeats from the
+# worker's main thread, so this only fires for a genuinely hung worker.
+timeout          = int(os.environ.get("YOLO_WEB_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive        = 5
+accesslog        = "-"
+# Import the app once in the master and load model weights there; workers
+# share those pages copy-on-write instead of each loading its own copy.
+preload_app      = os.environ.get("YOLO_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    if preload_app:
+        from routes.detect import preload_models
+        preload_models()
+
+
+def post_fork(server, worker):
+    # Split the cores between workers, and only run a forward pass (which
+    # starts torch's thread pools) after fork.
+    import torch
+    from utils.resources import usable_cpus
+    n = int(os.environ.get("YOLO_TORCH_THREADS", 0)) or max(1, usable_cpus() // workers)
+    torch.set_num_threads(n)
+    if os.environ.get("YOLO_WARMUP", "0") == "1":
+        import threading
+        from routes.detect import warmup_models
+        threading.Thread(target=warmup_models, daemon=True).start()
@@ -1,22 +1,42 @@
-import os, base64, io, traceback
+import os, base64, json, threading, time, traceback, zipfile
 import numpy as np
 import torch
-from flask import Blueprint, request, jsonify, render_template
-from PIL import Image
+from flask import (Blueprint, Response, request, jsonify, render_template, g, make_response,
+                   current_app, stream_with_context)
+from flask_sock import Sock
+from utils.adaptive import AdaptiveController, SIZES
+from utils.batching import InferenceBatcher, Overloaded
+from utils.bulk import MAX_BATCH, detect_images, dir_source, files_source, zip_source
+from utils.imgcodec import decode_image, encode_jpeg, thumbnail
+from utils.result_cache import ResultCache, cache_key, content_hash, etag
+from utils.sse import ws_slots
+from utils.tiling import TILE_OVERLAP, MERGE_THR, METRICS, sliced_predict
+from utils.metrics import registry, timed, StageTimer, NULL_TIMER
+from utils.model_manager import (ModelCache, MODEL_CACHE_MAX, resolve_backend,
+                                 exported_artifacts, export_model)
+from utils.tracking import SessionStore, TrackSession, TRACK_EVERY, TRACK_DIFF
+from utils.jobs import new_job_id
 
 detect_bp = Blueprint("detect", __name__)
+sock      = Sock()
 
 # ── Device ────────────────────────────────────────────────────────────────────
 DEVICE = 0 if torch.cuda.is_available() else "cpu"
 DEVICE_LABEL = f"GPU (cuda:{DEVICE})" if DEVICE != "cpu" else "CPU"
 
 # ── Model cache ───────────────────────────────────────────────────────────────
-_cache: dict = {"path": None, "model": None}
+PRETRAINED = "yolo11n.pt"   # pretrained COCO 80-class fallback
 
 
-def _load_model(model_path: str | None = None):
+def _yolo(path: str):
     from ultralytics import YOLO
+    return YOLO(str(path), task="detect")
 
+
+_models = ModelCache(_yolo)
+
+
+def _resolve_model(model_path: str | None = None, backend: str | None = None):
     # Only use a custom model when the caller explicitly supplies a valid path.
     # An empty / missing path ALWAYS falls back to the pretrained COCO weights so
     # that selecting "Pretrained YOLO11n" in the UI never silently loads a custom
@@ -25,21 +45,354 @@ def _load_model(model_path: str | None = None):
         target    = model_path
         is_custom = True
     else:
-        target    = "yolo11n.pt"   # pretrained COCO 80-class fallback
+        target    = PRETRAINED
         is_custom = False
 
-    # Reload if path changed or cache is empty
-    if _cache["path"] != target or _cache["model"] is None:
-        _cache["model"] = YOLO(str(target))
-        _cache["path"]  = target
+    # Prefer an exported ONNX / OpenVINO sibling of the .pt when present
+    target  = resolve_backend(target, backend)
+    runtime = _runtime_name(target)
 
     label = f"custom  [{DEVICE_LABEL}]" if is_custom else f"pretrained YOLO11n COCO  [{DEVICE_LABEL}]"
-    return _cache["model"], label
+    if runtime != "pytorch":
+        label += f"  ({runtime})"
+    return target, label
+
+
+def _runtime_name(target: str) -> str:
+    if target.endswith(".onnx"):
+        return "onnx"
+    if target.endswith("_openvino_model"):
+        return "openvino int8" if "_int8_" in target else "openvino"
+    return "pytorch"
+
+
+def _load_model(model_path: str | None = None, backend: str | None = None):
+    target, label = _resolve_model(model_path, backend)
+    return _models.get(target), label
+
+
+# ── Batched inference ─────────────────────────────────────────────────────────
+# Every forward pass runs on the batcher's worker thread, so concurrent
+# requests never call predict on the cached model at the same time.
+
+def _predict_batch(key, images):
+    target, conf = key                   # already resolved to one runtime — load it as is
+    timer = StageTimer("batch")
+    with timer.stage("model_load"):
+        model = _models.get(target)
+    with timer.stage("infer"):
+        results = model.predict(source=images, conf=conf, device=DEVICE, verbose=False)
+    registry.inc("yolo_batches_total", 1, "Batched predict calls")
+    registry.inc("yolo_batched_images_total", len(images), "Images run through batched predict")
+    return results
+
+
+_batcher = InferenceBatcher(_predict_batch)
+
+registry.gauge("yolo_inference_queue_depth", "Images waiting for the inference worker",
+               _batcher.qsize)
+registry.gauge("yolo_model_cache_hits_total", "Model cache hits",
+               lambda: _models.stats()["hits"], kind="counter")
+registry.gauge("yolo_model_cache_misses_total", "Model cache misses (model loads)",
+               lambda: _models.stats()["misses"], kind="counter")
+registry.gauge("yolo_model_cache_entries", "Models currently loaded",
+               lambda: len(_models.stats()["entries"]))
+
+
+# ── Adaptive capture ──────────────────────────────────────────────────────────
+# Webcam responses advertise the capture interval, input width and JPEG
+# quality the browser should use next, driven by frame latency + queue depth.
+
+_adaptive = AdaptiveController(_batcher.qsize)
+
+registry.gauge("yolo_adaptive_level", "Webcam capture quality level (0 = lowest)",
+               lambda: _adaptive.level)
+registry.gauge("yolo_adaptive_latency_ms", "EWMA of webcam frame service time",
+               lambda: round(_adaptive.ewma_ms or 0.0, 1))
+
+
+def _model_imgsz(target: str) -> int:
+    """
+    Input size the model was trained at (exported models without one → 640);
+    caps the advertised capture size.  Cached with the model's cache entry.
+    """
+    return _models.meta(target, "imgsz", _trained_imgsz)
+
+
+def _trained_imgsz(model) -> int:
+    imgsz = getattr(model, "overrides", {}).get("imgsz") or SIZES[-1]
+    return int(max(imgsz) if isinstance(imgsz, (list, tuple)) else imgsz)
+
+
+# ── Result cache ──────────────────────────────────────────────────────────────
+# Opt-in (`cache=1`) /detect/image responses keyed by image hash + model
+# version + options; GET /detect/image/<sha256> looks one up without upload.
+
+_results = ResultCache()
+
+registry.gauge("yolo_result_cache_hits_total", "Result cache hits",
+               lambda: _results.stats()["hits"], kind="counter")
+registry.gauge("yolo_result_cache_misses_total", "Result cache misses",
+               lambda: _results.stats()["misses"], kind="counter")
+registry.gauge("yolo_result_cache_bytes", "Serialized size of cached results",
+               lambda: _results.stats()["bytes"])
+
+
+def _result_key(digest: str, model_path, backend, conf: float, mode: str, thumb: int,
+                tiling: dict | None = None, imgsz: int | None = None):
+    """
+    Cache key for one /detect/image request → (key, model target).  Built
+    without loading the model, so hits and 304s never pay for a cold load:
+    /detect/image predicts at the model's own imgsz, which the weights'
+    path + mtime already pin down (0 = that default).
+    """
+    target  = _resolve_model(model_path, backend)[0]
+    variant = f"{'detections' if mode == 'detections' else 'full'}:{thumb}"
+    if tiling:
+        variant += ":" + ",".join(f"{k}={v}" for k, v in sorted(tiling.items()))
+    key = cache_key(digest, ModelCache.key(target), conf, imgsz or 0, variant)
+    return key, target
+
+
+def _cached_response(payload: dict, key: tuple, hit: bool):
+    """JSON with an ETag; `no-cache` makes browsers revalidate rather than trust it blindly."""
+    resp = jsonify(payload)
+    resp.set_etag(etag(key))
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.headers["X-Cache"]       = "HIT" if hit else "MISS"
+    return resp
+
+
+def _not_modified(key: tuple):
+    resp = make_response("", 304)
+    resp.set_etag(etag(key))
+    return resp
+
+
+def _predict(img: np.ndarray, model_path: str | None, conf: float,
+             backend: str | None = None):
+    """Run one image through the micro-batcher → (Results, model label)."""
+    target, src = _resolve_model(model_path, backend)
+    return _batcher.submit((target, conf), img), src
+
+
+# ── Tracking ──────────────────────────────────────────────────────────────────
+# Per-session trackers for /frame (keyed by the client's session id); the
+# WebSocket keeps one per connection.
+
+_sessions = SessionStore()
+registry.gauge("yolo_track_sessions", "Active /detect/frame tracking sessions",
+               lambda: len(_sessions))
+
+
+def _det_arrays(result):
+    """Results → (xyxy, conf, cls, names) numpy arrays for the tracker."""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return (np.zeros((0, 4), np.float32), np.zeros(0, np.float32),
+                np.zeros(0, np.int64), result.names)
+    return (boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(),
+            boxes.cls.cpu().numpy().astype(np.int64), result.names)
+
+
+def _track(session: TrackSession, arr: np.ndarray, model_path, conf, backend,
+           every: int, diff: float, route: str):
+    """One tracking step — the detector only runs when the session's gate says so."""
+    def detect(a):
+        return _det_arrays(_predict(a, model_path, conf, backend)[0])
+
+    dets, ran, motion = session.step(arr, detect, every, diff)
+    registry.inc("yolo_track_frames_total", 1, "Tracked frames, by whether the detector ran",
+                 route=route, detector="ran" if ran else "skipped")
+    return dets, {"detector_ran": ran, "motion": motion, "tracks": len(dets)}
+
+
+def _tiling_opts(args) -> dict | None:
+    """
+    Tiling fields of a form / query string → _predict_tiled kwargs, None
+    when off.  Raises ValueError (→ 400) for any malformed field.
+    """
+    try:
+        tile = int(args.get("tile", 0))
+        if tile <= 0:
+            return None
+        overlap = float(args.get("tile_overlap", TILE_OVERLAP))
+        batch   = int(args.get("tile_batch", _batcher.max_batch))
+        thr     = float(args.get("tile_merge", MERGE_THR))
+    except (TypeError, ValueError):
+        raise ValueError("tile, tile_batch, tile_overlap and tile_merge must be numbers") from None
+    metric = args.get("tile_metric", "ios")
+    if metric not in METRICS:
+        raise ValueError(f"tile_metric must be one of {', '.join(METRICS)}")
+    if not 0.0 < thr <= 1.0:
+        raise ValueError("tile_merge must be in (0, 1]")
+    batch = max(1, batch)
+    if _batcher.max_pending:
+        batch = min(batch, _batcher.max_pending)    # submit_many is all-or-nothing
+    return {
+        "tile":    max(64, tile),
+        "overlap": min(0.9, max(0.0, overlap)),
+        "batch":   batch,
+        "full":    args.get("tile_full", "1") in ("1", "true"),
+        "thr":     thr,
+        "metric":  metric,
+    }
+
+
+def _predict_tiled(img: np.ndarray, model_path, conf: float, backend, tile: int,
+                   overlap: float, batch: int, full: bool, thr: float, metric: str):
+    """
+    Sliced inference → (Results over the whole image, model label, tiling info).
+    Each chunk of `batch` tiles goes through the batcher together, i.e. one
+    forward pass when `batch` ≤ its max batch size.
+    """
+    from ultralytics.engine.results import Results
+    target, src = _resolve_model(model_path, backend)
+
+    def detect_batch(crops):
+        return [_det_arrays(r) for r in _batcher.submit_many((target, conf), crops)]
+
+    xyxy, confs, cls, names, info = sliced_predict(img, detect_batch, tile, overlap,
+                                                   batch, full, thr, metric)
+    data   = np.hstack([xyxy, confs[:, None], cls[:, None]]).astype(np.float32)
+    result = Results(img, path="", names=names, boxes=torch.from_numpy(data))
+    return result, src, info
+
+
+def _plot_tracks(bgr: np.ndarray, dets: list) -> np.ndarray:
+    """Draw tracked boxes (colour per track id) onto the BGR frame in place."""
+    from ultralytics.utils.plotting import Annotator, colors
+    ann = Annotator(bgr)
+    for d in dets:
+        ann.box_label(d["bbox"], f'{d["class"]} #{d["track_id"]} {d["conf"]:.2f}',
+                      color=colors(d["track_id"], True))
+    return ann.result()
+
+
+BULK_WAIT_S = float(os.environ.get("YOLO_BULK_WAIT_S", 120))   # longest wait for queue room
+
+
+def _predict_bulk(target: str, conf: float, images: list) -> list:
+    """
+    submit_many for /detect/batch and /detect/evaluate, waiting out a full
+    queue instead of failing — bulk work backs off so live requests keep
+    their place.  Gives up with Overloaded after BULK_WAIT_S without room,
+    or at once when `images` can never fit under the queue bound.
+    """
+    if _batcher.max_pending and len(images) > _batcher.max_pending:
+        raise Overloaded(f"{len(images)} images exceed the inference queue bound "
+                         f"({_batcher.max_pending}) — use a smaller batch")
+    delay, deadline = 0.05, time.monotonic() + BULK_WAIT_S
+    while True:
+        try:
+            return _batcher.submit_many((target, conf), images)
+        except Overloaded:
+            if time.monotonic() + delay > deadline:
+                raise Overloaded(f"inference queue stayed full for {BULK_WAIT_S:.0f}s") from None
+            time.sleep(delay)
+            delay = min(1.0, delay * 2)
+
+
+def _busy(exc: Overloaded, **extra):
+    """503 + Retry-After when the inference queue is full."""
+    registry.inc("yolo_rejected_total", 1, "Requests turned away by a full inference queue",
+                 route=request.endpoint.rsplit(".", 1)[-1])
+    resp = jsonify({"error": str(exc), "busy": True, **extra})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = "1"
+    return resp
+
+
+def preload_models():
+    """
+    Load weights only — no forward pass — so a pre-forking server can do this
+    once in the master and share the pages copy-on-write with its workers
+    without starting torch's thread pools before fork.
+    """
+    for path in _warmup_paths():
+        try:
+            _load_model(path, None)
+        except Exception as exc:
+            print(f"[preload] {path or PRETRAINED}: {exc}")
+
+
+def _warmup_paths() -> list:
+    from utils.model_manager import model_registry
+    trained = model_registry().entries()            # newest first
+    return [None] + [m["path"] for m in trained][:MODEL_CACHE_MAX - 1]
+
+
+def warmup_models():
+    """
+    Load the pretrained weights plus the newest trained models and push one
+    dummy frame through each, so the first real request skips the load and
+    the lazy graph/kernels initialisation.
+    """
+    dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+    for path in _warmup_paths():
+        try:
+            _predict(dummy, path, 0.25)
+        except Exception as exc:
+            print(f"[warmup] {path or PRETRAINED}: {exc}")
+
+
+# ── Benchmark ─────────────────────────────────────────────────────────────────
+
+def bench_loader(model_path: str | None = None, export_missing: bool = False):
+    """
+    Loader for utils.benchmark.run_suite.  Returns fresh model instances so a
+    benchmark neither evicts nor shares the serving cache's models.
+    """
+    def load(size, backend, imgsz):
+        pt = model_path or f"yolo11{size}.pt"
+        if export_missing and backend != "pytorch" and backend not in exported_artifacts(pt):
+            _yolo(pt)                        # make sure pretrained weights are on disk
+            export_model(pt, backend, imgsz=imgsz)
+        target = resolve_backend(pt, backend)
+        return _yolo(target), target
+    return load
+
 
+_bench_lock = threading.Lock()
 
-def _pil_to_np(img: Image.Image) -> np.ndarray:
-    """PIL RGB → numpy RGB uint8 — the only format YOLO predict reliably accepts."""
-    return np.asarray(img.convert("RGB"), dtype=np.uint8)
+
+def _decode_frame(raw: bytes, timer: StageTimer = NULL_TIMER,
+                  max_w: int = SIZES[-1]) -> np.ndarray:
+    """
+    Webcam JPEG bytes → contiguous BGR array (YOLO's native numpy order), at
+    most `max_w` px wide.  See utils.imgcodec: DCT-scaled decode into a
+    per-thread buffer, so the array is only valid for the current request.
+    """
+    with timer.stage("decode"):
+        return decode_image(raw, max_w)
+
+
+# ── Response helpers ──────────────────────────────────────────────────────────
+
+def _detections(result) -> list:
+    """Boxes → [{"class", "conf", "bbox"}] with one tensor→list conversion per field."""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
+    xyxy  = boxes.xyxy.cpu().numpy().round(1).tolist()
+    confs = boxes.conf.cpu().numpy().round(3).tolist()
+    cls   = boxes.cls.cpu().numpy().astype(int).tolist()
+    names = result.names
+    return [{"class": names[c], "conf": p, "bbox": b}
+            for c, p, b in zip(cls, confs, xyxy)]
+
+
+def _encode_jpeg(bgr: np.ndarray, quality: int, timer: StageTimer = NULL_TIMER) -> str:
+    """Annotated BGR array (from Results.plot) → base64 JPEG, no channel flip."""
+    with timer.stage("jpeg"):
+        buf = encode_jpeg(bgr, quality)
+    with timer.stage("b64"):
+        return base64.b64encode(buf).decode()
+
+
+def _thumbnail(bgr: np.ndarray, width: int, quality: int = 40) -> str:
+    """Low-quality base64 JPEG preview of the input image, `width` px wide."""
+    return base64.b64encode(thumbnail(bgr, width, quality)).decode()
 
 
 # ── Routes ────────────────────────────────────────────────────────────────────
@@ -55,87 +408,444 @@ def index():
     )
 
 
+@detect_bp.route("/models")
+def models():
+    """Registered trained models (newest first) plus the active and best ones."""
+    from utils.model_manager import model_registry
+    reg = model_registry()
+    return jsonify({"models": reg.entries(), "active": reg.active(), "best": reg.best()})
+
+
+@detect_bp.route("/models/active", methods=["POST"])
+def set_active_model():
+    """JSON {"run_id": "<id>"} pins the default model; null reverts to the newest run."""
+    from utils.model_manager import model_registry
+    run_id = (request.json or {}).get("run_id")
+    try:
+        model_registry().set_active(run_id)
+    except KeyError:
+        return jsonify({"error": f"Unknown run: {run_id}"}), 404
+    return jsonify({"success": True, "active": model_registry().active()})
+
+
 @detect_bp.route("/image", methods=["POST"])
+@timed("image")
 def detect_image():
+    """
+    Multipart image in → detections (+ annotated JPEG) out.
+
+    Form fields: conf, model_path, backend ("auto" | "openvino" | "onnx" |
+    "pytorch"), mode ("full" | "detections"), thumb (thumbnail width in px,
+    0 = none).  mode=detections skips plotting and
+    re-encoding and returns only the boxes, plus the thumbnail if asked for.
+    cache=1 serves / stores the response in the result cache (see
+    GET /detect/image/<sha256>); it then carries an ETag, and a matching
+    If-None-Match gets a 304.
+
+    tile=<px> switches to sliced inference for large images: overlapping
+    tiles (tile_overlap, default 0.2) run tile_batch at a time through the
+    model, plus the whole image unless tile_full=0, and boxes are merged
+    across tiles with NMS (tile_merge threshold on tile_metric "ios" |
+    "iou").  The response then includes `tiling` stats.
+    """
     if "image" not in request.files:
         return jsonify({"error": "No image provided"}), 400
+    try:
+        tiling = _tiling_opts(request.form)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     conf       = float(request.form.get("conf", 0.20))
     model_path = request.form.get("model_path") or None
+    backend    = request.form.get("backend") or None
+    mode       = request.form.get("mode", "full")
+    thumb      = int(request.form.get("thumb", 0))
+    use_cache  = _results.enabled and request.form.get("cache", "") in ("1", "true")
 
+    timer = g.timer
     try:
-        img    = Image.open(request.files["image"].stream).convert("RGB")
-        model, src = _load_model(model_path)
-        results    = model.predict(source=_pil_to_np(img), conf=conf,
-                                   device=DEVICE, verbose=False)
+        raw = request.files["image"].read()
+        if use_cache:
+            with timer.stage("cache"):
+                key, _ = _result_key(content_hash(raw), model_path, backend, conf, mode, thumb,
+                                     tiling)
+                if etag(key) in request.if_none_match:
+                    return _not_modified(key)
+                hit = _results.get(key)
+            if hit is not None:
+                return _cached_response(hit, key, hit=True)
+        with timer.stage("decode"):
+            arr = decode_image(raw)
+        with timer.stage("predict"):
+            if tiling:
+                result, src, tile_info = _predict_tiled(arr, model_path, conf, backend, **tiling)
+            else:
+                result, src = _predict(arr, model_path, conf, backend)
+    except Overloaded as exc:
+        return _busy(exc)
+    except ValueError as exc:               # undecodable image, too many tiles
+        return jsonify({"error": str(exc)}), 400
     except Exception:
         return jsonify({"error": traceback.format_exc()}), 500
 
-    # Annotated output
-    annotated = results[0].plot()                       # numpy BGR
-    pil_out   = Image.fromarray(annotated[..., ::-1])   # → RGB
-
-    buf = io.BytesIO()
-    pil_out.save(buf, format="JPEG", quality=88)
-    img_b64 = base64.b64encode(buf.getvalue()).decode()
-
-    dets = [
-        {
-            "class": results[0].names[int(b.cls)],
-            "conf":  round(float(b.conf), 3),
-            "bbox":  [round(v, 1) for v in b.xyxy[0].tolist()],
-        }
-        for b in results[0].boxes
-    ]
-
-    return jsonify({
-        "image":        img_b64,
+    dets = _detections(result)
+    out  = {
         "detections":   dets,
         "count":        len(dets),
         "model_source": src,
-    })
+    }
+    if tiling:
+        out["tiling"] = tile_info
+    if thumb > 0:
+        out["thumbnail"] = _thumbnail(arr, thumb)
+    if mode != "detections":
+        with timer.stage("plot"):
+            annotated = result.plot()
+        out["image"] = _encode_jpeg(annotated, quality=88, timer=timer)
+    if use_cache:
+        _results.put(key, out)
+        return _cached_response(out, key, hit=False)
+    return jsonify(out)
+
+
+@detect_bp.route("/image/<digest>", methods=["GET"])
+@timed("image_cached")
+def cached_image(digest):
+    """
+    Look up a cached /detect/image result by the image's SHA-256, so a
+    client can skip the upload.  Query args mirror the POST form (conf,
+    model_path, backend, mode, thumb, tile*).  200 + ETag on a hit, 304 when
+    If-None-Match still matches (the key covers the weights' mtime, so a
+    retrained model changes it), 404 when the image has to be uploaded.
+    """
+    digest = digest.lower()
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        return jsonify({"error": "Expected a hex SHA-256 digest"}), 400
+    if not _results.enabled:
+        return jsonify({"error": "Result cache is disabled", "cached": False}), 404
+
+    args = request.args
+    try:
+        conf, thumb, tiling = float(args.get("conf", 0.20)), int(args.get("thumb", 0)), _tiling_opts(args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    try:
+        key, _ = _result_key(digest, args.get("model_path") or None, args.get("backend") or None,
+                             conf, args.get("mode", "full"), thumb, tiling)
+    except Exception:
+        return jsonify({"error": traceback.format_exc()}), 500
+    if etag(key) in request.if_none_match:
+        return _not_modified(key)
+    hit = _results.get(key)
+    if hit is None:
+        return jsonify({"cached": False}), 404
+    return _cached_response(hit, key, hit=True)
+
+
+@detect_bp.route("/cache", methods=["GET"])
+def cache_stats():
+    return jsonify(_results.stats())
+
+
+# ── Bulk detection ────────────────────────────────────────────────────────────
+
+BULK_ROOT = "runs/batch"      # <batch_id>/annotated/*.jpg, coco.json
+
+
+def _summarize(result) -> dict:
+    dets = _detections(result)
+    return {"detections": dets, "count": len(dets)}
+
+
+@detect_bp.route("/batch", methods=["POST"])
+def detect_batch():
+    """
+    Many images in one request → NDJSON, one line per image as it finishes.
+
+    Input (one of): multipart `images` (several files) or `zip`; `upload_id`
+    of a zip sent via the chunked upload with purpose=batch; `dir`, a
+    server directory under YOLO_BULK_ROOTS.  Options (form or JSON): conf,
+    model_path, backend, batch (images per forward pass group, ≤ 32),
+    workers (decode threads), save ("annotated", "coco" or both, comma-
+    separated) to write annotated JPEGs / a COCO results file under
+    runs/batch/<id>/ instead of returning boxes inline.
+
+    The first line is a header {batch_id, images, model_source}, the last a
+    {"summary"} with counts, throughput and output paths.
+    """
+    cfg  = request.form if request.files or request.form else (request.get_json(silent=True) or {})
+    save = {s.strip() for s in str(cfg.get("save", "")).split(",") if s.strip()}
+    if save - {"annotated", "coco"}:
+        return jsonify({"error": "save must be annotated, coco or both"}), 400
+    try:
+        conf    = float(cfg.get("conf", 0.20))
+        batch   = min(MAX_BATCH, max(1, int(cfg.get("batch", _batcher.max_batch))))
+        workers = max(0, int(cfg.get("workers", 0)))
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    if _batcher.max_pending:
+        batch = min(batch, _batcher.max_pending)    # submit_many is all-or-nothing
+
+    zf, cleanup = None, None
+    try:
+        if request.files.getlist("images"):
+            items = files_source(request.files.getlist("images"))
+        elif "zip" in request.files:
+            zf    = zipfile.ZipFile(request.files["zip"].stream)
+            items = zip_source(zf)
+        elif cfg.get("upload_id"):
+            from routes.upload import BATCH_DIR
+            upload_id = str(cfg["upload_id"])
+            path      = os.path.join(current_app.config["UPLOAD_FOLDER"], BATCH_DIR,
+                                     f"{upload_id}.zip")
+            if not upload_id.isalnum() or not os.path.exists(path):
+                return jsonify({"error": "Unknown upload_id — finalize the chunked upload "
+                                         "with purpose=batch first"}), 404
+            zf, cleanup = zipfile.ZipFile(path), path
+            items       = zip_source(zf)
+        elif cfg.get("dir"):
+            items = dir_source(str(cfg["dir"]))
+        else:
+            return jsonify({"error": "Provide images, zip, upload_id or dir"}), 400
+    except PermissionError as exc:
+        return jsonify({"error": str(exc)}), 403
+    except (ValueError, zipfile.BadZipFile) as exc:
+        return jsonify({"error": str(exc)}), 400
+    if not items:
+        if zf:
+            zf.close()
+        return jsonify({"error": "No images found (jpg, jpeg, png, bmp, webp)"}), 400
+
+    target, src = _resolve_model(cfg.get("model_path") or None, cfg.get("backend") or None)
+    batch_id    = new_job_id()
+    out_dir     = os.path.join(BULK_ROOT, batch_id) if save else None
+
+    def predict(images):
+        registry.inc("yolo_bulk_images_total", len(images), "Images run through /detect/batch")
+        return _predict_bulk(target, conf, images)
+
+    def _gen():
+        try:
+            yield _ndjson({"batch_id": batch_id, "images": len(items), "model_source": src})
+            for row in detect_images(items, predict, _summarize, _det_arrays, batch=batch,
+                                     workers=workers, out_dir=out_dir,
+                                     annotate="annotated" in save, coco="coco" in save):
+                yield _ndjson(row)
+        except Exception as exc:
+            yield _ndjson({"error": str(exc)})
+        finally:
+            if zf:
+                zf.close()
+            if cleanup:
+                try:
+                    os.remove(cleanup)
+                except OSError:
+                    pass
+
+    return Response(stream_with_context(_gen()), mimetype="application/x-ndjson",
+                    headers={"X-Accel-Buffering": "no"})
+
+
+def _ndjson(obj: dict) -> str:
+    return json.dumps(obj, separators=(",", ":")) + "\n"
 
 
 @detect_bp.route("/frame", methods=["POST"])
+@timed("frame")
 def detect_frame():
-    """WebRTC webcam frame: base64 JPEG in → annotated base64 JPEG out."""
+    """
+    WebRTC webcam frame: base64 JPEG in → annotated base64 JPEG out.
+
+    JSON keys: frame, conf, model_path, backend, mode ("full" |
+    "detections"), thumb — same contract as /detect/image.  With track=true
+    and a client-chosen `session` id, boxes carry a stable `track_id` and
+    the detector only runs every `track_every` frames or when the scene
+    changes by `track_diff`; boxes are propagated in between.  Every
+    response (503s included) carries `adapt` — the capture interval, width
+    and JPEG quality the client should use for its next frames.
+    """
+    t0   = time.perf_counter()
     data = request.json
     if not data or "frame" not in data:
         return jsonify({"error": "No frame data"}), 400
 
     conf       = float(data.get("conf", 0.20))
     model_path = data.get("model_path") or None
+    backend    = data.get("backend") or None
+    mode       = data.get("mode", "full")
+    thumb      = int(data.get("thumb", 0))
+    track      = bool(data.get("track", False))
+    session_id = str(data.get("session") or "")[:64]
+    if track and not session_id:
+        return jsonify({"error": "track=true needs a session id"}), 400
 
+    timer = g.timer
     try:
-        raw = base64.b64decode(data["frame"].split(",")[-1])
-        img = Image.open(io.BytesIO(raw)).convert("RGB")
+        imgsz = _model_imgsz(_resolve_model(model_path, backend)[0])
+        with timer.stage("b64decode"):
+            raw = base64.b64decode(data["frame"].split(",")[-1])
+        arr = _decode_frame(raw, timer, imgsz)
+        with timer.stage("predict"):
+            if track:
+                dets, tracking = _track(
+                    _sessions.get(session_id), arr, model_path, conf, backend,
+                    int(data.get("track_every", TRACK_EVERY)),
+                    float(data.get("track_diff", TRACK_DIFF)), "frame")
+                src = _resolve_model(model_path, backend)[1]
+            else:
+                result, src = _predict(arr, model_path, conf, backend)
+                dets = _detections(result)
+    except Overloaded as exc:
+        return _busy(exc, adapt=_adaptive.recommend(imgsz))
+    except Exception:
+        return jsonify({"error": traceback.format_exc()}), 500
+
+    _adaptive.observe(time.perf_counter() - t0)
+    adapt = _adaptive.recommend(imgsz)
+    out   = {
+        "detections": dets,
+        "count":      len(dets),
+        "source":     src,
+        "w":          arr.shape[1],
+        "h":          arr.shape[0],
+        "adapt":      adapt,
+    }
+    if track:
+        out["tracking"] = tracking
+    if thumb > 0:       # before plotting: _plot_tracks draws onto arr itself
+        out["thumbnail"] = "data:image/jpeg;base64," + _thumbnail(arr, thumb)
+    if mode != "detections":
+        with timer.stage("plot"):
+            annotated = _plot_tracks(arr, dets) if track else result.plot()
+        quality      = int(adapt["quality"] * 100)
+        out["frame"] = "data:image/jpeg;base64," + _encode_jpeg(annotated, quality, timer)
+    return jsonify(out)
+
 
-        # Downscale for speed
-        w, h = img.size
-        if w > 640:
-            img = img.resize((640, int(h * 640 / w)), Image.BILINEAR)
+@detect_bp.route("/bench", methods=["POST"])
+def bench():
+    """
+    Short benchmark on the live server (synthetic frames, few iterations).
 
-        model, src = _load_model(model_path)
-        results    = model.predict(source=_pil_to_np(img), conf=conf,
-                                   device=DEVICE, verbose=False)
+    JSON keys (all optional): model_path, sizes, imgsz, batch, backends,
+    iters (≤ 50).  Runs on private model instances; one at a time.
+    """
+    from utils.benchmark import run_suite
+    cfg        = request.json or {}
+    model_path = cfg.get("model_path") or None
+    if model_path and not os.path.exists(model_path):
+        return jsonify({"error": f"Model not found: {model_path}"}), 400
+
+    if not _bench_lock.acquire(blocking=False):
+        return jsonify({"error": "A benchmark is already running"}), 409
+    try:
+        report = run_suite(
+            bench_loader(model_path),
+            sizes=cfg.get("sizes", ["n"]),
+            imgsz=[int(v) for v in cfg.get("imgsz", [640])],
+            batches=[int(v) for v in cfg.get("batch", [1])],
+            backends=cfg.get("backends", ["pytorch"]),
+            iters=min(int(cfg.get("iters", 10)), 50),
+            warmup=2,
+            device=DEVICE,
+        )
     except Exception:
         return jsonify({"error": traceback.format_exc()}), 500
+    finally:
+        _bench_lock.release()
+    return jsonify(report)
 
-    annotated = results[0].plot()
-    pil_out   = Image.fromarray(annotated[..., ::-1])
 
-    buf = io.BytesIO()
-    pil_out.save(buf, format="JPEG", quality=75)
-    out_b64 = "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode()
+@sock.route("/ws", bp=detect_bp)
+def detect_ws(ws):
+    """
+    Full-duplex webcam stream: raw JPEG bytes in → detection JSON out.
 
-    dets = [
-        {"class": results[0].names[int(b.cls)], "conf": round(float(b.conf), 3)}
-        for b in results[0].boxes
-    ]
+    Text messages update the session settings ({"conf", "model_path",
+    "backend", "track", "track_every", "track_diff"}); with tracking on,
+    the connection keeps its own tracker and boxes carry a `track_id`;
+    binary messages are frames.  Frames that queued up while the previous
+    one was being processed are dropped — only the newest is run — and the
+    number dropped is reported so the client can account for them.  Boxes
+    are returned in the coordinates of the (downscaled) frame along with its
+    size; the browser draws them itself.  Replies carry `adapt`, as on
+    /detect/frame.  At most YOLO_WS_MAX sessions per worker process (each
+    holds a server thread); past that the socket is closed after a "busy"
+    message and the page falls back to POST.
+    """
+    if not ws_slots.acquire(blocking=False):
+        ws.send(json.dumps({"error": "busy", "busy": True,
+                            "detail": "Too many WebSocket sessions — use POST /detect/frame"}))
+        ws.close()
+        return
+    try:
+        _serve_ws(ws)
+    finally:
+        ws_slots.release()
 
-    return jsonify({
-        "frame":      out_b64,
-        "detections": dets,
-        "count":      len(dets),
-        "source":     src,
-    })
\ No newline at end of file
+
+def _serve_ws(ws):
+    conf, model_path, backend = 0.20, None, None
+    track, every, diff, session = False, TRACK_EVERY, TRACK_DIFF, None
+    while True:
+        msg, frame, dropped = ws.receive(), None, 0
+        while msg is not None:
+            if isinstance(msg, str):
+                try:
+                    cfg = json.loads(msg)
+                    if not isinstance(cfg, dict):
+                        raise ValueError("settings must be a JSON object")
+                    # parse everything before applying anything: a bad message changes nothing
+                    settings = (float(cfg.get("conf", conf)),
+                                cfg.get("model_path", model_path) or None,
+                                cfg.get("backend", backend) or None,
+                                bool(cfg.get("track", track)),
+                                int(cfg.get("track_every", every)),
+                                float(cfg.get("track_diff", diff)))
+                except (TypeError, ValueError) as exc:
+                    ws.send(json.dumps({"error": f"Invalid settings: {exc}"}))
+                else:
+                    conf, model_path, backend, track, every, diff = settings
+                    session = (session or TrackSession()) if track else None
+            else:
+                dropped += frame is not None
+                frame    = msg
+            msg = ws.receive(timeout=0)
+        if frame is None:
+            continue
+
+        t0, timer = time.perf_counter(), StageTimer("ws")
+        try:
+            imgsz = _model_imgsz(_resolve_model(model_path, backend)[0])
+            arr   = _decode_frame(frame, timer, imgsz)
+            with timer.stage("predict"):
+                if session is not None:
+                    dets, tracking = _track(session, arr, model_path, conf, backend,
+                                            every, diff, "ws")
+                    src = _resolve_model(model_path, backend)[1]
+                else:
+                    result, src = _predict(arr, model_path, conf, backend)
+                    dets, tracking = _detections(result), None
+        except Overloaded:
+            registry.inc("yolo_rejected_total", 1, "Requests turned away by a full inference queue",
+                         route="ws")
+            ws.send(json.dumps({"error": "busy", "dropped": dropped,
+                                "adapt": _adaptive.recommend(imgsz)}))
+            continue
+        except Exception:
+            ws.send(json.dumps({"error": traceback.format_exc(), "dropped": dropped}))
+            continue
+
+        _adaptive.observe(time.perf_counter() - t0)
+        msg = {
+            "w":          arr.shape[1],
+            "h":          arr.shape[0],
+            "detections": dets,
+            "count":      len(dets),
+            "dropped":    dropped,
+            "source":     src,
+            "adapt":      _adaptive.recommend(imgsz),
+        }
+        if tracking:
+            msg["tracking"] = tracking
+        ws.send(json.dumps(msg, separators=(",", ":")))
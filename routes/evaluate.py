@@ -0,0 +1,183 @@
+import os, shutil, time, traceback
+from pathlib import Path
+from flask import Blueprint, request, jsonify, current_app
+from routes.detect import _batcher, _busy, _resolve_model, _runtime_name, _predict_bulk, _det_arrays
+from routes.upload import EVAL_DIR
+from utils.batching import Overloaded
+from utils.bulk import MAX_BATCH, detect_images
+from utils.dataset import IMAGE_EXTS, extract_labelstudio_zip, _label_path_for, _read_label_rows
+from utils.evaluation import EVAL_CONF, Evaluator, class_map, labels_to_xyxy
+from utils.jobs import new_job_id
+from utils.metrics import registry
+
+eval_bp = Blueprint("evaluate", __name__)
+
+# ── Evaluation ────────────────────────────────────────────────────────────────
+# A labelled Label Studio zip is extracted, run through one or more runtimes
+# of a model via the inference queue, scored, and deleted again.
+
+EVAL_ROOT = "data/datasets/eval"
+BACKENDS  = ("auto", "pytorch", "onnx", "openvino")
+
+
+def _samples(root: str, split: str | None) -> list:
+    """(image, label file) pairs under images/[<split>/], in path order."""
+    base = Path(root) / "images" / (split or "")
+    if not base.is_dir():
+        return []
+    images = sorted(p for p in base.rglob("*") if p.suffix.lower() in IMAGE_EXTS)
+    return [(p, _label_path_for(Path(root), p)) for p in images]
+
+
+def _eval_row(result) -> dict:
+    boxes = _det_arrays(result)
+    return {"count": len(boxes[0]), "boxes": boxes}
+
+
+def _evaluate(samples: list, names: list, target: str, conf: float, batch: int) -> dict:
+    """One runtime over the whole set → accuracy, class mapping and throughput."""
+    ev     = Evaluator(names)
+    lookup = mode = summary = None
+    infer  = {"s": 0.0, "images": 0}
+    items  = [(str(img), img.read_bytes) for img, _ in samples]
+
+    def predict(images):
+        t = time.perf_counter()
+        out = _predict_bulk(target, conf, images)
+        infer["s"]      += time.perf_counter() - t
+        infer["images"] += len(images)
+        return out
+
+    for row in detect_images(items, predict, _eval_row, batch=batch):
+        if "summary" in row:
+            summary = row["summary"]
+            continue
+        if "error" in row:
+            continue
+        xyxy, pconf, pcls, model_names = row["boxes"]
+        if lookup is None:
+            lookup, mode = class_map(model_names, names)
+        pcls = lookup[pcls]
+        keep = pcls >= 0
+        gt   = _read_label_rows(samples[row["index"]][1])
+        gt   = gt[(gt[:, 0] >= 0) & (gt[:, 0] < len(names))]
+        gcls, gxyxy = labels_to_xyxy(gt, row["width"], row["height"])
+        ev.add(xyxy[keep], pconf[keep], pcls[keep], gxyxy, gcls)
+
+    registry.inc("yolo_eval_images_total", ev.images, "Images scored by /detect/evaluate")
+    return {
+        **ev.summary(),
+        "class_mapping": mode,
+        "failed":        summary["failed"],
+        "throughput": {
+            "images_per_s":       summary["images_per_s"],       # decode + inference
+            "infer_images_per_s": round(infer["images"] / infer["s"], 2) if infer["s"] else None,
+            "infer_ms_per_image": round(infer["s"] * 1000 / infer["images"], 2)
+                                  if infer["images"] else None,
+            "elapsed_s":          summary["elapsed_s"],
+            "batch":              summary["batch"],
+        },
+    }
+
+
+# ── Routes ────────────────────────────────────────────────────────────────────
+
+@eval_bp.route("", methods=["POST"])
+def evaluate():
+    """
+    Score a model on a labelled Label Studio YOLO zip — no training involved.
+
+    Input: multipart `zip`, or `upload_id` of a zip sent through the chunked
+    upload and finalized with purpose=eval.  Options (form or JSON): run_id
+    (a registered model) or model_path — neither = pretrained COCO weights;
+    backends, comma-separated runtimes of that model to compare
+    (pytorch, onnx, openvino, auto; default pytorch); split (e.g. "val";
+    default every image); conf (default 0.001); batch.
+
+    Returns one entry per runtime with precision, recall, mAP50, mAP50-95,
+    per-class AP, the confusion matrix and throughput; later runtimes also
+    get `vs_baseline` deltas against the first.
+    """
+    cfg = request.form if request.files or request.form else (request.get_json(silent=True) or {})
+    backends = [b.strip().lower() for b in str(cfg.get("backends") or cfg.get("backend")
+                                               or "pytorch").split(",") if b.strip()]
+    if set(backends) - set(BACKENDS):
+        return jsonify({"error": f"backends must be among {', '.join(BACKENDS)}"}), 400
+    try:
+        conf  = float(cfg.get("conf", EVAL_CONF))
+        batch = min(MAX_BATCH, max(1, int(cfg.get("batch", 8))))
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    if _batcher.max_pending:
+        batch = min(batch, _batcher.max_pending)    # submit_many is all-or-nothing
+    split = (cfg.get("split") or "").strip("/") or None
+    if split and not split.replace("-", "").replace("_", "").isalnum():
+        return jsonify({"error": "split must be a folder name such as val"}), 400
+
+    model_path = cfg.get("model_path") or None
+    if cfg.get("run_id"):
+        from utils.model_manager import model_registry
+        entry = model_registry().get(str(cfg["run_id"]))
+        if entry is None:
+            return jsonify({"error": f"Unknown run: {cfg['run_id']}"}), 404
+        model_path = entry["path"]
+
+    eval_id  = new_job_id()
+    zip_dir  = os.path.join(current_app.config["UPLOAD_FOLDER"], EVAL_DIR)
+    if "zip" in request.files:
+        os.makedirs(zip_dir, exist_ok=True)
+        zip_path = os.path.join(zip_dir, f"{eval_id}.zip")
+        request.files["zip"].save(zip_path)
+    elif cfg.get("upload_id"):
+        upload_id = str(cfg["upload_id"])
+        zip_path  = os.path.join(zip_dir, f"{upload_id}.zip")
+        if not upload_id.isalnum() or not os.path.exists(zip_path):
+            return jsonify({"error": "Unknown upload_id — finalize the chunked upload "
+                                     "with purpose=eval first"}), 404
+    else:
+        return jsonify({"error": "Provide a labelled zip or an upload_id"}), 400
+
+    dest = os.path.join(EVAL_ROOT, eval_id)
+    try:
+        try:
+            info = extract_labelstudio_zip(zip_path, dest)
+        except Exception as exc:
+            return jsonify({"error": f"Extraction failed: {exc}"}), 400
+        if not info["classes"]:
+            return jsonify({"error": "Could not find class names. Make sure classes.txt "
+                                     "is in the zip."}), 400
+        samples = _samples(dest, split)
+        if not samples:
+            return jsonify({"error": f"No images found under images/{split or ''}"}), 400
+
+        runs, done = [], {}
+        for backend in backends:
+            target, src = _resolve_model(model_path, backend)
+            if target in done:          # e.g. onnx requested but never exported → same .pt
+                runs.append({**done[target], "backend": backend, "same_as": done[target]["backend"]})
+                continue
+            result = {"backend": backend, "runtime": _runtime_name(target), "model": target,
+                      "model_source": src, **_evaluate(samples, info["classes"], target, conf, batch)}
+            done[target] = result
+            runs.append(result)
+    except Overloaded as exc:
+        return _busy(exc)
+    except Exception:
+        return jsonify({"error": traceback.format_exc()}), 500
+    finally:
+        shutil.rmtree(dest, ignore_errors=True)
+        try:
+            os.remove(zip_path)
+        except OSError:
+            pass
+
+    base = runs[0]
+    for r in runs[1:]:
+        ips, base_ips = r["throughput"]["infer_images_per_s"], base["throughput"]["infer_images_per_s"]
+        r["vs_baseline"] = {
+            "mAP50_delta":    round(r["mAP50"] - base["mAP50"], 4),
+            "mAP50_95_delta": round(r["mAP50_95"] - base["mAP50_95"], 4),
+            "speedup":        round(ips / base_ips, 2) if ips and base_ips else None,
+        }
+    return jsonify({"eval_id": eval_id, "classes": info["classes"], "split": split,
+                    "images": len(samples), "conf": conf, "results": runs})
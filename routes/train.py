@@ -1,7 +1,12 @@
-import os, json, time, threading, shutil, csv
+import os, time, shutil, csv
 import torch
-from flask import (Blueprint, request, jsonify, render_template,
-                   Response, stream_with_context)
+from flask import Blueprint, request, jsonify, render_template
+from utils.metrics import registry
+from utils.resources import CACHE_MODES, training_resources, apply_torch_threads
+from utils.jobs import FINISHED, JobManager, new_job_id
+from utils.model_manager import _fitness
+from utils.sse import job_stream
+from utils.sweep import SweepManager, expand_space
 
 train_bp = Blueprint("train", __name__)
 
@@ -9,61 +14,112 @@ train_bp = Blueprint("train", __name__)
 DEVICE       = 0 if torch.cuda.is_available() else "cpu"
 DEVICE_LABEL = f"GPU (cuda:{DEVICE})" if DEVICE != "cpu" else "CPU"
 
-# ── Global training state ─────────────────────────────────────────────────────
-_lock       = threading.Lock()
-_stop_event = threading.Event()
-_state = {
-    "status":       "idle",
-    "epoch":        0,
-    "total_epochs": 0,
-    # live callback metrics
-    "box_loss":     "—",
-    "cls_loss":     "—",
-    "dfl_loss":     "—",
-    "mAP50":        "—",
-    "mAP50_95":     "—",
-    "precision":    "—",
-    "recall":       "—",
-    # history for sparklines (list of dicts)
-    "history":      [],
-    "log":          [],
-    "model_path":   None,
-    "plots":        [],      # list of relative URLs for saved PNG plots
-    "error":        None,
-    "model_size":   "n",
-    "device_label": DEVICE_LABEL,
-}
-
-RUNS_DIR    = "runs/detect/custom"
-PLOTS_DIR   = "static/results/plots"
-RESULTS_CSV = os.path.join(RUNS_DIR, "results.csv")
-
-
-def _set(**kw):
-    with _lock:
-        _state.update(kw)
-
-
-def _log(msg: str):
-    with _lock:
-        _state["log"].append(msg)
-        if len(_state["log"]) > 200:
-            _state["log"] = _state["log"][-200:]
-
-
-def _cleanup_dataset():
-    dataset_dir = "data/datasets/current"
-    if os.path.exists(dataset_dir):
+# ── Training jobs ─────────────────────────────────────────────────────────────
+# Each /train/start becomes a job with its own state record, run in a worker
+# process by the JobManager (created at the bottom of this module).
+
+# /train/start keys that override the auto-tuned resource config ("auto" = tune)
+RESOURCE_KEYS = ("workers", "threads", "interop_threads", "pin_memory", "cache")
+# Optimizer hyperparameters passed straight through to model.train()
+HYP_KEYS      = ("lr0", "lrf", "momentum", "weight_decay", "warmup_epochs")
+SWEEP_KEYS    = ("model_size", "imgsz", "batch") + HYP_KEYS
+MODEL_SIZES   = ("n", "s", "m", "l", "x")
+BACKBONE      = 11      # YOLO11 backbone = model layers 0–10 (C2PSA is 10); freeze=true freezes these
+
+# Snapshots of stopped / failed jobs are kept so the run can be resumed
+RESUME_KEEP_H = float(os.environ.get("YOLO_RESUME_KEEP_HOURS", 24))
+
+RUNS_ROOT    = "runs/detect"
+PLOTS_DIR    = "static/results/plots"
+DATASET_DIR  = "data/datasets/current"
+SNAPSHOT_DIR = "data/datasets/jobs"
+
+
+def _initial_state(cfg: dict) -> dict:
+    return {
+        "epoch":        0,
+        "total_epochs": cfg["epochs"],
+        # live callback metrics
+        "box_loss":     "—",
+        "cls_loss":     "—",
+        "dfl_loss":     "—",
+        "mAP50":        "—",
+        "mAP50_95":     "—",
+        "precision":    "—",
+        "recall":       "—",
+        # history for sparklines (list of dicts)
+        "history":      [],
+        "model_path":   None,
+        "run_dir":      os.path.join(RUNS_ROOT, cfg.get("run_name") or cfg["job_id"]),
+        "plots":        [],      # list of relative URLs for saved PNG plots
+        "error":        None,
+        "model_size":   cfg["model_size"],
+        "device_label": DEVICE_LABEL,
+    }
+
+
+def _on_job_finish(rec: dict):
+    """
+    Drop the job's dataset snapshot unless the run can still be resumed, and
+    the upload once no job needs it; free cached detections made with the
+    weights this job (re)wrote.
+    """
+    snapshot = _snapshot_dir(rec.get("config") or {})
+    if snapshot and not _resumable(rec):
+        shutil.rmtree(snapshot, ignore_errors=True)
+    _prune_snapshots()
+    if rec.get("model_path"):
+        from routes.detect import _results
+        _results.invalidate(rec["model_path"])
+    yaml_path = os.path.join(DATASET_DIR, "data.yaml")
+    # Keep a dataset uploaded after this job was queued — it hasn't been trained on yet
+    if (_jobs.active_count() == 0 and os.path.exists(yaml_path)
+            and os.path.getmtime(yaml_path) <= rec["queued_at"]):
         try:
-            shutil.rmtree(dataset_dir)
-            _log("🗑  Dataset removed from disk (weights kept in runs/).")
+            shutil.rmtree(DATASET_DIR)
         except Exception as exc:
-            _log(f"⚠️  Cleanup warning: {exc}")
+            print(f"[train] cleanup warning: {exc}")
 
 
-def _copy_plots():
+def _snapshot_dir(cfg: dict) -> str | None:
+    """The job's own dataset snapshot; None for sweep trials, whose sweep owns it."""
+    if cfg.get("sweep") or not cfg.get("yaml_path"):
+        return None
+    path = os.path.dirname(os.path.abspath(cfg["yaml_path"]))
+    return path if os.path.dirname(path) == os.path.abspath(SNAPSHOT_DIR) else None
+
+
+def _last_checkpoint(rec: dict) -> str:
+    return os.path.join(rec["run_dir"], "weights", "last.pt")
+
+
+def _resumable(rec: dict) -> bool:
+    """Stopped or failed before finishing, with a checkpoint to continue from."""
+    return rec["status"] in ("stopped", "error") and os.path.exists(_last_checkpoint(rec))
+
+
+def _prune_snapshots():
+    """Remove kept snapshots older than RESUME_KEEP_H that no active job trains on."""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return
+    in_use = {_snapshot_dir(j["config"]) for j in _jobs.list_jobs()
+              if j["status"] not in FINISHED and j.get("config")}
+    cutoff = time.time() - RESUME_KEEP_H * 3600
+    for name in os.listdir(SNAPSHOT_DIR):
+        path = os.path.abspath(os.path.join(SNAPSHOT_DIR, name))
+        if name.startswith("sweep-") or path in in_use:
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def _copy_plots(run_dir: str, job_id: str):
     """Copy Ultralytics PNG plots to static/ so they can be served."""
-    os.makedirs(PLOTS_DIR, exist_ok=True)
+    out_dir = os.path.join(PLOTS_DIR, job_id)
+    os.makedirs(out_dir, exist_ok=True)
     plot_names = [
         "results.png",
         "confusion_matrix.png",
@@ -75,21 +131,22 @@ def _copy_plots():
     ]
     saved = []
     for name in plot_names:
-        src = os.path.join(RUNS_DIR, name)
+        src = os.path.join(run_dir, name)
         if os.path.exists(src):
-            dst = os.path.join(PLOTS_DIR, name)
+            dst = os.path.join(out_dir, name)
             shutil.copy2(src, dst)
             saved.append(f"/{dst}")
     return saved
 
 
-def _parse_csv_history() -> list:
+def _parse_csv_history(run_dir: str) -> list:
     """Read results.csv and return a list of per-epoch metric dicts."""
-    if not os.path.exists(RESULTS_CSV):
+    results_csv = os.path.join(run_dir, "results.csv")
+    if not os.path.exists(results_csv):
         return []
     rows = []
     try:
-        with open(RESULTS_CSV, newline="") as f:
+        with open(results_csv, newline="") as f:
             reader = csv.DictReader(f)
             for row in reader:
                 clean = {k.strip(): v.strip() for k, v in row.items()}
@@ -108,9 +165,24 @@ def _parse_csv_history() -> list:
     return rows
 
 
-def _safe_float(val) -> str:
+def _final_metrics(history: list) -> dict:
+    """Metrics of the epoch best.pt was saved from (highest 0.1·mAP50 + 0.9·mAP50-95)."""
+    def num(v):
+        try:
+            return float(v)
+        except (TypeError, ValueError):
+            return None
+
+    rows = [{k: num(row.get(k)) for k in ("mAP50", "mAP50_95", "precision", "recall")}
+            | {"epoch": row.get("epoch")} for row in history]
+    rows = [r for r in rows if r["mAP50_95"] is not None]
+    return max(rows, key=_fitness) if rows else {}
+
+
+def _safe_float(val) -> float | str:
+    """Rounded number, or "—" — the same values the live epoch callback reports."""
     try:
-        return str(round(float(val), 4))
+        return round(float(val), 4)
     except Exception:
         return "—"
 
@@ -125,102 +197,313 @@ def index():
         import yaml
         with open("data/datasets/current/data.yaml") as f:
             classes = yaml.safe_load(f).get("names", [])
-    return render_template("train.html", yaml_exists=yaml_exists,
-                           classes=classes, device_label=DEVICE_LABEL)
+    from utils.model_manager import list_trained_models
+    return render_template("train.html", yaml_exists=yaml_exists, classes=classes,
+                           models=[m for m in list_trained_models() if m["path"].endswith(".pt")],
+                           device_label=DEVICE_LABEL)
+
+
+def _job_arg() -> str | None:
+    """?job=<id> (or JSON job_id); defaults to the most recent job."""
+    body = request.get_json(silent=True) or {}
+    return request.args.get("job") or body.get("job_id") or _jobs.latest()
+
+
+def _idle() -> dict:
+    return {"status": "idle", "epoch": 0, "total_epochs": 0, "history": [], "log": [],
+            "plots": [], "device_label": DEVICE_LABEL}
+
+
+@train_bp.route("/jobs")
+def jobs():
+    return jsonify({"jobs": _jobs.list_jobs(), "counts": _jobs.counts(),
+                    "max_workers": _jobs.max_workers})
 
 
 @train_bp.route("/status")
 def status():
-    with _lock:
-        snap = dict(_state)
+    job_id = _job_arg()
+    snap   = _jobs.snapshot(job_id) if job_id else _idle()
+    if snap is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
     snap["log"] = snap["log"][-30:]
+    if snap["status"] == "queued":
+        snap["queue_position"] = _jobs.queue_position(job_id)
     return jsonify(snap)
 
 
 @train_bp.route("/progress")
 def progress():
-    def _gen():
-        while True:
-            with _lock:
-                snap = dict(_state)
-            snap["log_tail"] = snap["log"][-30:]
-            snap.pop("log", None)
-            yield f"data: {json.dumps(snap)}\n\n"
-            if snap["status"] in ("done", "error", "idle"):
-                break
-            time.sleep(1.5)
-    return Response(
-        stream_with_context(_gen()),
-        mimetype="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    """SSE stream for one job — a snapshot, then deltas (see utils.sse)."""
+    job_id = _job_arg()
+    if job_id and _jobs.snapshot(job_id) is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return job_stream(_jobs, job_id, idle=_idle())
+
+
+def _job_config(cfg: dict, job_id: str, yaml_path: str) -> dict:
+    """Request body → the cfg _run_training receives; ValueError on bad options."""
+    model_size = str(cfg.get("model_size", "n"))
+    imgsz      = int(cfg.get("imgsz", 640))
+    export     = cfg.get("export") or None            # None | "onnx" | "openvino"
+    if model_size not in MODEL_SIZES:
+        raise ValueError(f"model_size must be one of {', '.join(MODEL_SIZES)}")
+    if imgsz < 32 or imgsz % 32:
+        raise ValueError("imgsz must be a positive multiple of 32")
+    if export not in (None, "onnx", "openvino"):
+        raise ValueError(f"Unsupported export format: {export}")
+    resources  = {k: cfg[k] for k in RESOURCE_KEYS if k in cfg}
+    if str(resources.get("cache", "auto")).lower() not in CACHE_MODES:
+        raise ValueError(f"cache must be one of {', '.join(CACHE_MODES)}")
+    base       = _base_weights(cfg.get("base_model"))
+    freeze     = cfg.get("freeze") or 0
+    freeze     = BACKBONE if freeze is True else int(freeze)
+    if freeze < 0:
+        raise ValueError("freeze must be true or a number of layers")
+    return dict(
+        job_id=job_id, yaml_path=yaml_path, epochs=max(1, int(cfg.get("epochs", 30))),
+        imgsz=imgsz, batch=int(cfg.get("batch", 8)), model_size=model_size, export=export,
+        int8=bool(cfg.get("int8", False)), resources=resources,
+        hyp={k: float(cfg[k]) for k in HYP_KEYS if cfg.get(k) is not None},
+        sweep=cfg.get("sweep"), base_model=cfg.get("base_model") or None,
+        base_weights=base, freeze=freeze,
     )
 
 
+def _base_weights(run_id: str | None) -> str | None:
+    """best.pt of a registered run to warm-start from ("active" = the detect default)."""
+    if not run_id:
+        return None
+    from utils.model_manager import model_registry
+    reg   = model_registry()
+    entry = reg.active() if run_id == "active" else reg.get(run_id)
+    if entry is None:
+        raise ValueError(f"Unknown base model: {run_id}")
+    if not entry["path"].endswith(".pt") or not os.path.exists(entry["path"]):
+        raise ValueError(f"No PyTorch weights for base model: {run_id}")
+    return entry["path"]
+
+
 @train_bp.route("/start", methods=["POST"])
 def start():
-    with _lock:
-        if _state["status"] == "running":
-            return jsonify({"error": "Training is already running"}), 400
-
-    cfg        = request.json or {}
-    epochs     = max(1, int(cfg.get("epochs", 30)))
-    imgsz      = int(cfg.get("imgsz", 640))
-    batch      = int(cfg.get("batch", 8))
-    model_size = cfg.get("model_size", "n")
+    cfg      = request.json or {}
+    priority = int(cfg.get("priority", 0))
+    job_id   = new_job_id()
+    try:
+        _job_config(cfg, job_id, "")
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": str(exc)}), 400
 
-    yaml_path = "data/datasets/current/data.yaml"
-    if not os.path.exists(yaml_path):
+    if not os.path.exists(os.path.join(DATASET_DIR, "data.yaml")):
         return jsonify({"error": "No dataset found — please upload first."}), 400
 
-    _set(
-        status="running", epoch=0, total_epochs=epochs,
-        box_loss="—", cls_loss="—", dfl_loss="—",
-        mAP50="—", mAP50_95="—", precision="—", recall="—",
-        history=[], log=[], model_path=None, plots=[], error=None,
-        model_size=model_size, device_label=DEVICE_LABEL,
-    )
-    _stop_event.clear()
-    threading.Thread(
-        target=_run_training,
-        args=(yaml_path, epochs, imgsz, batch, model_size),
-        daemon=True,
-    ).start()
-    return jsonify({"success": True, "device": DEVICE_LABEL})
+    # Snapshot the dataset so the job keeps it even if a new upload lands
+    from utils.dataset import snapshot_dataset
+    yaml_path = snapshot_dataset(DATASET_DIR, os.path.join(SNAPSHOT_DIR, job_id))
+
+    _jobs.submit(_job_config(cfg, job_id, yaml_path), priority=priority, job_id=job_id)
+    return jsonify({
+        "success":        True,
+        "job_id":         job_id,
+        "queue_position": _jobs.queue_position(job_id),
+        "device":         DEVICE_LABEL,
+    })
 
 
 @train_bp.route("/stop", methods=["POST"])
 def stop():
-    _stop_event.set()
-    _log("⛔ Stop requested — finishing current epoch…")
-    return jsonify({"success": True})
+    """Stop ?job=<id> (default: latest). force=1 kills the worker immediately."""
+    job_id = _job_arg()
+    force  = request.args.get("force") == "1" or bool((request.get_json(silent=True) or {}).get("force"))
+    if not job_id or not _jobs.cancel(job_id, force=force):
+        return jsonify({"error": "No such queued or running job"}), 400
+    return jsonify({"success": True, "job_id": job_id})
+
+
+@train_bp.route("/resume", methods=["POST"])
+def resume():
+    """Continue a stopped or interrupted job from runs/detect/<run>/weights/last.pt."""
+    job_id = _job_arg()
+    snap   = _jobs.snapshot(job_id) if job_id else None
+    if snap is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    if not _resumable(snap):
+        return jsonify({"error": "Only a stopped or failed job with a last.pt checkpoint "
+                                 "can be resumed"}), 400
+    cfg      = snap["config"]
+    run_name = cfg.get("run_name") or job_id
+    if not os.path.exists(cfg["yaml_path"]):
+        return jsonify({"error": "The job's dataset snapshot has been removed — start a "
+                                 f"new job with base_model={run_name} instead"}), 409
+    if any(j["config"].get("run_name") == run_name for j in _jobs.list_jobs()
+           if j["status"] not in FINISHED and j.get("config")):
+        return jsonify({"error": f"Run {run_name} is already being resumed"}), 409
+
+    new_id = new_job_id()
+    _jobs.submit({**cfg, "job_id": new_id, "run_name": run_name, "resume": True},
+                 priority=snap.get("priority", 0), job_id=new_id)
+    return jsonify({
+        "success":        True,
+        "job_id":         new_id,
+        "resumes":        job_id,
+        "run":            run_name,
+        "queue_position": _jobs.queue_position(new_id),
+        "device":         DEVICE_LABEL,
+    })
 
 
 @train_bp.route("/plots")
 def plots():
     """Return list of available training plot URLs."""
-    with _lock:
-        return jsonify({"plots": _state.get("plots", [])})
+    job_id = _job_arg()
+    snap   = _jobs.snapshot(job_id) if job_id else None
+    return jsonify({"plots": snap.get("plots", []) if snap else []})
+
+
+# ── Hyperparameter sweeps ─────────────────────────────────────────────────────
+# A sweep expands a search space into trials and runs each as a training job;
+# the SweepManager (bottom of this module) prunes them by successive halving.
+
+def _sweep_arg() -> str | None:
+    body = request.get_json(silent=True) or {}
+    return request.args.get("sweep") or body.get("sweep_id") or _sweeps.latest()
+
+
+def _launch_trial(sweep: dict, params: dict) -> str:
+    """Queue one trial: the sweep's fixed options overridden by the trial's params."""
+    job_id = new_job_id()
+    cfg    = {**sweep["config"], **params, "epochs": sweep["epochs"], "sweep": sweep["id"]}
+    _jobs.submit(_job_config(cfg, job_id, sweep["yaml_path"]),
+                 priority=sweep["priority"], job_id=job_id)
+    return job_id
+
+
+def _promote(job_id: str):
+    from utils.model_manager import model_registry
+    model_registry().set_active(job_id)
+
+
+def _on_sweep_finish(state: dict):
+    shutil.rmtree(os.path.dirname(state["yaml_path"]), ignore_errors=True)
+
+
+@train_bp.route("/sweep", methods=["POST"])
+def sweep_start():
+    """
+    Start a sweep.  Body: {space: {key: [values] | {min, max, log}}, search:
+    "grid" | "random", trials, epochs (per trial), budget (total epochs),
+    eta, min_epochs, promote, seed} plus fixed /train/start options.
+    """
+    cfg     = request.json or {}
+    space   = cfg.get("space") or {}
+    unknown = sorted(set(space) - set(SWEEP_KEYS))
+    if unknown:
+        return jsonify({"error": f"Cannot search {', '.join(unknown)} — "
+                                 f"searchable: {', '.join(SWEEP_KEYS)}"}), 400
+    try:
+        trials = expand_space(space, cfg.get("search", "grid"), cfg.get("trials"), cfg.get("seed"))
+        fixed  = {k: v for k, v in cfg.items()
+                  if k in SWEEP_KEYS + RESOURCE_KEYS + ("base_model", "freeze")}
+        for params in trials:
+            _job_config({**fixed, **params}, "", "")
+        epochs = max(1, int(cfg.get("epochs", 30)))
+        budget = int(cfg["budget"]) if cfg.get("budget") else None
+        eta    = int(cfg.get("eta", 3))
+        grace  = int(cfg.get("min_epochs", 3))
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    if not os.path.exists(os.path.join(DATASET_DIR, "data.yaml")):
+        return jsonify({"error": "No dataset found — please upload first."}), 400
+
+    # One snapshot for every trial — it also shares their image caches
+    from utils.dataset import snapshot_dataset
+    sweep_id  = new_job_id()
+    yaml_path = snapshot_dataset(DATASET_DIR, os.path.join(SNAPSHOT_DIR, f"sweep-{sweep_id}"))
+    state = _sweeps.start(
+        sweep_id, trials, epochs, budget=budget, eta=eta, min_epochs=grace,
+        parallel=_jobs.max_workers, promote=bool(cfg.get("promote", True)),
+        extra={"space": space, "search": cfg.get("search", "grid"), "config": fixed,
+               "yaml_path": yaml_path, "priority": int(cfg.get("priority", 0))},
+    )
+    return jsonify({"success": True, "sweep_id": sweep_id, "trials": len(trials),
+                    "rungs": state["rungs"], "budget": state["budget"]})
+
+
+@train_bp.route("/sweep")
+def sweep_status():
+    """?sweep=<id> (default: newest) → state, per-trial rows and leaderboard."""
+    sweep_id = _sweep_arg()
+    state    = _sweeps.get(sweep_id) if sweep_id else None
+    if state is None:
+        return jsonify({"error": f"Unknown sweep: {sweep_id}"}), 404
+    return jsonify(state)
+
+
+@train_bp.route("/sweeps")
+def sweeps():
+    return jsonify({"sweeps": _sweeps.list_sweeps()})
+
+
+@train_bp.route("/sweep/stop", methods=["POST"])
+def sweep_stop():
+    """Stop launching trials and stop the running ones after their epoch."""
+    sweep_id = _sweep_arg()
+    if not sweep_id or not _sweeps.stop(sweep_id):
+        return jsonify({"error": "No such running sweep"}), 400
+    return jsonify({"success": True, "sweep_id": sweep_id})
 
 
 # ── Background training ───────────────────────────────────────────────────────
 
-def _run_training(yaml_path, epochs, imgsz, batch, size):
+def _run_training(job_id: str, cfg: dict, report, cancel):
+    """Worker-process entry point: trains one job, reporting through `report`."""
+    _log      = report.log
+    _set      = report.set
+    yaml_path = cfg["yaml_path"]
+    epochs    = cfg["epochs"]
+    imgsz     = cfg["imgsz"]
+    batch     = cfg["batch"]
+    size      = cfg["model_size"]
+    export    = cfg["export"]
+    int8      = cfg["int8"]
+    hyp       = cfg.get("hyp") or {}
+    resume    = bool(cfg.get("resume"))
+    base      = cfg.get("base_weights")
+    freeze    = cfg.get("freeze") or 0
+    run_name  = cfg.get("run_name") or job_id
+    run_dir   = os.path.join(RUNS_ROOT, run_name)
+    history   = []
+    started   = time.time()
     try:
         from ultralytics import YOLO
 
-        model_name = f"yolo11{size}.pt"
-        _log(f"↓ Loading base model: {model_name}")
-        model = YOLO(model_name)
+        last = os.path.join(run_dir, "weights", "last.pt")
+        if resume:
+            history.extend(_parse_csv_history(run_dir))
+            _log(f"↻ Resuming {run_name} after epoch {len(history)} from {last}")
+            _set(epoch=len(history), history=list(history))
+            model = YOLO(last)
+        elif base:
+            _log(f"↓ Warm start from {base}"
+                 + (f" — first {freeze} layers frozen" if freeze else ""))
+            model = YOLO(base)
+        else:
+            model_name = f"yolo11{size}.pt"
+            _log(f"↓ Loading base model: {model_name}")
+            model = YOLO(model_name)
         _log(f"✓ Model loaded  |  Device: {DEVICE_LABEL}")
 
         # ── Callbacks ──────────────────────────────────────────────────────────
         def on_train_start(trainer):
             dev = str(trainer.device) if hasattr(trainer, "device") else DEVICE_LABEL
-            _log(f"🚀 Training started — {epochs} ep | imgsz={imgsz} | batch={batch} | {dev}")
+            _log(f"🚀 Training started — {epochs} ep | imgsz={imgsz} | batch={batch} | {dev}"
+                 + "".join(f" | {k}={v}" for k, v in hyp.items()))
 
         def on_fit_epoch_end(trainer):
-            if _stop_event.is_set():
+            if cancel.is_set() and not trainer.stop:
                 trainer.stop = True
+                _keep_resumable(last)
             ep = trainer.epoch + 1
             try:
                 li  = trainer.loss_items
@@ -244,9 +527,9 @@ def _run_training(yaml_path, epochs, imgsz, batch, size):
             entry = dict(epoch=ep, box_loss=box, cls_loss=cls, dfl_loss=dfl,
                          mAP50=mAP50, mAP50_95=mAP50_95,
                          precision=prec, recall=rec)
-            with _lock:
-                _state.update(entry)
-                _state["history"].append(entry)
+            history.append(entry)
+            _set(**entry)
+            report.append("history", entry)
 
             _log(
                 f"  Ep {ep:>3}/{epochs} | "
@@ -254,6 +537,45 @@ def _run_training(yaml_path, epochs, imgsz, batch, size):
                 f"P={prec} R={rec} mAP50={mAP50} mAP50-95={mAP50_95}"
             )
 
+        # ── CPU / memory resources ────────────────────────────────────────────
+        from utils.dataset import count_images
+        dataset_root = os.path.dirname(os.path.abspath(yaml_path))
+        res = training_resources(
+            cfg["resources"],
+            n_images=count_images(dataset_root),
+            imgsz=imgsz,
+            cuda=DEVICE != "cpu",
+        )
+        for w in apply_torch_threads(res["threads"], res["interop_threads"]):
+            _log(f"⚠️  {w}")
+        try:
+            import ultralytics.data.build as ul_build
+            ul_build.PIN_MEMORY = res["pin_memory"]
+        except (ImportError, AttributeError):
+            pass
+        _log(
+            f"🧵 Resources — cpus={res['cpus']} mem≈{res['mem_available_mb']} MB | "
+            f"workers={res['workers']} threads={res['threads']} "
+            f"interop={res['interop_threads']} pin_memory={res['pin_memory']} "
+            f"cache={res['cache']}"
+        )
+
+        # ── Preprocessed image cache (opt-in: cache="image") ──────────────────
+        trainer = None
+        if res["cache"] == "image":
+            try:
+                from utils.dataset import build_image_cache, cached_trainer
+                t = time.time()
+                _log(f"🗜  Preparing image cache (imgsz={imgsz})…")
+                cache_dir = build_image_cache(dataset_root, imgsz)
+                trainer   = cached_trainer(
+                    cache_dir, dataset_root,
+                    on_attach=lambda ds: _log(f"🗜  {ds.prefix.strip() or 'dataset'} "
+                                              "reading from image cache"))
+                _log(f"🗜  Image cache ready in {time.time() - t:.1f}s → {cache_dir}")
+            except Exception as exc:
+                _log(f"⚠️  Image cache unavailable, decoding from disk: {exc}")
+
         def on_train_end(trainer):
             _log("✅ Training complete — copying result plots…")
 
@@ -261,44 +583,102 @@ def _run_training(yaml_path, epochs, imgsz, batch, size):
         model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
         model.add_callback("on_train_end",     on_train_end)
 
+        # On resume Ultralytics restores every other option from the checkpoint
         model.train(
             data=yaml_path,
             epochs=epochs,
             imgsz=imgsz,
             batch=batch,
-            project="runs/detect",
-            name="custom",
+            project=os.path.abspath(RUNS_ROOT),   # relative projects resolve under Ultralytics' runs_dir
+            name=run_name,
             exist_ok=True,
+            trainer=trainer,
             device=DEVICE,
-            workers=0,
+            workers=res["workers"],
+            cache=False if res["cache"] in ("none", "image") else res["cache"],
             verbose=False,
+            **({"resume": True} if resume else {}),
+            **({"freeze": freeze} if freeze and not resume else {}),
+            **hyp,
         )
+        _restore_resumable(last)
 
         # ── Post-training: copy plots + parse CSV ──────────────────────────────
-        plots  = _copy_plots()
-        hist   = _parse_csv_history()
-        best   = os.path.join(RUNS_DIR, "weights", "best.pt")
-
+        plots  = _copy_plots(run_dir, job_id)
+        hist   = _parse_csv_history(run_dir)
+        best   = os.path.join(run_dir, "weights", "best.pt")
+
+        # ── Optional export to an optimised CPU runtime ───────────────────────
+        # Runs while the dataset snapshot exists so INT8 calibration can read val.
+        if export and os.path.exists(best):
+            from utils.model_manager import export_model
+            if int8 and export != "openvino":
+                _log("⚠️  INT8 is only supported for OpenVINO — exporting FP32.")
+                int8 = False
+            _log(f"📦 Exporting best.pt → {export}{' INT8' if int8 else ''}…")
+            try:
+                out = export_model(best, export, imgsz=imgsz, int8=int8, data=yaml_path)
+                _log(f"📦 Exported → {out}")
+            except Exception as exc:
+                _log(f"⚠️  Export failed (PyTorch weights still usable): {exc}")
+
+        stopped = cancel.is_set()
+        if os.path.exists(best):
+            from utils.model_manager import model_registry
+            model_registry().register(
+                run_name, best, started_at=started, status="stopped" if stopped else "done",
+                hyperparams=dict(model_size=size, epochs=epochs, imgsz=imgsz, batch=batch,
+                                 export=export, int8=int8, sweep=cfg.get("sweep"),
+                                 base_model=cfg.get("base_model"), freeze=freeze, **hyp),
+                metrics=_final_metrics(hist or history),
+            )
+        _log(f"💾 Best weights → {best}")
+        _log(f"📊 {len(plots)} plot(s) saved to {PLOTS_DIR}/{job_id}/")
+        if stopped:
+            _log("⛔ Training stopped by user — weights from completed epochs kept; "
+                 "POST /train/resume continues from last.pt.")
         _set(
-            status="done",
-            epoch=epochs,
+            status="stopped" if stopped else "done",
+            epoch=history[-1]["epoch"] if stopped and history else epochs,
             model_path=best if os.path.exists(best) else None,
             plots=plots,
-            history=hist or _state.get("history", []),
+            history=hist or history,
         )
-        _log(f"💾 Best weights → {best}")
-        _log(f"📊 {len(plots)} plot(s) saved to static/results/plots/")
 
     except Exception as exc:
         import traceback
-        if _stop_event.is_set():
-            _set(status="idle")
+        _restore_resumable(os.path.join(run_dir, "weights", "last.pt"))
+        if cancel.is_set():
+            _set(status="stopped")
             _log("⛔ Training stopped by user.")
         else:
             _set(status="error", error=str(exc))
             _log(f"❌ Error: {exc}")
             _log(traceback.format_exc())
 
-    finally:
-        _stop_event.clear()
-        _cleanup_dataset()
\ No newline at end of file
+
+def _keep_resumable(last: str):
+    """
+    Copy last.pt aside as training is stopped: Ultralytics strips the
+    optimizer state from it in final_eval(), which would make it unresumable.
+    """
+    if os.path.exists(last):
+        shutil.copy2(last, last + ".resume")
+
+
+def _restore_resumable(last: str):
+    if os.path.exists(last + ".resume"):
+        os.replace(last + ".resume", last)
+
+
+_jobs   = JobManager(_run_training, _initial_state, on_finish=_on_job_finish)
+_sweeps = SweepManager(_jobs, _launch_trial, promote=_promote, on_finish=_on_sweep_finish)
+
+registry.gauge("yolo_training_jobs", "Training jobs by status",
+               lambda: {(("status", k),): v for k, v in _jobs.counts().items()})
+registry.gauge("yolo_training_epoch", "Current epoch of running training jobs",
+               lambda: {(("job", j["id"]),): j["epoch"]
+                        for j in _jobs.list_jobs() if j["status"] == "running"})
+registry.gauge("yolo_training_map50_95", "Latest validation mAP50-95 of running jobs",
+               lambda: {(("job", j["id"]),): j["mAP50_95"] for j in _jobs.list_jobs()
+                        if j["status"] == "running" and isinstance(j["mAP50_95"], float)})
@@ -1,11 +1,26 @@
-import os
+import os, json, time, uuid, shutil, hashlib, threading
 from flask import Blueprint, request, jsonify, render_template, current_app
 from werkzeug.utils import secure_filename
-from utils.dataset import extract_labelstudio_zip, build_data_yaml
+from utils.dataset import (extract_labelstudio_zip, build_data_yaml, build_image_cache,
+                           validate_dataset)
+from utils.video import VIDEO_EXTS
 
 upload_bp = Blueprint("upload", __name__)
 
-MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # 10 MB
+MAX_UPLOAD_BYTES  = 10 * 1024 * 1024  # 10 MB — single-request /submit path
+CHUNK_BYTES       = 8 * 1024 * 1024   # must stay below MAX_CONTENT_LENGTH
+MAX_DATASET_BYTES = int(os.environ.get("YOLO_MAX_DATASET_MB", 5120)) * 1_048_576
+COPY_BUFSIZE      = 1024 * 1024
+# Unfinished chunked uploads: idle time before they are swept, and how many may be open
+UPLOAD_TTL_S      = float(os.environ.get("YOLO_UPLOAD_TTL_HOURS", 24)) * 3600
+MAX_OPEN_UPLOADS  = int(os.environ.get("YOLO_MAX_OPEN_UPLOADS", 16))
+MAX_OPEN_PER_IP   = int(os.environ.get("YOLO_MAX_OPEN_UPLOADS_PER_CLIENT", 4))
+# Build the preprocessed image cache right after upload (only training with cache="image" reads it)
+WARM_IMAGE_CACHE  = os.environ.get("YOLO_IMAGE_CACHE_WARM", "0") == "1"
+
+# One lock per in-progress chunked upload
+_locks      = {}
+_locks_lock = threading.Lock()
 
 
 @upload_bp.route("/")
@@ -17,7 +32,9 @@ def index():
         with open("data/datasets/current/data.yaml") as f:
             d = yaml.safe_load(f)
             classes = d.get("names", [])
-    return render_template("upload.html", yaml_exists=yaml_exists, classes=classes)
+    return render_template("upload.html", yaml_exists=yaml_exists, classes=classes,
+                           max_mb=MAX_DATASET_BYTES // 1_048_576,
+                           chunk_bytes=CHUNK_BYTES)
 
 
 @upload_bp.route("/submit", methods=["POST"])
@@ -37,25 +54,166 @@ def submit():
         mb = round(size / 1_048_576, 2)
         return jsonify({
             "error": f"File is {mb} MB — maximum allowed is 10 MB. "
-                     "Try reducing image resolution or splitting the dataset."
+                     "Use the chunked upload (/upload/init) for larger datasets."
         }), 413
 
-    # ── Replace: wipe any previous uploads & dataset ─────────────────────────
-    upload_dir  = current_app.config["UPLOAD_FOLDER"]
-    dataset_dir = os.path.join(current_app.config["DATASET_FOLDER"], "current")
-
-    was_replaced = os.path.exists(dataset_dir)
+    upload_dir = current_app.config["UPLOAD_FOLDER"]
+    _clear_old_zips(upload_dir)
 
-    for old in os.listdir(upload_dir):          # remove old zips
-        try:
-            os.remove(os.path.join(upload_dir, old))
-        except OSError:
-            pass
-
-    # ── Save & extract ────────────────────────────────────────────────────────
     fname    = secure_filename(f.filename)
     zip_path = os.path.join(upload_dir, fname)
     f.save(zip_path)
+    return _ingest(zip_path)
+
+
+# ── Chunked, resumable upload ─────────────────────────────────────────────────
+#   POST /upload/init                {filename, size}          → {upload_id, chunk_size, offset}
+#   GET  /upload/chunk/<id>                                     → {offset, size}   (resume point)
+#   PUT  /upload/chunk/<id>?offset=N raw bytes [X-Chunk-SHA256] → {offset}
+#   POST /upload/finalize/<id>       {sha256?}                  → same as /submit
+# Video files (for /detect/video) use the same flow; finalize then only stores
+# the file and returns {upload_id}, which /detect/video accepts as its input.
+# So does a zip finalized with {"purpose": "batch"} (images for /detect/batch)
+# or {"purpose": "eval"} (a labelled set for /detect/evaluate).
+# Limit: a dataset finalize extracts and validates the zip inside that request,
+# so it holds one server thread until done — seconds for thousands of images
+# (validation runs in a process pool), minutes for very large sets.  Clients
+# should allow a long timeout on finalize; gunicorn's worker timeout does not
+# cut it off (gthread heartbeats from the main thread).
+
+VIDEO_DIR = "videos"      # under UPLOAD_FOLDER
+BATCH_DIR = "batch"       # under UPLOAD_FOLDER
+EVAL_DIR  = "eval"        # under UPLOAD_FOLDER
+ZIP_DIRS  = {"batch": BATCH_DIR, "eval": EVAL_DIR}
+
+@upload_bp.route("/init", methods=["POST"])
+def chunk_init():
+    cfg   = request.json or {}
+    fname = secure_filename(cfg.get("filename", ""))
+    size  = int(cfg.get("size", 0))
+    if not fname.lower().endswith((".zip",) + VIDEO_EXTS):
+        return jsonify({"error": "Please upload a .zip file exported from Label Studio "
+                                 "(or a video for /detect/video)"}), 400
+    if size <= 0 or size > MAX_DATASET_BYTES:
+        return jsonify({
+            "error": f"Size must be between 1 byte and {MAX_DATASET_BYTES // 1_048_576} MB"
+        }), 413
+
+    os.makedirs(_chunk_dir(), exist_ok=True)
+    open_uploads = _sweep_stale_uploads()
+    client       = request.remote_addr or "unknown"
+    if len(open_uploads) >= MAX_OPEN_UPLOADS:
+        return jsonify({"error": "Too many uploads in progress — try again later"}), 429
+    if sum(m.get("client") == client for m in open_uploads) >= MAX_OPEN_PER_IP:
+        return jsonify({"error": f"At most {MAX_OPEN_PER_IP} unfinished uploads per client — "
+                                 "finish or resume one first"}), 429
+
+    upload_id = uuid.uuid4().hex
+    meta = {"filename": fname, "size": size, "client": client}
+    with open(_meta_path(upload_id), "w") as f:
+        json.dump(meta, f)
+    open(_part_path(upload_id), "wb").close()
+    return jsonify({"upload_id": upload_id, "chunk_size": CHUNK_BYTES, "offset": 0})
+
+
+@upload_bp.route("/chunk/<upload_id>", methods=["GET"])
+def chunk_status(upload_id):
+    meta = _load_meta(upload_id)
+    if meta is None:
+        return jsonify({"error": "Unknown upload"}), 404
+    return jsonify({"offset": os.path.getsize(_part_path(upload_id)), "size": meta["size"]})
+
+
+@upload_bp.route("/chunk/<upload_id>", methods=["PUT"])
+def chunk_put(upload_id):
+    meta = _load_meta(upload_id)
+    if meta is None:
+        return jsonify({"error": "Unknown upload"}), 404
+
+    offset = int(request.args.get("offset", -1))
+    digest = request.headers.get("X-Chunk-SHA256")
+    part   = _part_path(upload_id)
+
+    with _lock_for(upload_id):
+        current = os.path.getsize(part)
+        if offset != current:
+            # Client is out of sync (retry / resume) — tell it where to continue
+            return jsonify({"error": "Offset mismatch", "offset": current}), 409
+
+        h     = hashlib.sha256()
+        wrote = 0
+        with open(part, "r+b") as f:
+            f.seek(offset)
+            while True:
+                buf = request.stream.read(COPY_BUFSIZE)
+                if not buf:
+                    break
+                wrote += len(buf)
+                if offset + wrote > meta["size"] or wrote > CHUNK_BYTES:
+                    f.truncate(offset)
+                    return jsonify({"error": "Chunk exceeds declared size",
+                                    "offset": offset}), 413
+                h.update(buf)
+                f.write(buf)
+            if digest and digest.lower() != h.hexdigest():
+                f.truncate(offset)
+                return jsonify({"error": "Chunk checksum mismatch", "offset": offset}), 422
+
+    return jsonify({"offset": offset + wrote, "size": meta["size"]})
+
+
+@upload_bp.route("/finalize/<upload_id>", methods=["POST"])
+def chunk_finalize(upload_id):
+    meta = _load_meta(upload_id)
+    if meta is None:
+        return jsonify({"error": "Unknown upload"}), 404
+
+    part = _part_path(upload_id)
+    with _lock_for(upload_id):
+        have = os.path.getsize(part)
+        if have != meta["size"]:
+            return jsonify({"error": f"Upload incomplete ({have} / {meta['size']} bytes)",
+                            "offset": have}), 409
+
+        expected = ((request.json or {}).get("sha256") or "").lower()
+        if expected:
+            h = hashlib.sha256()
+            with open(part, "rb") as f:
+                for buf in iter(lambda: f.read(COPY_BUFSIZE), b""):
+                    h.update(buf)
+            if h.hexdigest() != expected:
+                _discard(upload_id)
+                return jsonify({"error": "Checksum mismatch — please re-upload"}), 422
+
+        upload_dir = current_app.config["UPLOAD_FOLDER"]
+        ext        = os.path.splitext(meta["filename"])[1].lower()
+        purpose    = (request.json or {}).get("purpose", "dataset")
+        if ext in VIDEO_EXTS or (ext == ".zip" and purpose in ZIP_DIRS):
+            store_dir = os.path.join(upload_dir, VIDEO_DIR if ext in VIDEO_EXTS else ZIP_DIRS[purpose])
+            os.makedirs(store_dir, exist_ok=True)
+            os.replace(part, os.path.join(store_dir, f"{upload_id}{ext}"))
+            _discard(upload_id)
+            return jsonify({"success": True, "upload_id": upload_id,
+                            "filename": meta["filename"], "size": meta["size"]})
+
+        _clear_old_zips(upload_dir)
+        zip_path = os.path.join(upload_dir, meta["filename"])
+        os.replace(part, zip_path)
+        _discard(upload_id)
+
+    return _ingest(zip_path)
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _ingest(zip_path: str):
+    """
+    Extract a saved zip into the current dataset, validate it and build
+    data.yaml.  A dataset with corrupt images or bad labels is removed again
+    and answered with 422 plus the validation report.
+    """
+    dataset_dir  = os.path.join(current_app.config["DATASET_FOLDER"], "current")
+    was_replaced = os.path.exists(dataset_dir)
 
     try:
         info = extract_labelstudio_zip(zip_path, dataset_dir)
@@ -73,9 +231,25 @@ def submit():
             "error": "Could not find class names. Make sure classes.txt is in the zip."
         }), 400
 
+    try:
+        report = validate_dataset(dataset_dir, info["num_classes"])
+    except Exception as e:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        return jsonify({"error": f"Validation failed: {str(e)}"}), 500
+    if not report["ok"]:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        return jsonify({
+            "error":      f"Dataset rejected: {report['errors']} problem(s) in images or labels",
+            "validation": report,
+        }), 422
+
     yaml_path = os.path.join(dataset_dir, "data.yaml")
     build_data_yaml(dataset_dir, info["classes"], yaml_path)
 
+    # Pre-decode at the default imgsz in the background for jobs run with cache="image"
+    if WARM_IMAGE_CACHE:
+        threading.Thread(target=_warm_image_cache, args=(dataset_dir,), daemon=True).start()
+
     return jsonify({
         "success":     True,
         "replaced":    was_replaced,
@@ -84,4 +258,85 @@ def submit():
         "image_count": info["image_count"],
         "train_count": info["train_count"],
         "val_count":   info["val_count"],
-    })
\ No newline at end of file
+        "validation":  report,
+    })
+
+
+def _warm_image_cache(dataset_dir: str):
+    try:
+        build_image_cache(dataset_dir, 640)
+    except Exception as exc:
+        print(f"[cache] preprocessing skipped: {exc}")
+
+
+def _clear_old_zips(upload_dir: str):
+    for old in os.listdir(upload_dir):          # remove old zips
+        path = os.path.join(upload_dir, old)
+        if os.path.isfile(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _chunk_dir() -> str:
+    return os.path.join(current_app.config["UPLOAD_FOLDER"], "chunks")
+
+
+def _part_path(upload_id: str) -> str:
+    return os.path.join(_chunk_dir(), f"{upload_id}.part")
+
+
+def _meta_path(upload_id: str) -> str:
+    return os.path.join(_chunk_dir(), f"{upload_id}.json")
+
+
+def _load_meta(upload_id: str) -> dict | None:
+    if not upload_id.isalnum() or not os.path.exists(_part_path(upload_id)):
+        return None
+    try:
+        with open(_meta_path(upload_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _sweep_stale_uploads() -> list:
+    """
+    Discard chunked uploads idle for longer than UPLOAD_TTL_S (no chunk
+    written since) and return the metadata of those still open.
+    """
+    now, alive = time.time(), []
+    ids = {os.path.splitext(n)[0] for n in os.listdir(_chunk_dir()) if n.endswith((".json", ".part"))}
+    for upload_id in ids:
+        paths = [p for p in (_meta_path(upload_id), _part_path(upload_id)) if os.path.exists(p)]
+        try:
+            idle = now - max(os.path.getmtime(p) for p in paths)
+        except (OSError, ValueError):            # gone meanwhile
+            continue
+        meta = _load_meta(upload_id)
+        if meta is None or len(paths) < 2:     # orphaned half of an upload
+            if idle > 60:                       # … unless init is still writing it
+                with _lock_for(upload_id):
+                    _discard(upload_id)
+        elif idle > UPLOAD_TTL_S:
+            with _lock_for(upload_id):
+                _discard(upload_id)
+        else:
+            alive.append(meta)
+    return alive
+
+
+def _lock_for(upload_id: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+
+def _discard(upload_id: str):
+    for path in (_part_path(upload_id), _meta_path(upload_id)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    with _locks_lock:
+        _locks.pop(upload_id, None)
@@ -0,0 +1,213 @@
+import os, glob, traceback
+from flask import Blueprint, request, jsonify, send_file, current_app
+from werkzeug.utils import secure_filename
+from routes.detect import DEVICE, _resolve_model, _yolo, _detections
+from routes.upload import VIDEO_DIR
+from utils.jobs import JobManager, new_job_id
+from utils.metrics import registry
+from utils.sse import job_stream
+from utils.video import VIDEO_EXTS, check_stream_url, process_video
+
+video_bp = Blueprint("video", __name__)
+
+# ── Video detection jobs ──────────────────────────────────────────────────────
+# Each POST /detect/video becomes a job run in its own worker process, with the
+# same queue, status records and SSE progress as training jobs.
+
+VIDEO_ROOT    = "runs/video"      # <job_id>/detections.jsonl, annotated.mp4
+VIDEO_WORKERS = int(os.environ.get("YOLO_VIDEO_WORKERS", 1))
+MAX_BATCH     = 32
+
+
+def _initial_state(cfg: dict) -> dict:
+    return {
+        "frames":       0,
+        "total_frames": None,
+        "fps":          None,
+        "source":       cfg["label"],
+        "model_source": cfg["model_label"],
+        "outputs":      {},
+        "error":        None,
+    }
+
+
+def _on_job_finish(rec: dict):
+    if rec["config"].get("cleanup"):
+        try:
+            os.remove(rec["config"]["source"])
+        except OSError:
+            pass
+
+
+def _video_opts(cfg) -> dict:
+    """
+    Processing options of a form / JSON body → job config fields.  Raises
+    ValueError (→ 400) for any malformed field.
+    """
+    try:
+        opts = dict(
+            conf=float(cfg.get("conf", 0.25)),
+            stride=max(1, int(cfg.get("stride", 1))),
+            batch=min(MAX_BATCH, max(1, int(cfg.get("batch", 8)))),
+            max_frames=max(0, int(cfg.get("max_frames", 0))),
+            priority=int(cfg.get("priority", 0)),
+        )
+    except (TypeError, ValueError):
+        raise ValueError("conf, stride, batch, max_frames and priority must be numbers") from None
+    opts["annotate"] = str(cfg.get("annotate", "")).lower() in ("1", "true", "yes")
+    return opts
+
+
+# ── Routes ────────────────────────────────────────────────────────────────────
+
+@video_bp.route("", methods=["POST"])
+def submit():
+    """
+    Queue a video for detection.
+
+    Input (one of): multipart `video` file; `upload_id` of a video sent via
+    the chunked upload; `url` of an http(s) / rtsp / rtmp stream on a public
+    host or one allowlisted in YOLO_STREAM_HOSTS (loopback / private
+    addresses, e.g. LAN cameras, are only reachable that way).  Options
+    (form or JSON): conf, model_path, backend, stride (keep every N-th
+    frame), batch, annotate (also write an annotated MP4), max_frames
+    (required for live streams to end on their own), priority.  They are
+    validated before the upload is saved, so a bad option leaves no file.
+    """
+    cfg       = request.get_json(silent=True) or request.form
+    job_id    = new_job_id()
+    input_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], VIDEO_DIR)
+    try:
+        opts = _video_opts(cfg)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    if "video" in request.files:
+        f   = request.files["video"]
+        ext = os.path.splitext(f.filename or "")[1].lower()
+        if ext not in VIDEO_EXTS:
+            return jsonify({"error": f"Unsupported video type — use one of {', '.join(VIDEO_EXTS)}"}), 400
+        os.makedirs(input_dir, exist_ok=True)
+        source  = os.path.join(input_dir, f"{job_id}{ext}")
+        f.save(source)
+        label   = secure_filename(f.filename)
+        cleanup = True
+    elif cfg.get("upload_id"):
+        upload_id = str(cfg["upload_id"])
+        found     = glob.glob(os.path.join(input_dir, f"{upload_id}.*")) if upload_id.isalnum() else []
+        if not found:
+            return jsonify({"error": "Unknown upload_id — finalize the chunked upload first"}), 404
+        source, label, cleanup = found[0], os.path.basename(found[0]), True
+    elif cfg.get("url"):
+        source = str(cfg["url"])
+        try:
+            check_stream_url(source)
+        except PermissionError as exc:
+            return jsonify({"error": str(exc)}), 403
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        label, cleanup = source, False
+    else:
+        return jsonify({"error": "Provide a video file, upload_id or url"}), 400
+
+    target, model_label = _resolve_model(cfg.get("model_path") or None,
+                                         cfg.get("backend") or None)
+    priority = opts.pop("priority")
+    job_cfg  = dict(
+        job_id=job_id, source=source, label=label, cleanup=cleanup,
+        target=target, model_label=model_label, **opts,
+    )
+    _jobs.submit(job_cfg, priority=priority, job_id=job_id)
+    return jsonify({
+        "success":        True,
+        "job_id":         job_id,
+        "queue_position": _jobs.queue_position(job_id),
+    })
+
+
+@video_bp.route("/jobs")
+def jobs():
+    return jsonify({"jobs": _jobs.list_jobs(), "counts": _jobs.counts()})
+
+
+@video_bp.route("/<job_id>")
+def status(job_id):
+    snap = _jobs.snapshot(job_id)
+    if snap is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    snap["log"] = snap["log"][-30:]
+    return jsonify(snap)
+
+
+@video_bp.route("/<job_id>/progress")
+def progress(job_id):
+    """SSE stream — a snapshot, then deltas (see utils.sse)."""
+    if _jobs.snapshot(job_id) is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return job_stream(_jobs, job_id)
+
+
+@video_bp.route("/<job_id>/stop", methods=["POST"])
+def stop(job_id):
+    if not _jobs.cancel(job_id, force=request.args.get("force") == "1"):
+        return jsonify({"error": "No such queued or running job"}), 400
+    return jsonify({"success": True, "job_id": job_id})
+
+
+@video_bp.route("/<job_id>/detections")
+def detections(job_id):
+    """Per-frame detections as JSON Lines (grows while the job runs)."""
+    return _output(job_id, "detections.jsonl", "application/x-ndjson")
+
+
+@video_bp.route("/<job_id>/video")
+def annotated(job_id):
+    return _output(job_id, "annotated.mp4", "video/mp4")
+
+
+def _output(job_id: str, name: str, mimetype: str):
+    if _jobs.snapshot(job_id) is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    path = os.path.join(VIDEO_ROOT, job_id, name)
+    if not os.path.exists(path):
+        return jsonify({"error": f"{name} not available for this job"}), 404
+    return send_file(os.path.abspath(path), mimetype=mimetype, conditional=True)
+
+
+# ── Background processing ─────────────────────────────────────────────────────
+
+def _summarize(result) -> dict:
+    dets = _detections(result)
+    return {"detections": dets, "count": len(dets)}
+
+
+def _run_video(job_id: str, cfg: dict, report, cancel):
+    """Worker-process entry point: runs one video through the detector."""
+    try:
+        report.log(f"🎞  {cfg['label']} — stride={cfg['stride']} batch={cfg['batch']}"
+                   f"{' +mp4' if cfg['annotate'] else ''}")
+        model = _yolo(cfg["target"])
+        report.log(f"✓ Model loaded: {cfg['model_label']}")
+
+        def predict(frames):
+            return model.predict(source=frames, conf=cfg["conf"], device=DEVICE, verbose=False)
+
+        summary = process_video(
+            cfg["source"], os.path.join(VIDEO_ROOT, job_id), predict, _summarize,
+            stride=cfg["stride"], batch=cfg["batch"], annotate=cfg["annotate"],
+            max_frames=cfg["max_frames"], on_progress=report.set, cancel=cancel,
+        )
+        report.log(f"✅ {summary['frames']} frames in {summary['elapsed_s']}s "
+                   f"({summary['fps']} fps)")
+        report.set(status="stopped" if cancel.is_set() else "done")
+    except Exception as exc:
+        report.set(status="error", error=str(exc))
+        report.log(f"❌ Error: {exc}")
+        report.log(traceback.format_exc())
+
+
+_jobs = JobManager(_run_video, _initial_state, max_workers=VIDEO_WORKERS, pin_cores=False,
+                   on_finish=_on_job_finish, store_dir=os.path.join(VIDEO_ROOT, "jobs"))
+
+registry.gauge("yolo_video_jobs", "Video detection jobs by status",
+               lambda: {(("status", k),): v for k, v in _jobs.counts().items()})
@@ -0,0 +1,67 @@
+import types
+import pytest
+
+import utils.adaptive as adaptive
+from utils.adaptive import COOLDOWN, MAX_INTERVAL, MIN_INTERVAL, QUALITIES, SIZES, AdaptiveController
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(adaptive, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_overload_steps_down_once_per_cooldown(clock):
+    ctl = AdaptiveController(target_ms=100)
+    top = len(SIZES) - 1
+    ctl.observe(0.300)
+    assert ctl.level == top - 1
+    ctl.observe(0.300)                           # within the cooldown: held
+    assert ctl.level == top - 1
+    for _ in range(len(SIZES) + 2):
+        clock[0] += COOLDOWN
+        ctl.observe(0.300)
+    assert ctl.level == 0                        # floors at the lowest level
+
+
+def test_recovers_only_when_well_under_target(clock):
+    ctl = AdaptiveController(target_ms=100)
+    ctl.level = 0
+    clock[0] += COOLDOWN
+    ctl.observe(0.080)                           # load 0.8: neither over nor comfortably under
+    assert ctl.level == 0
+    ctl.ewma_ms = None
+    ctl.observe(0.020)                           # load 0.2 < UP_LOAD
+    assert ctl.level == 1
+
+
+def test_queue_depth_counts_as_load(clock):
+    depth = [0]
+    ctl   = AdaptiveController(lambda: depth[0], target_ms=100, queue_soft=4)
+    depth[0] = 8
+    ctl.observe(0.010)                           # fast frames, but a full queue
+    assert ctl.level == len(SIZES) - 2
+    assert ctl.load() == 2.0
+
+
+def test_ewma(clock):
+    ctl = AdaptiveController(target_ms=1000)
+    ctl.observe(0.100)
+    ctl.observe(0.200)
+    assert ctl.ewma_ms == pytest.approx(0.2 * 200 + 0.8 * 100)
+
+
+def test_recommend_caps_size_and_interval(clock):
+    ctl = AdaptiveController(target_ms=100)
+    rec = ctl.recommend()
+    assert rec == {"interval_ms": MIN_INTERVAL, "size": SIZES[-1],
+                   "quality": QUALITIES[-1], "level": len(SIZES) - 1}
+    # The model's imgsz caps the advertised width
+    assert ctl.recommend(max_size=416)["size"] == 416
+    assert ctl.recommend(max_size=100)["size"] == SIZES[0]
+
+    ctl.ewma_ms = 200.0                          # load 2 → interval 200 × 2 × 1.1
+    assert ctl.recommend()["interval_ms"] == 440
+    ctl.ewma_ms = 5000.0
+    assert ctl.recommend()["interval_ms"] == MAX_INTERVAL
@@ -0,0 +1,97 @@
+import threading
+import pytest
+from utils.batching import InferenceBatcher, Overloaded
+
+
+class Recorder:
+    """run_batch stand-in: records each call, echoes (key, image) per input."""
+
+    def __init__(self, gate: threading.Event | None = None):
+        self.calls   = []
+        self.gate    = gate
+        self.started = threading.Event()
+
+    def __call__(self, key, images):
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.calls.append((key, list(images)))
+        return [(key, img) for img in images]
+
+
+def _submit_all(batcher, jobs):
+    """Submit (key, image) pairs from one thread each; returns results by index."""
+    out, threads = {}, []
+    for i, (key, img) in enumerate(jobs):
+        def run(i=i, key=key, img=img):
+            out[i] = batcher.submit(key, img, timeout=5)
+        threads.append(threading.Thread(target=run))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return out
+
+
+def test_concurrent_submits_share_one_call():
+    run     = Recorder()
+    batcher = InferenceBatcher(run, window_ms=200, max_batch=8)
+    out     = _submit_all(batcher, [("m", i) for i in range(4)])
+    assert out == {i: ("m", i) for i in range(4)}
+    assert len(run.calls) == 1 and sorted(run.calls[0][1]) == [0, 1, 2, 3]
+
+
+def test_groups_by_key():
+    run     = Recorder()
+    batcher = InferenceBatcher(run, window_ms=200, max_batch=8)
+    out     = _submit_all(batcher, [("a", 1), ("b", 2), ("a", 3)])
+    assert out == {0: ("a", 1), 1: ("b", 2), 2: ("a", 3)}
+    assert sorted((key, sorted(imgs)) for key, imgs in run.calls) == [("a", [1, 3]), ("b", [2])]
+
+
+def test_max_batch_splits_calls():
+    run     = Recorder()
+    batcher = InferenceBatcher(run, window_ms=50, max_batch=3)
+    assert batcher.submit_many("m", list(range(7)), timeout=5) == [("m", i) for i in range(7)]
+    assert all(len(imgs) <= 3 for _, imgs in run.calls)
+    assert sum(len(imgs) for _, imgs in run.calls) == 7
+
+
+def test_full_queue_raises_overloaded():
+    gate    = threading.Event()
+    run     = Recorder(gate)
+    batcher = InferenceBatcher(run, window_ms=0, max_batch=1, max_pending=2)
+    busy    = threading.Thread(target=batcher.submit, args=("m", 0), kwargs={"timeout": 5})
+    busy.start()
+    assert run.started.wait(5)                    # the worker is now blocked inside run_batch
+    waiting = [threading.Thread(target=batcher.submit, args=("m", i), kwargs={"timeout": 5})
+               for i in (1, 2)]
+    for t in waiting:
+        t.start()
+    for _ in range(500):                          # until both sit in the queue
+        if batcher.qsize() == 2:
+            break
+        threading.Event().wait(0.01)
+    assert batcher.qsize() == 2
+    with pytest.raises(Overloaded):
+        batcher.submit("m", 3)
+    with pytest.raises(Overloaded):               # all-or-nothing
+        batcher.submit_many("m", [4, 5])
+    gate.set()
+    for t in [busy, *waiting]:
+        t.join(5)
+    assert sorted(i for _, imgs in run.calls for i in imgs) == [0, 1, 2]
+
+
+def test_errors_reach_every_caller():
+    def boom(key, images):
+        raise ValueError("model failed")
+    batcher = InferenceBatcher(boom, window_ms=0)
+    with pytest.raises(ValueError, match="model failed"):
+        batcher.submit("m", 0, timeout=5)
+
+
+def test_short_result_list_fails_instead_of_hanging():
+    batcher = InferenceBatcher(lambda key, images: images[:-1], window_ms=50, max_batch=8)
+    with pytest.raises(RuntimeError, match="2 results for 3 images"):
+        batcher.submit_many("m", [0, 1, 2], timeout=5)
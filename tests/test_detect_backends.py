@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("torch")
+
+import routes.detect as detect
+from utils.model_manager import ModelCache
+
+
+class FakeModel:
+    """Stands in for a loaded YOLO model; predict() reports which weights ran."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def predict(self, source, **kw):
+        return [self.path for _ in source]
+
+
+@pytest.fixture
+def exported(tmp_path, monkeypatch):
+    """best.pt with ONNX and OpenVINO exports next to it, and a fake model cache."""
+    pt = tmp_path / "best.pt"
+    pt.write_bytes(b"pt")
+    (tmp_path / "best.onnx").write_bytes(b"onnx")
+    (tmp_path / "best_openvino_model").mkdir()
+    monkeypatch.setattr(detect, "_models", ModelCache(FakeModel, sizer=lambda m, p: 0))
+    return str(pt), tmp_path
+
+
+@pytest.mark.parametrize("backend, expected", [
+    ("pytorch",  "best.pt"),
+    ("onnx",     "best.onnx"),
+    ("openvino", "best_openvino_model"),
+    ("auto",     "best_openvino_model"),
+])
+def test_batched_predict_runs_the_requested_runtime(exported, backend, expected):
+    pt, root = exported
+    target, _ = detect._resolve_model(pt, backend)
+    assert target == str(root / expected)
+    img = np.zeros((32, 32, 3), np.uint8)
+    assert detect._batcher.submit_many((target, 0.25), [img, img], timeout=5) == [target] * 2
+    assert detect._batcher.submit((target, 0.25), img, timeout=5) == target
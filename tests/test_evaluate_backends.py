@@ -0,0 +1,109 @@
+import io, zipfile
+import numpy as np
+import pytest
+
+flask = pytest.importorskip("flask")
+torch = pytest.importorskip("torch")
+cv2   = pytest.importorskip("cv2")
+
+import routes.detect as detect
+import routes.evaluate as evaluate
+from utils.model_manager import ModelCache
+
+GT = [16.0, 16.0, 48.0, 48.0]           # "0 0.5 0.5 0.5 0.5" on a 64 × 64 image
+# What each runtime's fake model predicts for every image
+PREDICTS = {
+    "best.pt":             [GT],                        # perfect
+    "best.onnx":           [[0.0, 0.0, 8.0, 8.0]],      # always wrong
+    "best_openvino_model": [],                          # finds nothing
+}
+
+
+class Boxes:
+    def __init__(self, xyxy):
+        n         = len(xyxy)
+        self.xyxy = torch.tensor(xyxy, dtype=torch.float32).reshape(n, 4)
+        self.conf = torch.full((n,), 0.9)
+        self.cls  = torch.zeros(n)
+
+    def __len__(self):
+        return len(self.xyxy)
+
+
+class FakeModel:
+    loads = []
+
+    def __init__(self, path):
+        self.name = path.replace("\\", "/").rsplit("/", 1)[-1]
+        FakeModel.loads.append(self.name)
+
+    def predict(self, source, **kw):
+        return [type("Result", (), {"boxes": Boxes(PREDICTS[self.name]), "names": {0: "cat"}})()
+                for _ in source]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)                          # EVAL_ROOT is relative
+    FakeModel.loads = []
+    monkeypatch.setattr(detect, "_models", ModelCache(FakeModel, sizer=lambda m, p: 0))
+    app = flask.Flask(__name__)
+    app.config.update(UPLOAD_FOLDER=str(tmp_path / "uploads"))
+    app.register_blueprint(evaluate.eval_bp, url_prefix="/detect/evaluate")
+    return app.test_client()
+
+
+@pytest.fixture
+def weights(tmp_path):
+    pt = tmp_path / "run" / "best.pt"
+    pt.parent.mkdir()
+    pt.write_bytes(b"pt")
+    (pt.parent / "best.onnx").write_bytes(b"onnx")
+    (pt.parent / "best_openvino_model").mkdir()
+    return str(pt)
+
+
+def _zip():
+    buf = io.BytesIO()
+    png = cv2.imencode(".png", np.zeros((64, 64, 3), np.uint8))[1].tobytes()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("classes.txt", "cat\n")
+        for i in range(3):
+            z.writestr(f"images/val/{i}.png", png)
+            z.writestr(f"labels/val/{i}.txt", "0 0.5 0.5 0.5 0.5\n")
+    buf.seek(0)
+    return buf
+
+
+def test_each_run_is_scored_with_its_own_runtime(client, weights):
+    r = client.post("/detect/evaluate", content_type="multipart/form-data", data={
+        "zip": (_zip(), "eval.zip"), "model_path": weights,
+        "backends": "pytorch,onnx,openvino", "batch": "2"})
+    assert r.status_code == 200, r.json
+    runs = {run["backend"]: run for run in r.json["results"]}
+
+    for backend, name, runtime in (("pytorch",  "best.pt",             "pytorch"),
+                                   ("onnx",     "best.onnx",           "onnx"),
+                                   ("openvino", "best_openvino_model", "openvino")):
+        assert runs[backend]["model"].endswith(name)
+        assert runs[backend]["runtime"] == runtime
+    assert sorted(FakeModel.loads) == sorted(PREDICTS)   # each runtime loaded once, as is
+
+    # Scores come from the model each run names, not a re-resolved one
+    assert runs["pytorch"]["mAP50"] > 0.99
+    assert runs["onnx"]["mAP50"] == runs["openvino"]["mAP50"] == 0.0
+    assert runs["onnx"]["confusion_matrix"]["matrix"] == [[0, 3], [3, 0]]
+    assert runs["openvino"]["confusion_matrix"]["matrix"] == [[0, 0], [3, 0]]
+    assert runs["onnx"]["vs_baseline"]["mAP50_delta"] < -0.99
+
+
+def test_missing_export_reuses_the_pytorch_run(client, tmp_path):
+    pt = tmp_path / "solo" / "best.pt"
+    pt.parent.mkdir()
+    pt.write_bytes(b"pt")
+    r = client.post("/detect/evaluate", content_type="multipart/form-data", data={
+        "zip": (_zip(), "eval.zip"), "model_path": str(pt), "backends": "pytorch,onnx"})
+    assert r.status_code == 200, r.json
+    pytorch, onnx = r.json["results"]
+    assert onnx["same_as"] == "pytorch" and onnx["model"] == pytorch["model"] == str(pt)
+    assert FakeModel.loads == ["best.pt"]
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from utils.evaluation import IOU_THRESHOLDS, Evaluator, match_predictions
+
+
+def _arr(*boxes):
+    return np.array(boxes, np.float32).reshape(-1, 4)
+
+
+def test_match_predictions_is_greedy_one_to_one():
+    # Two predictions on one object: only the better-overlapping one is a TP
+    iou = np.array([[0.9, 0.6]])
+    tp  = match_predictions(np.array([0, 0]), np.array([0]), iou, np.array([0.5, 0.7]))
+    assert tp.tolist() == [[True, True], [False, False]]
+    # Wrong class never matches
+    assert not match_predictions(np.array([1]), np.array([0]), np.array([[1.0]])).any()
+
+
+def test_hand_computed_map_and_confusion():
+    """
+    Image A: two objects and three predictions — exact (conf .9), IoU 100/120
+    = .833 (conf .8), and a false positive (conf .7).  Image B: one missed
+    object.  With 3 ground truths, the ranked TP / FP sequence is:
+      IoU ≤ .80 (7 of the 10 thresholds): TP TP FP → recall 1/3 2/3 2/3, precision 1 1 2/3
+      IoU ≥ .85 (3 thresholds):           TP FP FP → recall 1/3 1/3 1/3, precision 1 .5 1/3
+    COCO 101-point AP (trapezoids over the interpolated envelope):
+      first:  .66 (flat at 1) + .0083 (.66→.67) + .33² (2(1−r) from .67 to 1) = .7772
+      second: .33 + .00665 + .66²/4 ((1−r)/2 from .34 to 1)                    = .44555
+    mAP50-95 = (7 × .7772 + 3 × .44555) / 10 = .6777
+    """
+    assert int((IOU_THRESHOLDS <= 100 / 120).sum()) == 7
+    ev = Evaluator(["cat"])
+    ev.add(_arr([0, 0, 10, 10], [20, 20, 30, 32], [50, 50, 60, 60]),
+           np.array([0.9, 0.8, 0.7]), np.array([0, 0, 0]),
+           _arr([0, 0, 10, 10], [20, 20, 30, 30]), np.array([0, 0]))
+    ev.add(_arr(), np.zeros(0), np.zeros(0, np.int64), _arr([0, 0, 10, 10]), np.array([0]))
+
+    s = ev.summary()
+    assert (s["images"], s["instances"]) == (2, 3)
+    assert s["mAP50"] == pytest.approx(0.7772, abs=1e-4)
+    assert s["mAP50_95"] == pytest.approx(0.6777, abs=1e-4)
+    # Best F1 sits between the .8 and .7 predictions: everything above is right, 2 of 3 found
+    assert s["precision"] == pytest.approx(1.0, abs=0.01)
+    assert s["recall"] == pytest.approx(2 / 3, abs=0.01)
+    # rows: predicted, columns: true — 2 matched, 1 false positive, 1 missed
+    assert s["confusion_matrix"]["matrix"] == [[2, 1], [1, 0]]
+
+
+def test_confusion_matrix_counts_class_mixups_above_cm_conf():
+    ev = Evaluator(["cat", "dog"])
+    ev.add(_arr([0, 0, 10, 10], [20, 20, 30, 30], [40, 40, 50, 50]),
+           np.array([0.9, 0.8, 0.1]), np.array([1, 0, 0]),       # cat called dog; .1 is ignored
+           _arr([0, 0, 10, 10], [20, 20, 30, 30], [40, 40, 50, 50]), np.array([0, 0, 1]))
+    s = ev.summary()
+    assert s["confusion_matrix"]["labels"] == ["cat", "dog", "background"]
+    assert s["confusion_matrix"]["matrix"] == [[1, 0, 0],
+                                               [1, 0, 0],
+                                               [0, 1, 0]]
+    assert [c["instances"] for c in s["per_class"]] == [2, 1]
+    assert s["per_class"][1]["mAP50"] == 0.0
@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from utils.dataset import ImageCache, attach_image_cache, build_image_cache
+
+IMGSZ = 64
+
+
+@pytest.fixture
+def dataset_root(tmp_path):
+    root = tmp_path / "ds"
+    rng  = np.random.default_rng(0)
+    (root / "images" / "train").mkdir(parents=True)
+    (root / "labels" / "train").mkdir(parents=True)
+    for i in range(6):
+        # odd sizes, so rounding vs ceil would give different shapes
+        im = rng.integers(0, 255, (91 + 7 * i, 131, 3), dtype=np.uint8)
+        cv2.imwrite(str(root / "images" / "train" / f"{i}.jpg"), im)
+        (root / "labels" / "train" / f"{i}.txt").write_text("0 0.5 0.5 0.3 0.3\n")
+    return root
+
+
+def test_cache_is_reused(dataset_root, tmp_path):
+    first  = build_image_cache(str(dataset_root), IMGSZ, str(tmp_path / "cache"))
+    second = build_image_cache(str(dataset_root), IMGSZ, str(tmp_path / "cache"))
+    assert first == second
+    assert len(ImageCache(first).images) == 6
+    assert not list((tmp_path / "cache").glob("*.tmp*"))
+
+
+def _train_dataset(root: Path):
+    pytest.importorskip("ultralytics")
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data.build import build_yolo_dataset
+    cfg = get_cfg(overrides=dict(imgsz=IMGSZ, mosaic=1.0, mixup=0.5, cache=False))
+    return build_yolo_dataset(cfg, str(root / "images" / "train"), 2,
+                              {"names": {0: "a"}, "nc": 1, "channels": 3}, mode="train")
+
+
+def test_cached_pixels_match_ultralytics(dataset_root, tmp_path):
+    ds    = _train_dataset(dataset_root)
+    cache = ImageCache(build_image_cache(str(dataset_root), IMGSZ, str(tmp_path / "cache")))
+    for i, f in enumerate(ds.im_files):
+        im, hw0, hw = cache.get(Path(os.path.relpath(f, dataset_root)).as_posix())
+        ref, ref_hw0, ref_hw = ds.load_image(i)
+        ds.ims[i] = None                                  # undo the stock loader's buffering
+        assert (hw0, hw) == (ref_hw0, ref_hw)
+        assert np.array_equal(im, ref)
+
+
+def test_mosaic_samples_through_cached_dataset(dataset_root, tmp_path):
+    ds = _train_dataset(dataset_root)
+    assert attach_image_cache(ds, build_image_cache(str(dataset_root), IMGSZ,
+                                                    str(tmp_path / "cache")), str(dataset_root))
+    decoded = []
+    stock   = ds.load_image.fallback
+    ds.load_image.fallback = lambda i, *a, **k: decoded.append(ds.ims[i] is None) or stock(i, *a, **k)
+
+    for i in range(len(ds)):
+        sample = ds[i]                                    # mosaic draws from ds.buffer
+        assert tuple(sample["img"].shape) == (3, IMGSZ, IMGSZ)
+    assert ds.buffer                                      # hits fill the mosaic buffer
+    assert not any(decoded)                               # … and nothing was decoded from disk
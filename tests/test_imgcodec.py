@@ -0,0 +1,85 @@
+import threading
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from utils.imgcodec import decode_image, encode_jpeg, jpeg_size, thumbnail
+
+
+def _scene(h, w, shift=0):
+    """Smooth BGR gradient — survives JPEG with little error."""
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    return np.dstack([(x + shift) * 255 / w, y * 255 / h, (x + y) * 127 / (w + h)]).astype(np.uint8)
+
+
+def _diff(a, b):
+    return float(np.abs(a.astype(np.int16) - b.astype(np.int16)).mean())
+
+
+def test_jpeg_size_reads_the_header():
+    raw = encode_jpeg(_scene(90, 130)).tobytes()
+    assert jpeg_size(raw) == (130, 90)
+    assert jpeg_size(cv2.imencode(".png", _scene(9, 13))[1].tobytes()) is None
+    assert jpeg_size(raw[:20]) is None
+
+
+def test_round_trip():
+    src = _scene(120, 160)
+    buf = encode_jpeg(src, quality=95)
+    assert buf.ndim == 1 and buf.dtype == np.uint8
+    out = decode_image(buf.tobytes())
+    assert out.shape == src.shape and out.flags["C_CONTIGUOUS"]
+    assert _diff(out, src) < 2
+
+
+@pytest.mark.parametrize("w, h, max_w", [(1280, 720, 320), (1280, 720, 500), (641, 479, 640)])
+def test_max_w_downscale_matches_a_full_resize(w, h, max_w):
+    src = _scene(h, w)
+    raw = encode_jpeg(src, quality=95).tobytes()
+    out = decode_image(raw, max_w)
+    ref = cv2.resize(src, (max_w, round(h * max_w / w)), interpolation=cv2.INTER_AREA)
+    assert out.shape == ref.shape
+    assert _diff(out, ref) < 3                   # DCT-scaled decode + linear resize ≈ area resize
+
+
+def test_narrow_images_are_not_enlarged():
+    raw = encode_jpeg(_scene(60, 80)).tobytes()
+    assert decode_image(raw, 320).shape == (60, 80, 3)
+
+
+def test_png_is_downscaled_too():
+    raw = cv2.imencode(".png", _scene(100, 400))[1].tobytes()
+    assert decode_image(raw, 200).shape == (50, 200, 3)
+
+
+def test_resized_output_reuses_the_thread_buffer():
+    # 700 px → DCT-scaled to 350, then resized into the buffer at 320
+    first_src, second_src = _scene(350, 700), _scene(350, 700, shift=300)
+    first  = decode_image(encode_jpeg(first_src, 95).tobytes(), 320)
+    kept   = first.copy()
+    second = decode_image(encode_jpeg(second_src, 95).tobytes(), 320)
+    assert second is first                       # same shape → same buffer, overwritten
+    assert _diff(second, kept) > 10
+    assert _diff(second, cv2.resize(second_src, (320, 160), interpolation=cv2.INTER_AREA)) < 3
+
+    other = decode_image(encode_jpeg(_scene(400, 700), 95).tobytes(), 320)
+    assert other.shape == (183, 320, 3) and other is not first   # new shape → new buffer
+
+    seen = []
+    t = threading.Thread(target=lambda: seen.append(decode_image(encode_jpeg(first_src).tobytes(), 320)))
+    t.start()
+    t.join()
+    assert not np.shares_memory(seen[0], other)  # each thread has its own buffer
+
+
+def test_undecodable_bytes_raise():
+    with pytest.raises(ValueError):
+        decode_image(b"not an image")
+
+
+def test_thumbnail_only_shrinks():
+    small = cv2.imdecode(thumbnail(_scene(100, 200), 50), cv2.IMREAD_COLOR)
+    assert small.shape == (25, 50, 3)
+    same = cv2.imdecode(thumbnail(_scene(100, 200), 400), cv2.IMREAD_COLOR)
+    assert same.shape == (100, 200, 3)
@@ -0,0 +1,102 @@
+import os, threading, time
+from utils.model_manager import ModelCache
+
+
+class Loader:
+    def __init__(self, delay: float = 0.0):
+        self.loads = []
+        self.delay = delay
+
+    def __call__(self, path):
+        time.sleep(self.delay)
+        self.loads.append(path)
+        return {"path": path, "n": len(self.loads)}
+
+
+def _weights(tmp_path, name, mtime=1_000_000):
+    p = tmp_path / name
+    p.write_bytes(b"w")
+    os.utime(p, (mtime, mtime))
+    return str(p)
+
+
+def test_lru_eviction(tmp_path):
+    a, b, c = (_weights(tmp_path, n) for n in ("a.pt", "b.pt", "c.pt"))
+    loader  = Loader()
+    cache   = ModelCache(loader, max_entries=2, sizer=lambda m, p: 0)
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)                     # a is now the most recently used
+    cache.get(c)                     # … so b goes
+    assert cache.stats()["entries"] == [a, c]
+    cache.get(b)
+    assert loader.loads == [a, b, c, b]
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_new_mtime_reloads_and_drops_stale(tmp_path):
+    a      = _weights(tmp_path, "best.pt")
+    loader = Loader()
+    cache  = ModelCache(loader, max_entries=3, sizer=lambda m, p: 0)
+    first  = cache.get(a)
+    assert cache.get(a) is first
+    os.utime(a, (2_000_000, 2_000_000))          # retrained
+    second = cache.get(a)
+    assert second is not first and second["n"] == 2
+    assert cache.stats()["entries"] == [a]       # the old mtime is gone
+
+
+def test_size_budget_evicts_by_measured_size(tmp_path):
+    paths = [_weights(tmp_path, f"{n}.pt") for n in "abcd"]
+    sizes = dict(zip(paths, (3, 1, 1, 2)))
+    cache = ModelCache(Loader(), max_entries=10, budget_mb=4,
+                       sizer=lambda m, p: sizes[p] * 1_048_576)
+    for p in paths[:3]:
+        cache.get(p)
+    # a (3) + b (1) + c (1) = 5 > 4 → a was evicted when c arrived
+    assert cache.stats()["entries"] == paths[1:3]
+    cache.get(paths[3])                          # b + c + d = 4 fits
+    assert cache.stats()["entries"] == paths[1:]
+    assert cache.stats()["model_mb"] == 4.0
+
+
+def test_budget_keeps_at_least_one_entry(tmp_path):
+    a     = _weights(tmp_path, "big.pt")
+    cache = ModelCache(Loader(), budget_mb=1, sizer=lambda m, p: 10 * 1_048_576)
+    cache.get(a)
+    assert cache.stats()["entries"] == [a]
+
+
+def test_concurrent_misses_load_once(tmp_path):
+    a      = _weights(tmp_path, "a.pt")
+    loader = Loader(delay=0.2)
+    cache  = ModelCache(loader, sizer=lambda m, p: 0)
+    out    = []
+    threads = [threading.Thread(target=lambda: out.append(cache.get(a))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert loader.loads == [a]
+    assert all(m is out[0] for m in out)
+
+
+def test_meta_is_cached_and_dropped_with_its_entry(tmp_path):
+    a, b  = _weights(tmp_path, "a.pt"), _weights(tmp_path, "b.pt")
+    calls = []
+    cache = ModelCache(Loader(), max_entries=1, sizer=lambda m, p: 0)
+
+    def imgsz(model):
+        calls.append(model["path"])
+        return 320
+
+    assert cache.meta(a, "imgsz", imgsz) == 320
+    assert cache.meta(a, "imgsz", imgsz) == 320
+    assert calls == [a]
+    os.utime(a, (2_000_000, 2_000_000))          # retrained → recomputed
+    cache.meta(a, "imgsz", imgsz)
+    assert calls == [a, a]
+    cache.get(b)                                 # evicts a, and its meta with it
+    assert cache._meta.keys() <= set(cache._entries)
+    cache.meta(a, "imgsz", imgsz)
+    assert calls == [a, a, a]
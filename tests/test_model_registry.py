@@ -0,0 +1,94 @@
+import multiprocessing as mp
+import os, threading, time
+import pytest
+
+from utils.model_manager import ModelRegistry, fcntl
+
+
+def _weights(root, run, data=b"w"):
+    pt = root / "runs" / "detect" / run / "weights" / "best.pt"
+    pt.parent.mkdir(parents=True, exist_ok=True)
+    pt.write_bytes(data)
+    return str(pt)
+
+
+def _registry(root):
+    return ModelRegistry(str(root / "runs" / "registry.json"),
+                         str(root / "runs" / "detect"), poll=0)
+
+
+def test_register_active_and_best(tmp_path):
+    reg = _registry(tmp_path)
+    reg.register("a", _weights(tmp_path, "a"), metrics={"mAP50": 0.9, "mAP50_95": 0.6},
+                 hyperparams={"epochs": 3})
+    time.sleep(0.01)
+    reg.register("b", _weights(tmp_path, "b"), metrics={"mAP50": 0.5, "mAP50_95": 0.3})
+
+    assert [m["run_id"] for m in reg.entries()] == ["b", "a"]        # newest first
+    a = reg.get("a")
+    assert a["name"] == "a" and a["hyperparams"] == {"epochs": 3} and a["status"] == "done"
+    assert len(a["sha256"]) == 64
+    assert reg.active()["run_id"] == "b" and reg.active_id() is None
+    assert reg.best()["run_id"] == "a"
+
+    reg.set_active("a")
+    assert reg.active()["run_id"] == "a" and reg.active_id() == "a"
+    with pytest.raises(KeyError):
+        reg.set_active("missing")
+    reg.set_active(None)
+    assert reg.active()["run_id"] == "b"
+
+
+def test_other_instances_see_writes(tmp_path):
+    writer, reader = _registry(tmp_path), _registry(tmp_path)
+    assert reader.entries() == []
+    writer.register("a", _weights(tmp_path, "a"))
+    assert [m["run_id"] for m in reader.entries()] == ["a"]
+
+
+def test_scan_adds_updates_and_drops_stale_entries(tmp_path):
+    reg = _registry(tmp_path)
+    kept = _weights(tmp_path, "kept")
+    reg.register("kept", kept, metrics={"mAP50": 0.4})
+    gone = _weights(tmp_path, "gone")
+    reg.register("gone", gone)
+    new  = _weights(tmp_path, "copied-in")
+
+    os.remove(gone)
+    os.utime(kept, (2_000_000, 2_000_000))                           # weights replaced
+    reg.scan()
+
+    entries = {m["run_id"]: m for m in reg.entries()}
+    assert set(entries) == {"kept", "copied-in"}
+    assert entries["copied-in"]["path"] == new and entries["copied-in"]["status"] == "discovered"
+    assert entries["kept"]["mtime"] == 2_000_000 and entries["kept"]["metrics"] == {"mAP50": 0.4}
+
+
+def test_first_start_migrates_existing_runs(tmp_path):
+    _weights(tmp_path, "old")
+    other = tmp_path / "runs" / "elsewhere" / "exp" / "weights" / "best.pt"
+    other.parent.mkdir(parents=True)
+    other.write_bytes(b"w")
+    assert sorted(m["run_id"] for m in _registry(tmp_path).entries()) == ["elsewhere/exp", "old"]
+
+
+def _register_many(root, prefix, n):
+    reg = _registry(root)
+    for i in range(n):
+        reg.register(f"{prefix}{i}", _weights(root, f"{prefix}{i}"))
+
+
+@pytest.mark.skipif(fcntl is None, reason="registry writes are only locked with flock")
+def test_concurrent_writers_lose_no_entries(tmp_path):
+    threads = [threading.Thread(target=_register_many, args=(tmp_path, f"t{k}-", 10))
+               for k in range(4)]
+    # Spawned like training workers: a forked child would inherit a sibling thread's flock
+    procs   = [mp.get_context("spawn").Process(target=_register_many, args=(tmp_path, f"p{k}-", 10))
+               for k in range(2)]
+    for w in threads + procs:
+        w.start()
+    for w in threads + procs:
+        w.join()
+    assert all(p.exitcode == 0 for p in procs)
+    assert len(_registry(tmp_path).entries()) == 60
+    assert not list((tmp_path / "runs").glob("*.tmp"))
@@ -0,0 +1,134 @@
+import hashlib, io, os, types
+import numpy as np
+import pytest
+
+import utils.result_cache as result_cache
+from utils.result_cache import ResultCache, cache_key, content_hash, etag
+
+
+def test_key_covers_content_model_version_and_options():
+    digest = content_hash(b"img")
+    assert digest == hashlib.sha256(b"img").hexdigest()
+    base = cache_key(digest, ("runs/best.pt", 100.0), 0.25, 0, "full:0")
+    assert base == (digest, "runs/best.pt", 100.0, 0.25, 0, "full:0")
+    assert cache_key(digest, ("runs/best.pt", 100.0), 0.250001, 0, "full:0") == base
+    variants = [
+        cache_key("0" * 64, ("runs/best.pt",   100.0), 0.25, 0,   "full:0"),
+        cache_key(digest,   ("runs/best.onnx", 100.0), 0.25, 0,   "full:0"),
+        cache_key(digest,   ("runs/best.pt",   101.0), 0.25, 0,   "full:0"),
+        cache_key(digest,   ("runs/best.pt",   100.0), 0.30, 0,   "full:0"),
+        cache_key(digest,   ("runs/best.pt",   100.0), 0.25, 320, "full:0"),
+        cache_key(digest,   ("runs/best.pt",   100.0), 0.25, 0,   "detections:0"),
+    ]
+    assert len({etag(k) for k in [base] + variants}) == len(variants) + 1
+
+
+def _key(c, path="best.pt"):
+    return cache_key(c * 64, (path, 1.0), 0.25, 0)
+
+
+def test_lru_ttl_and_budget(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(result_cache, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    cache = ResultCache(budget_mb=1, max_entries=2, ttl=10)
+    cache.put(_key("a"), {"n": 1})
+    cache.put(_key("b"), {"n": 2})
+    assert cache.get(_key("a")) == {"n": 1}
+    cache.put(_key("c"), {"n": 3})               # over max_entries: "b" is least recent
+    assert cache.get(_key("b")) is None and cache.get(_key("a")) == {"n": 1}
+    now[0] = 11.0
+    assert cache.get(_key("c")) is None          # expired
+    assert cache.stats()["entries"] == 1
+    cache.put(_key("d"), {"blob": "x" * 2_000_000})     # larger than the whole budget
+    assert cache.get(_key("d")) is None
+    assert not ResultCache(budget_mb=0).enabled
+
+
+def test_invalidate_drops_the_weights_and_their_exports(tmp_path):
+    run   = str(tmp_path / "run" / "weights" / "best")
+    other = str(tmp_path / "other" / "weights" / "best.pt")
+    cache = ResultCache()
+    for i, path in enumerate([run + ".pt", run + ".onnx", run + "_openvino_model", other]):
+        cache.put(_key("abcd"[i], path), {"i": i})
+    assert cache.invalidate(run + ".pt") == 3
+    assert cache.stats()["entries"] == 1 and cache.get(_key("d", other)) == {"i": 3}
+    assert cache.invalidate() == 1
+
+
+# ── Routes: ETag / 304, and invalidation when training finishes ──────────────
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    flask = pytest.importorskip("flask")
+    pytest.importorskip("torch")
+    import routes.detect as detect
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(detect, "_results", ResultCache())
+    calls = []
+
+    def predict(arr, model_path, conf, backend=None):
+        calls.append(model_path)
+        return None, "fake"
+
+    monkeypatch.setattr(detect, "_predict", predict)
+    monkeypatch.setattr(detect, "_detections", lambda result: [{"class": "a", "conf": 0.9}])
+    weights = tmp_path / "weights" / "best.pt"
+    weights.parent.mkdir()
+    weights.write_bytes(b"pt")
+    app = flask.Flask(__name__)
+    app.register_blueprint(detect.detect_bp, url_prefix="/detect")
+    return app.test_client(), detect, str(weights), calls
+
+
+def _image():
+    cv2 = pytest.importorskip("cv2")
+    return cv2.imencode(".png", np.zeros((8, 8, 3), np.uint8))[1].tobytes()
+
+
+def _post(client, raw, weights, **headers):
+    return client.post("/detect/image", headers=headers, content_type="multipart/form-data",
+                       data={"image": (io.BytesIO(raw), "x.png"), "cache": "1", "conf": "0.3",
+                             "mode": "detections", "model_path": weights, "backend": "pytorch"})
+
+
+def test_etag_hit_and_not_modified(app):
+    client, _, weights, calls = app
+    raw  = _image()
+    miss = _post(client, raw, weights)
+    assert miss.status_code == 200 and miss.headers["X-Cache"] == "MISS"
+    tag  = miss.headers["ETag"]
+
+    hit = _post(client, raw, weights)
+    assert hit.headers["X-Cache"] == "HIT" and hit.headers["ETag"] == tag
+    assert hit.json == miss.json and len(calls) == 1
+
+    assert _post(client, raw, weights, **{"If-None-Match": tag}).status_code == 304
+
+    url = f"/detect/image/{content_hash(raw)}?conf=0.3&mode=detections&backend=pytorch&model_path={weights}"
+    assert client.get(url).headers["ETag"] == tag
+    assert client.get(url, headers={"If-None-Match": tag}).status_code == 304
+    assert client.get(url.replace("conf=0.3", "conf=0.5")).status_code == 404
+    assert len(calls) == 1
+
+    os.utime(weights, (2_000_000, 2_000_000))    # retrained weights → new key
+    assert _post(client, raw, weights, **{"If-None-Match": tag}).headers["X-Cache"] == "MISS"
+    assert len(calls) == 2
+
+
+def test_training_finish_invalidates_results(app):
+    client, detect, weights, _ = app
+    import routes.train as train
+    raw = _image()
+    _post(client, raw, weights)
+    other = weights.replace("weights", "elsewhere")
+    os.makedirs(os.path.dirname(other))
+    with open(other, "wb") as f:
+        f.write(b"pt")
+    _post(client, raw, other)
+    assert detect._results.stats()["entries"] == 2
+
+    train._on_job_finish({"status": "done", "model_path": weights, "config": {},
+                          "queued_at": 0.0, "run_dir": "runs/detect/x"})
+    assert detect._results.stats()["entries"] == 1
+    assert _post(client, raw, weights).headers["X-Cache"] == "MISS"
+    assert _post(client, raw, other).headers["X-Cache"] == "HIT"
@@ -0,0 +1,73 @@
+import json
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from utils.jobs import JobManager
+from utils.sse import job_stream
+
+
+@pytest.fixture
+def jobs():
+    jobs = JobManager(None, lambda cfg: {"epoch": 0, "history": []}, store_dir="")
+    jobs._dispatch_loop = lambda: None                  # records only; nothing runs
+    yield jobs
+    jobs.shutdown()
+
+
+def _job(jobs):
+    job_id = jobs.submit({})
+    jobs._apply(job_id, "log", "epoch 1 started")       # seq 1
+    jobs._apply(job_id, "set", {"epoch": 1})            # seq 2
+    jobs._apply(job_id, "append", ("history", {"epoch": 1, "mAP50": 0.1}))   # seq 3
+    jobs._apply(job_id, "log", "epoch 2 started")       # seq 4
+    jobs._apply(job_id, "set", {"epoch": 2, "status": "done"})               # seq 5
+    return job_id
+
+
+def _messages(jobs, job_id, last_event_id=None):
+    headers = {"Last-Event-ID": last_event_id} if last_event_id else {}
+    with flask.Flask(__name__).test_request_context(headers=headers):
+        resp = job_stream(jobs, job_id)
+        body = "".join(resp.response)
+        resp.close()
+    out = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in fields:
+            out.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return out
+
+
+def test_reconnect_replays_only_missed_events(jobs):
+    job_id = _job(jobs)
+    msgs   = _messages(jobs, job_id, f"{job_id}:2")
+    assert msgs == [(f"{job_id}:5", "delta", {
+        "set":     {"epoch": 2, "status": "done"},
+        "log":     ["epoch 2 started"],
+        "history": [{"epoch": 1, "mAP50": 0.1}],
+    })]
+
+
+def test_up_to_date_reconnect_sends_nothing(jobs):
+    job_id = _job(jobs)
+    assert _messages(jobs, job_id, f"{job_id}:5") == []
+
+
+@pytest.mark.parametrize("last", [None, "other-job:2", "{job}:x"])
+def test_unusable_last_event_id_starts_from_snapshot(jobs, last):
+    job_id = _job(jobs)
+    msgs   = _messages(jobs, job_id, last and last.format(job=job_id))
+    assert [(i, e) for i, e, _ in msgs] == [(f"{job_id}:5", "snapshot")]
+    snap = msgs[0][2]
+    assert snap["epoch"] == 2 and snap["status"] == "done"
+    assert snap["log_tail"] == ["epoch 1 started", "epoch 2 started"]
+
+
+def test_resume_behind_the_ring_resyncs_with_snapshot(jobs):
+    job_id = _job(jobs)
+    ring   = jobs._events[job_id]
+    while ring[0][0] <= 2:                              # seq 1-2 fell off the ring
+        ring.popleft()
+    msgs = _messages(jobs, job_id, f"{job_id}:1")
+    assert [(i, e) for i, e, _ in msgs] == [(f"{job_id}:5", "snapshot")]
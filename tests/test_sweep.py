@@ -0,0 +1,52 @@
+from utils.sweep import SuccessiveHalving, SweepManager, _metric
+
+
+class FakeJobs:
+    def __init__(self, snap):
+        self.snap      = snap
+        self.cancelled = []
+
+    def snapshot(self, job_id):
+        return self.snap
+
+    def cancel(self, job_id):
+        self.cancelled.append(job_id)
+
+
+def _trial():
+    return {"trial": 0, "job_id": "j0", "epochs": 0, "status": "running",
+            "mAP50_95": None, "mAP50": None, "best_epoch": None, "pruned_at": None}
+
+
+def test_metric_parses_numeric_strings():
+    assert _metric("0.4321") == 0.4321
+    assert _metric(0.5) == 0.5
+    assert _metric("—") is None
+    assert _metric(None) is None
+    assert _metric(True) is None
+    assert _metric("nan") is None
+
+
+def test_poll_trial_reads_string_history(tmp_path):
+    # A finished job's history comes from results.csv, whose values may be strings
+    jobs = FakeJobs({"status": "done", "model_path": "best.pt", "history": [
+        {"epoch": 1, "mAP50": "0.2", "mAP50_95": "0.1"},
+        {"epoch": 2, "mAP50": "0.6", "mAP50_95": "0.4"},
+        {"epoch": 3, "mAP50": "0.5", "mAP50_95": "0.3"},
+        {"epoch": 4, "mAP50": "—",   "mAP50_95": "—"},
+    ]})
+    sweeps = SweepManager(jobs, launch=None, store_dir=str(tmp_path))
+    t      = _trial()
+    sweeps._poll_trial(t, SuccessiveHalving([]))
+    assert t["epochs"] == 4
+    assert t["mAP50_95"] == 0.4 and t["mAP50"] == 0.6 and t["best_epoch"] == 2
+    assert t["status"] == "done"
+
+
+def test_poll_trial_prunes_on_string_metrics(tmp_path):
+    rule = SuccessiveHalving([1], eta=2)
+    rule.report(1, 1, 0.9)
+    jobs = FakeJobs({"status": "running", "history": [{"epoch": 1, "mAP50_95": "0.1"}]})
+    t    = _trial()
+    SweepManager(jobs, launch=None, store_dir=str(tmp_path))._poll_trial(t, rule)
+    assert t["pruned_at"] == 1 and jobs.cancelled == ["j0"]
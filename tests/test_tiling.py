@@ -0,0 +1,99 @@
+import math
+import numpy as np
+import pytest
+
+from utils.tiling import MAX_TILES, nms, sliced_predict, tile_grid
+
+
+@pytest.mark.parametrize("h, w, tile, overlap", [
+    (1080, 1920, 640, 0.2), (1000, 1000, 640, 0.2), (700, 3000, 512, 0.25), (641, 640, 640, 0.1),
+])
+def test_grid_covers_the_image_with_full_size_edge_tiles(h, w, tile, overlap):
+    grid = tile_grid(h, w, tile, overlap)
+    assert (grid[:, 2] - grid[:, 0] == tile).all() and (grid[:, 3] - grid[:, 1] == tile).all()
+    assert grid[:, :2].min() == 0 and grid[:, 2].max() == w and grid[:, 3].max() == h
+
+    covered = np.zeros((h, w), bool)
+    for x0, y0, x1, y1 in grid:
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+
+    # Neighbours share at least overlap × tile, so an object that small is whole in some tile
+    for axis in (0, 1):
+        starts = np.unique(grid[:, axis])
+        assert (tile - np.diff(starts) >= int(tile * overlap)).all()
+
+
+def test_tiles_are_clipped_to_a_smaller_image():
+    assert tile_grid(300, 500, 640).tolist() == [[0, 0, 500, 300]]
+    assert tile_grid(300, 900, 640, 0.2).tolist() == [[0, 0, 640, 300], [260, 0, 900, 300]]
+
+
+def test_nms_is_class_aware_and_keeps_the_highest_score():
+    boxes  = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [0, 0, 10, 10], [50, 50, 60, 60]], np.float32)
+    scores = np.array([0.6, 0.9, 0.8, 0.5], np.float32)
+    clss   = np.array([0, 0, 1, 0])
+    assert nms(boxes, scores, clss, thr=0.5).tolist() == [1, 2, 3]
+
+
+def test_ios_merges_a_truncated_copy_that_iou_keeps():
+    whole  = [100, 100, 200, 200]
+    cut    = [100, 100, 140, 200]                  # the part left of a tile border
+    boxes  = np.array([whole, cut], np.float32)
+    scores = np.array([0.9, 0.7], np.float32)
+    clss   = np.zeros(2, np.int64)
+    assert nms(boxes, scores, clss, 0.5, "ios").tolist() == [0]
+    assert nms(boxes, scores, clss, 0.5, "iou").tolist() == [0, 1]
+
+
+# Objects at fixed image coordinates; the fake detector reports the part of each
+# object inside the crop it is shown (objects cut below a third are missed).
+OBJECTS = np.array([
+    [100, 100, 160, 160],      # inside one tile
+    [600, 300, 700, 380],      # across the first vertical tile border
+    [500, 480, 560, 560],      # in the four-tile corner overlap
+    [1800, 1000, 1900, 1070],  # bottom-right edge tile
+], np.float32)
+
+
+def _coord_image(h, w):
+    """Pixels hold their own (x, y), so a crop tells the detector where it came from."""
+    ys, xs = np.mgrid[0:h, 0:w]
+    return np.dstack([xs, ys]).astype(np.int32)
+
+
+def _detect_batch(crops):
+    out = []
+    for crop in crops:
+        x0, y0  = crop[0, 0]
+        h, w    = crop.shape[:2]
+        window  = np.array([x0, y0, x0 + w, y0 + h], np.float32)
+        tl      = np.maximum(OBJECTS[:, :2], window[:2])
+        br      = np.minimum(OBJECTS[:, 2:], window[2:])
+        visible = np.clip(br - tl, 0, None).prod(axis=1)
+        area    = (OBJECTS[:, 2:] - OBJECTS[:, :2]).prod(axis=1)
+        seen    = visible >= area / 3
+        xyxy    = np.hstack([tl, br])[seen] - np.array([x0, y0, x0, y0], np.float32)
+        conf    = np.full(seen.sum(), 0.5, np.float32) + 0.4 * (visible / area)[seen]
+        out.append((xyxy, conf.astype(np.float32), np.zeros(seen.sum(), np.int64), {0: "obj"}))
+    return out
+
+
+@pytest.mark.parametrize("full", [True, False])
+def test_sliced_predict_reports_each_object_once(full):
+    img = _coord_image(1080, 1920)
+    xyxy, conf, cls, names, info = sliced_predict(img, _detect_batch, tile=640, overlap=0.2,
+                                                  batch=4, full=full)
+    got = sorted(map(tuple, xyxy.tolist()))
+    assert got == sorted(map(tuple, OBJECTS.tolist()))   # whole boxes, duplicates merged
+    assert names == {0: "obj"} and (conf > 0.85).all()
+    tiles = len(tile_grid(1080, 1920, 640, 0.2))            # 4 columns × 2 rows
+    assert info["tiles"] == tiles == 8 and info["full_image"] is full
+    assert info["raw_boxes"] > len(OBJECTS) and info["merged_boxes"] == len(OBJECTS)
+    assert info["forward_passes"] == math.ceil((tiles + full) / 4)
+
+
+def test_too_many_tiles_is_refused():
+    with pytest.raises(ValueError):
+        sliced_predict(np.zeros((64 * 20, 64 * 20, 3), np.uint8), _detect_batch, tile=64, overlap=0.0)
+    assert len(tile_grid(64 * 16, 64 * 16, 64, 0.0)) == MAX_TILES
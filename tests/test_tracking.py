@@ -0,0 +1,123 @@
+import numpy as np
+
+from utils.tracking import SessionStore, Tracker, TrackSession
+
+
+def _dets(*rows):
+    """(x1, y1, x2, y2, conf, cls) rows → update() arguments."""
+    a = np.array(rows, dtype=np.float32).reshape(-1, 6)
+    return a[:, :4], a[:, 4], a[:, 5].astype(np.int64)
+
+
+def _ids(tracks):
+    return sorted(t["id"] for t in tracks)
+
+
+def test_ids_follow_moving_boxes():
+    tr = Tracker()
+    tr.update(*_dets((0, 0, 10, 10, 0.9, 0), (50, 50, 60, 60, 0.9, 0)))
+    for x in range(2, 12, 2):
+        vis = tr.update(*_dets((50 + x, 50, 60 + x, 60, 0.9, 0), (x, 0, 10 + x, 10, 0.9, 0)))
+        by_id = {t["id"]: t["box"][0] for t in vis}
+        assert by_id == {1: x, 2: 50 + x}
+    # A third object gets a fresh id; the others keep theirs
+    vis = tr.update(*_dets((12, 0, 22, 10, 0.9, 0), (62, 50, 72, 60, 0.9, 0),
+                           (100, 100, 110, 110, 0.9, 0)))
+    assert _ids(vis) == [1, 2, 3]
+
+
+def test_association_stays_within_a_class():
+    tr = Tracker()
+    tr.update(*_dets((0, 0, 10, 10, 0.9, 0)))
+    vis = tr.update(*_dets((0, 0, 10, 10, 0.9, 1)))
+    assert [(t["id"], t["cls"]) for t in vis] == [(2, 1)]
+
+
+def test_low_confidence_boxes_keep_tracks_alive_but_start_none():
+    tr = Tracker(high=0.5)
+    tr.update(*_dets((0, 0, 10, 10, 0.9, 0)))
+    # Partly occluded: only a weak detection, still matched to track 1
+    vis = tr.update(*_dets((1, 0, 11, 10, 0.2, 0), (80, 80, 90, 90, 0.2, 0)))
+    assert _ids(vis) == [1] and len(tr.tracks) == 1
+
+
+def test_lost_track_is_reassociated_then_expires():
+    tr = Tracker(max_age=2)
+    tr.update(*_dets((0, 0, 10, 10, 0.9, 0)))
+    empty = _dets()
+    assert tr.update(*empty) == []                      # missed: hidden, not dropped
+    assert _ids(tr.update(*_dets((0, 0, 10, 10, 0.9, 0)))) == [1]
+
+    for _ in range(2):
+        tr.update(*empty)
+    assert _ids(tr.tracks) == [1]                       # misses == max_age: kept
+    tr.update(*empty)
+    assert tr.tracks == []                              # one more: expired
+    assert _ids(tr.update(*_dets((0, 0, 10, 10, 0.9, 0)))) == [2]
+
+
+def test_predict_propagates_velocity():
+    tr = Tracker()
+    tr.update(*_dets((0, 0, 10, 10, 0.9, 0)))
+    tr.update(*_dets((4, 0, 14, 10, 0.9, 0)))
+    tr.predict()
+    tr.predict()
+    assert tr.tracks[0]["box"].tolist() == [12, 0, 22, 10]
+    # The next detection lands where the track was predicted, velocity per frame
+    tr.update(*_dets((16, 0, 26, 10, 0.9, 0)))
+    assert tr.tracks[0]["id"] == 1 and tr.tracks[0]["vel"].tolist() == [4, 0, 4, 0]
+
+
+class Detector:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, arr):
+        self.calls += 1
+        x = 4.0 * self.calls
+        return (np.array([[x, 0, x + 10, 10]]), np.array([0.9]), np.array([0]), {0: "cat"})
+
+
+def test_detector_runs_every_k_frames_on_a_still_scene():
+    session, det = TrackSession(), Detector()
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    ran   = [session.step(frame, det, every=3, diff=0.5)[1] for _ in range(7)]
+    assert ran == [True, False, False, True, False, False, True]
+    assert det.calls == 3
+
+
+def test_skipped_frames_propagate_tracks():
+    session, det = TrackSession(), Detector()
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    session.step(frame, det, every=2, diff=0.5)         # box at x=4
+    session.step(frame, det, every=2, diff=0.5)         # skipped
+    dets, ran, _ = session.step(frame, det, every=2, diff=0.5)  # box at x=8, vel 2/frame
+    assert ran and dets[0]["bbox"][0] == 8.0
+    dets, ran, _ = session.step(frame, det, every=2, diff=0.5)
+    assert not ran
+    assert dets == [{"class": "cat", "conf": 0.9, "bbox": [10.0, 0.0, 20.0, 10.0], "track_id": 1}]
+
+
+def test_scene_change_forces_a_detector_run():
+    session, det = TrackSession(), Detector()
+    dark  = np.zeros((48, 64, 3), dtype=np.uint8)
+    light = np.full((48, 64, 3), 200, dtype=np.uint8)
+    session.step(dark, det, every=100, diff=0.1)
+    assert not session.step(dark, det, every=100, diff=0.1)[1]
+    _, ran, motion = session.step(light, det, every=100, diff=0.1)
+    assert ran and motion > 0.7
+
+
+def test_session_store_expires_idle_and_evicts_oldest():
+    store = SessionStore(ttl=10, max_sessions=2)
+    a, b = store.get("a"), store.get("b")
+    assert store.get("a") is a and len(store) == 2
+    store.get("c")                                      # over the cap: "b" is least recent
+    assert store.get("a") is a and len(store) == 2
+    assert store.get("b") is not b
+
+    store = SessionStore(ttl=10, max_sessions=8)
+    old = store.get("old")
+    old.last_seen -= 11
+    store.get("new")
+    assert len(store) == 1 and store.get("old") is not old
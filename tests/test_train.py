@@ -0,0 +1,14 @@
+import pytest
+
+pytest.importorskip("flask")
+tasks = pytest.importorskip("ultralytics.nn.tasks")
+
+from routes.train import BACKBONE, MODEL_SIZES
+
+
+@pytest.mark.parametrize("size", MODEL_SIZES)
+def test_freeze_covers_the_whole_backbone(size):
+    # freeze=N freezes model.0 … model.N-1, so N must equal the backbone's layer count
+    cfg = tasks.yaml_model_load(f"yolo11{size}.yaml")
+    assert BACKBONE == len(cfg["backbone"])
+    assert cfg["backbone"][BACKBONE - 1][2] == "C2PSA"
@@ -0,0 +1,55 @@
+import threading
+import numpy as np
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("ultralytics")
+cv2 = pytest.importorskip("cv2")
+
+from routes import train
+
+
+class Report:
+    def __init__(self):
+        self.state = {}
+        self.lines = []
+
+    def log(self, msg):
+        self.lines.append(msg)
+
+    def set(self, **kw):
+        self.state.update(kw)
+
+    def append(self, key, value):
+        self.state.setdefault(key, []).append(value)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    root = tmp_path / "ds"
+    rng  = np.random.default_rng(0)
+    for split in ("train", "val"):
+        (root / "images" / split).mkdir(parents=True)
+        (root / "labels" / split).mkdir(parents=True)
+        for i in range(4):
+            im = rng.integers(0, 255, (72 + 5 * i, 96, 3), dtype=np.uint8)
+            cv2.imwrite(str(root / "images" / split / f"{i}.jpg"), im)
+            (root / "labels" / split / f"{i}.txt").write_text("0 0.5 0.5 0.4 0.4\n")
+    (root / "data.yaml").write_text(
+        f"path: {root}\ntrain: images/train\nval: images/val\nnames:\n  0: a\n")
+    return root
+
+
+def test_training_with_image_cache(dataset, tmp_path, monkeypatch):
+    # Relative RUNS_ROOT / PLOTS_DIR / cache root / registry all land in tmp_path
+    monkeypatch.chdir(tmp_path)
+    report = Report()
+    cfg = dict(yaml_path=str(dataset / "data.yaml"), epochs=1, imgsz=64, batch=2,
+               model_size="n", export=None, int8=False, base_weights="yolo11n.yaml",
+               resources={"cache": "image", "workers": 0})
+    train._run_training("smoke", cfg, report, threading.Event())
+
+    log = "\n".join(report.lines)
+    assert report.state.get("status") == "done", log
+    assert "reading from image cache" in log
+    assert (tmp_path / train.RUNS_ROOT / "smoke" / "weights" / "best.pt").exists()
@@ -0,0 +1,119 @@
+import hashlib, io, os, time, zipfile
+import pytest
+
+flask = pytest.importorskip("flask")
+
+import routes.upload as upload
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload, "CHUNK_BYTES", 8)
+    monkeypatch.setattr(upload, "_warm_image_cache", lambda d: None)
+    app = flask.Flask(__name__)
+    app.config.update(UPLOAD_FOLDER=str(tmp_path / "uploads"),
+                      DATASET_FOLDER=str(tmp_path / "datasets"))
+    os.makedirs(app.config["UPLOAD_FOLDER"])
+    app.register_blueprint(upload.upload_bp, url_prefix="/upload")
+    return app.test_client()
+
+
+def _init(client, size, filename="set.zip", ip="10.0.0.1"):
+    return client.post("/upload/init", json={"filename": filename, "size": size},
+                       environ_base={"REMOTE_ADDR": ip})
+
+
+def _put(client, upload_id, offset, data, digest=None):
+    headers = {"X-Chunk-SHA256": digest} if digest else {}
+    return client.put(f"/upload/chunk/{upload_id}?offset={offset}", data=data, headers=headers)
+
+
+def test_resume_and_out_of_order_chunks(client, tmp_path):
+    data = b"0123456789abcdefXYZ"
+    uid  = _init(client, len(data)).json["upload_id"]
+
+    assert _put(client, uid, 0, data[:8]).json["offset"] == 8
+    # A chunk sent ahead of the server's offset is refused with the resume point
+    r = _put(client, uid, 16, data[16:])
+    assert r.status_code == 409 and r.json["offset"] == 8
+    # So is a replay of a chunk that already landed
+    assert _put(client, uid, 0, data[:8]).status_code == 409
+    # The client asks where to continue (e.g. after a reconnect)
+    assert client.get(f"/upload/chunk/{uid}").json == {"offset": 8, "size": len(data)}
+
+    bad = _put(client, uid, 8, data[8:16], digest="0" * 64)
+    assert bad.status_code == 422 and bad.json["offset"] == 8        # rolled back
+    assert _put(client, uid, 8, data[8:16],
+                digest=hashlib.sha256(data[8:16]).hexdigest()).json["offset"] == 16
+    assert _put(client, uid, 16, b"too-long").status_code == 413   # past the declared size
+
+    r = client.post(f"/upload/finalize/{uid}", json={"purpose": "batch"})
+    assert r.status_code == 409 and r.json["offset"] == 16          # incomplete
+    _put(client, uid, 16, data[16:])
+    r = client.post(f"/upload/finalize/{uid}", json={"purpose": "batch",
+                                                     "sha256": hashlib.sha256(data).hexdigest()})
+    assert r.status_code == 200
+    stored = tmp_path / "uploads" / "batch" / f"{uid}.zip"
+    assert stored.read_bytes() == data
+    assert client.get(f"/upload/chunk/{uid}").status_code == 404     # chunk state is gone
+
+
+def test_finalize_checksum_mismatch_discards(client):
+    uid = _init(client, 4).json["upload_id"]
+    _put(client, uid, 0, b"abcd")
+    r = client.post(f"/upload/finalize/{uid}", json={"sha256": "0" * 64})
+    assert r.status_code == 422
+    assert client.get(f"/upload/chunk/{uid}").status_code == 404
+
+
+def test_idle_uploads_expire(client, tmp_path, monkeypatch):
+    old = _init(client, 10).json["upload_id"]
+    new = _init(client, 10).json["upload_id"]
+    chunks = tmp_path / "uploads" / "chunks"
+    stale  = time.time() - upload.UPLOAD_TTL_S - 60
+    for name in (f"{old}.json", f"{old}.part"):
+        os.utime(chunks / name, (stale, stale))
+    (chunks / "orphan.part").write_bytes(b"x" * 5)
+    os.utime(chunks / "orphan.part", (stale, stale))
+
+    _init(client, 10)                                # any init sweeps
+    assert client.get(f"/upload/chunk/{old}").status_code == 404
+    assert client.get(f"/upload/chunk/{new}").status_code == 200
+    assert not (chunks / f"{old}.part").exists() and not (chunks / "orphan.part").exists()
+
+
+def test_open_upload_caps(client, monkeypatch):
+    monkeypatch.setattr(upload, "MAX_OPEN_PER_IP", 2)
+    monkeypatch.setattr(upload, "MAX_OPEN_UPLOADS", 3)
+    assert _init(client, 10, ip="10.0.0.1").status_code == 200
+    uid = _init(client, 8, ip="10.0.0.1").json["upload_id"]
+    assert _init(client, 10, ip="10.0.0.1").status_code == 429      # per client
+    assert _init(client, 10, ip="10.0.0.2").status_code == 200
+    assert _init(client, 10, ip="10.0.0.3").status_code == 429      # global
+    # Finishing one frees its slot
+    _put(client, uid, 0, b"01234567")
+    assert client.post(f"/upload/finalize/{uid}", json={"purpose": "batch"}).status_code == 200
+    assert _init(client, 10, ip="10.0.0.1").status_code == 200
+
+
+def _dataset_zip() -> bytes:
+    import cv2, numpy as np
+    ok, jpg = cv2.imencode(".jpg", np.full((48, 64, 3), 127, np.uint8))
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("classes.txt", "cat\ndog\n")
+        for i in range(3):
+            zf.writestr(f"images/img{i}.jpg", jpg.tobytes())
+            zf.writestr(f"labels/img{i}.txt", "1 0.5 0.5 0.2 0.3\n")
+    return buf.getvalue()
+
+
+def test_chunked_dataset_is_ingested(client, tmp_path):
+    data = _dataset_zip()
+    uid  = _init(client, len(data)).json["upload_id"]
+    for off in range(0, len(data), upload.CHUNK_BYTES):
+        assert _put(client, uid, off, data[off:off + upload.CHUNK_BYTES]).status_code == 200
+    r = client.post(f"/upload/finalize/{uid}", json={})
+    assert r.status_code == 200, r.json
+    assert r.json["classes"] == ["cat", "dog"] and r.json["image_count"] == 3
+    assert (tmp_path / "datasets" / "current" / "data.yaml").exists()
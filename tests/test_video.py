@@ -0,0 +1,63 @@
+import io
+import pytest
+
+flask = pytest.importorskip("flask")
+
+import utils.video
+import routes.video as video
+
+
+class FakeJobs:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, cfg, priority=0, job_id=None):
+        self.submitted.append((cfg, priority))
+        return job_id
+
+    def queue_position(self, job_id):
+        return 0
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    jobs = FakeJobs()
+    monkeypatch.setattr(video, "_jobs", jobs)
+    return jobs
+
+
+@pytest.fixture
+def client(tmp_path, jobs):
+    app = flask.Flask(__name__)
+    app.config.update(UPLOAD_FOLDER=str(tmp_path / "uploads"))
+    app.register_blueprint(video.video_bp, url_prefix="/detect/video")
+    return app.test_client()
+
+
+@pytest.mark.parametrize("field", ["conf", "stride", "batch", "max_frames", "priority"])
+def test_bad_option_is_refused_before_saving(client, jobs, tmp_path, field):
+    r = client.post("/detect/video", content_type="multipart/form-data",
+                    data={"video": (io.BytesIO(b"\0" * 64), "clip.mp4"), field: "lots"})
+    assert r.status_code == 400 and field in r.json["error"]
+    saved = tmp_path / "uploads" / video.VIDEO_DIR
+    assert not saved.exists() or not any(saved.iterdir())
+    assert jobs.submitted == []
+
+
+def test_loopback_stream_needs_the_allowlist(client, jobs, monkeypatch):
+    url = "rtsp://127.0.0.1:8554/cam"
+    monkeypatch.setattr(utils.video, "STREAM_HOSTS", [])
+    assert client.post("/detect/video", json={"url": url}).status_code == 403
+
+    # YOLO_STREAM_HOSTS=127.0.0.1:8554
+    monkeypatch.setattr(utils.video, "STREAM_HOSTS", ["127.0.0.1:8554"])
+    r = client.post("/detect/video", json={"url": url, "conf": "0.4", "stride": 3,
+                                            "batch": 999, "max_frames": 50, "priority": 2})
+    assert r.status_code == 200, r.json
+    (cfg, priority), = jobs.submitted
+    assert cfg["source"] == url and cfg["cleanup"] is False
+    assert (cfg["conf"], cfg["stride"], cfg["batch"], cfg["max_frames"]) == (0.4, 3, video.MAX_BATCH, 50)
+    assert priority == 2 and "priority" not in cfg
+
+    # Another port on the same host is still refused
+    assert client.post("/detect/video", json={"url": "rtsp://127.0.0.1:9000/cam"}).status_code == 403
@@ -0,0 +1,82 @@
+# Server-driven webcam capture settings: interval, input size & JPEG quality
+import os, time, threading
+
+# Frame service time (decode → detections) the controller aims for, and the
+# inference queue depth it treats as "full load".
+TARGET_MS    = float(os.environ.get("YOLO_ADAPT_TARGET_MS", 150))
+QUEUE_SOFT   = int(os.environ.get("YOLO_ADAPT_QUEUE_SOFT", 4))
+MIN_INTERVAL = int(os.environ.get("YOLO_ADAPT_MIN_INTERVAL_MS", 66))
+MAX_INTERVAL = int(os.environ.get("YOLO_ADAPT_MAX_INTERVAL_MS", 1000))
+
+SIZES     = (320, 416, 512, 640)      # capture widths, one per quality level
+QUALITIES = (0.55, 0.65, 0.75, 0.85)  # JPEG quality per level
+ALPHA     = 0.2                       # EWMA weight of the newest sample
+COOLDOWN  = 1.0                       # seconds between level changes
+UP_LOAD   = 0.5                       # step up only when comfortably under target
+
+
+class AdaptiveController:
+    """
+    Recommends how the browser should capture webcam frames.
+
+    Every processed frame feeds its service time into an EWMA; together
+    with the inference queue depth that gives a load factor (1.0 = at
+    target).  The quality level steps down one notch when load exceeds 1
+    and up one when it falls below `UP_LOAD`, at most once per `COOLDOWN`
+    seconds so it does not oscillate.  The capture interval tracks the
+    measured latency, stretched further while overloaded, so clients slow
+    down instead of piling up requests.
+    """
+
+    def __init__(self, queue_depth=lambda: 0, target_ms: float = TARGET_MS,
+                 queue_soft: int = QUEUE_SOFT):
+        self.queue_depth = queue_depth
+        self.target_ms   = target_ms
+        self.queue_soft  = max(1, queue_soft)
+        self.level       = len(SIZES) - 1     # start at full quality
+        self.ewma_ms     = None
+        self._lock       = threading.Lock()
+        self._changed    = 0.0
+
+    def observe(self, seconds: float):
+        """Record one frame's service time and move the level if due."""
+        ms = seconds * 1000
+        with self._lock:
+            self.ewma_ms = ms if self.ewma_ms is None else ALPHA * ms + (1 - ALPHA) * self.ewma_ms
+            now = time.monotonic()
+            if now - self._changed < COOLDOWN:
+                return
+            load = self._load()
+            if load > 1.0 and self.level > 0:
+                self.level   -= 1
+                self._changed = now
+            elif load < UP_LOAD and self.level < len(SIZES) - 1:
+                self.level   += 1
+                self._changed = now
+
+    def load(self) -> float:
+        with self._lock:
+            return self._load()
+
+    def _load(self) -> float:
+        latency = (self.ewma_ms or 0.0) / self.target_ms
+        return max(latency, self.queue_depth() / self.queue_soft)
+
+    def recommend(self, max_size: int = SIZES[-1]) -> dict:
+        """
+        Current settings → {"interval_ms", "size", "quality", "level"}.
+        Sizes above `max_size` (the model's imgsz) are never advertised —
+        the model would only letterbox them back down.
+        """
+        with self._lock:
+            sizes   = [s for s in SIZES if s <= max_size] or [SIZES[0]]
+            level   = min(self.level, len(sizes) - 1)
+            load    = self._load()
+            latency = self.ewma_ms or 0.0
+        interval = latency * max(1.0, load) * 1.1
+        return {
+            "interval_ms": int(min(MAX_INTERVAL, max(MIN_INTERVAL, interval))),
+            "size":        sizes[level],
+            "quality":     QUALITIES[level],
+            "level":       level,
+        }
@@ -0,0 +1,120 @@
+# Micro-batching inference scheduler
+import os, queue, threading, time
+from concurrent.futures import Future
+
+# Frames arriving within this window are coalesced into one predict call.
+BATCH_WINDOW_MS = float(os.environ.get("YOLO_BATCH_WINDOW_MS", 10))
+BATCH_MAX_SIZE  = int(os.environ.get("YOLO_BATCH_MAX", 8))
+# Images allowed to wait for the worker before new ones are turned away.
+QUEUE_MAX       = int(os.environ.get("YOLO_INFER_QUEUE_MAX", 32))
+
+
+class Overloaded(RuntimeError):
+    """The inference queue is full; the caller should retry shortly."""
+
+
+class InferenceBatcher:
+    """
+    Single worker thread that owns every forward pass.
+
+    Callers `submit()` one image together with a key (model path, conf, …);
+    the worker drains the queue for up to `window_ms`, groups requests that
+    share a key and runs one batched `run_batch(key, images)` per group,
+    fanning the per-image results back to the waiting callers.  The queue is
+    bounded: once `max_pending` images are waiting, `submit()` raises
+    Overloaded instead of letting request threads pile up behind the model.
+    """
+
+    def __init__(self, run_batch, window_ms: float = BATCH_WINDOW_MS,
+                 max_batch: int = BATCH_MAX_SIZE, max_pending: int = QUEUE_MAX):
+        self._run_batch  = run_batch
+        self.window      = max(0.0, window_ms) / 1000.0
+        self.max_batch   = max(1, max_batch)
+        self.max_pending = max(0, max_pending)     # 0 = unbounded
+        self._lock       = threading.Lock()
+        self._pid        = None
+        self._queue      = None
+        self._thread     = None
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    def submit(self, key, image, timeout: float | None = None):
+        """Queue one image and block until its result is ready."""
+        fut = Future()
+        try:
+            self._ensure_worker().put_nowait((key, image, fut))
+        except queue.Full:
+            raise Overloaded(f"inference queue full ({self.max_pending} waiting)") from None
+        return fut.result(timeout)
+
+    def submit_many(self, key, images: list, timeout: float | None = None) -> list:
+        """
+        Queue several images under one key (e.g. the tiles of one picture) and
+        block until all are done; they are dispatched together, so up to
+        `max_batch` of them share a forward pass.  All-or-nothing: if the
+        queue cannot take every image, none of them run.
+        """
+        futs = [Future() for _ in images]
+        q    = self._ensure_worker()
+        for i, (img, fut) in enumerate(zip(images, futs)):
+            try:
+                q.put_nowait((key, img, fut))
+            except queue.Full:
+                for f in futs[:i]:
+                    f.cancel()                   # the worker skips cancelled futures
+                raise Overloaded(f"inference queue full ({self.max_pending} waiting)") from None
+        return [f.result(timeout) for f in futs]
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    # ── Worker ────────────────────────────────────────────────────────────────
+
+    def _ensure_worker(self) -> queue.Queue:
+        # Threads do not survive fork(), so a forked server worker gets its
+        # own queue and thread on first use.
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue  = queue.Queue(self.max_pending)
+                self._thread = threading.Thread(target=self._loop,
+                                                args=(self._queue,), daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def _loop(self, q: queue.Queue):
+        while True:
+            key, image, fut = q.get()
+            groups   = {key: [(image, fut)]}
+            deadline = time.monotonic() + self.window
+
+            # Collect until the window closes or the first group is full
+            while len(groups[key]) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    k, img, f = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                groups.setdefault(k, []).append((img, f))
+
+            for k, items in groups.items():
+                for i in range(0, len(items), self.max_batch):
+                    self._dispatch(k, items[i:i + self.max_batch])
+
+    def _dispatch(self, key, items):
+        items = [(img, f) for img, f in items if f.set_running_or_notify_cancel()]
+        if not items:
+            return
+        try:
+            results = list(self._run_batch(key, [img for img, _ in items]))
+            if len(results) != len(items):
+                # zip() would leave the unmatched callers waiting forever
+                raise RuntimeError(f"batch returned {len(results)} results for {len(items)} images")
+        except Exception as exc:
+            for _, f in items:
+                f.set_exception(exc)
+            return
+        for (_, f), res in zip(items, results):
+            f.set_result(res)
@@ -0,0 +1,178 @@
+# Inference benchmark: latency percentiles, throughput, peak RSS
+import io, os, sys, time, itertools, platform, tracemalloc
+import numpy as np
+from pathlib import Path
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def synthetic_images(n: int = 8, size: tuple = (640, 480), seed: int = 0) -> list:
+    """Random-noise BGR frames with a few filled rectangles (deterministic)."""
+    rng  = np.random.default_rng(seed)
+    w, h = size
+    imgs = []
+    for _ in range(n):
+        im = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+        for _ in range(3):
+            x0, y0 = rng.integers(0, w // 2), rng.integers(0, h // 2)
+            im[y0:y0 + h // 4, x0:x0 + w // 4] = rng.integers(0, 255, 3, dtype=np.uint8)
+        imgs.append(im)
+    return imgs
+
+
+def load_images(folder: str, n: int = 8) -> list:
+    """Up to n images from a folder as BGR uint8 arrays."""
+    import cv2
+    files = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in IMAGE_EXTS)
+    imgs  = [cv2.imread(str(p)) for p in files[:n]]
+    return [im for im in imgs if im is not None]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1_048_576 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return 0.0
+
+
+def _percentiles(samples_ms: list) -> dict:
+    a = np.asarray(samples_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    return {
+        "p50_ms":  round(float(p50), 2),
+        "p95_ms":  round(float(p95), 2),
+        "p99_ms":  round(float(p99), 2),
+        "mean_ms": round(float(a.mean()), 2),
+    }
+
+
+def run_case(model, images: list, imgsz: int, batch: int, iters: int = 20,
+             warmup: int = 3, device="cpu") -> dict:
+    """Time `iters` predict calls of `batch` images each (after `warmup` calls)."""
+    cycle   = itertools.cycle(images)
+    batches = [[next(cycle) for _ in range(batch)] for _ in range(warmup + iters)]
+
+    for b in batches[:warmup]:
+        model.predict(source=b, imgsz=imgsz, device=device, verbose=False)
+
+    lat = []
+    t0  = time.perf_counter()
+    for b in batches[warmup:]:
+        t = time.perf_counter()
+        model.predict(source=b, imgsz=imgsz, device=device, verbose=False)
+        lat.append((time.perf_counter() - t) * 1000)
+    total = time.perf_counter() - t0
+
+    return {
+        **_percentiles(lat),
+        "throughput_ips": round(batch * iters / total, 2),
+        "peak_rss_mb":    round(peak_rss_mb(), 1),
+    }
+
+
+def run_suite(load, sizes=("n",), imgsz=(640,), batches=(1,), backends=("pytorch",),
+              threads=(None,), images=None, iters: int = 20, warmup: int = 3,
+              device="cpu") -> dict:
+    """
+    Benchmark every combination of the given axes.
+
+    `load(size, backend, imgsz)` returns (model, weights_path); it is called
+    once per (size, backend, imgsz) so model loading is not timed.  `threads`
+    sets torch intra-op threads (None = leave as is); ONNX Runtime / OpenVINO
+    manage their own thread pools and ignore it.
+    """
+    import torch
+    images   = images or synthetic_images()
+    default  = torch.get_num_threads()
+    cases    = []
+
+    for size, backend, sz in itertools.product(sizes, backends, imgsz):
+        t       = time.perf_counter()
+        model, weights = load(size, backend, sz)
+        load_ms = round((time.perf_counter() - t) * 1000, 1)
+        for bs, nt in itertools.product(batches, threads):
+            torch.set_num_threads(nt or default)
+            case = {"model": f"yolo11{size}", "backend": backend, "weights": weights,
+                    "imgsz": sz, "batch": bs, "threads": nt or default, "load_ms": load_ms}
+            try:
+                case.update(run_case(model, images, sz, bs, iters, warmup, device))
+            except Exception as exc:
+                case["error"] = str(exc)
+            cases.append(case)
+    torch.set_num_threads(default)
+
+    return {
+        "host": {
+            "platform":  platform.platform(),
+            "python":    platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "torch":     torch.__version__,
+        },
+        "iters":  iters,
+        "images": len(images),
+        "cases":  cases,
+    }
+
+
+# ── Frame codec micro-benchmark ───────────────────────────────────────────────
+
+def _pil_roundtrip(raw: bytes, max_w: int, quality: int):
+    """The former webcam path: PIL decode → RGB → resize → asarray → flip → re-encode."""
+    from PIL import Image
+    img  = Image.open(io.BytesIO(raw)).convert("RGB")
+    w, h = img.size
+    if w > max_w:
+        img = img.resize((max_w, int(h * max_w / w)), Image.BILINEAR)
+    arr = np.asarray(img, dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(arr[..., ::-1]).save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _cv2_roundtrip(raw: bytes, max_w: int, quality: int):
+    """utils.imgcodec: DCT-scaled decode into a reused BGR buffer → encode from it."""
+    from utils.imgcodec import decode_image, encode_jpeg
+    return encode_jpeg(decode_image(raw, max_w), quality)
+
+
+def _codec_case(fn, raw: bytes, max_w: int, quality: int, iters: int) -> dict:
+    for _ in range(3):
+        fn(raw, max_w, quality)
+    lat, peaks = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(iters):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            t    = time.perf_counter()
+            fn(raw, max_w, quality)
+            lat.append((time.perf_counter() - t) * 1000)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return {**_percentiles(lat), "peak_alloc_kb": round(float(np.mean(peaks)) / 1024, 1)}
+
+
+def codec_bench(raw: bytes | None = None, max_w: int = 640, quality: int = 75,
+                iters: int = 50, size: tuple = (1280, 720)) -> dict:
+    """
+    Per-frame cost of the webcam decode → encode round trip, PIL vs OpenCV.
+
+    `peak_alloc_kb` is the transient memory the Python/numpy allocators
+    handed out per frame (tracemalloc; PIL's own C buffers are invisible to
+    it, so the PIL figure is a lower bound).  Without `raw` a synthetic
+    `size` frame is JPEG-encoded at quality 90.
+    """
+    if raw is None:
+        from utils.imgcodec import encode_jpeg
+        raw = encode_jpeg(synthetic_images(1, size)[0], 90).tobytes()
+    return {
+        "bytes":  len(raw),
+        "max_w":  max_w,
+        "iters":  iters,
+        "pil":    _codec_case(_pil_roundtrip, raw, max_w, quality, iters),
+        "opencv": _codec_case(_cv2_roundtrip, raw, max_w, quality, iters),
+    }
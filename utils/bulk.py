@@ -0,0 +1,165 @@
+# Bulk image detection: lazy sources → threaded decode → fixed-size batches → rows
+import os, json, time, shutil, zipfile, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from utils.imgcodec import decode_image
+
+IMAGE_EXTS   = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+BULK_WORKERS = int(os.environ.get("YOLO_BULK_WORKERS", 0))       # decode threads, 0 = auto
+# Server-local directories /detect/batch may read (os.pathsep-separated)
+BULK_ROOTS   = [p for p in os.environ.get("YOLO_BULK_ROOTS", "data").split(os.pathsep) if p]
+MAX_BATCH    = 32
+
+
+def _is_image(name: str) -> bool:
+    return (os.path.splitext(name)[1].lower() in IMAGE_EXTS
+            and not name.startswith("__MACOSX/") and not os.path.basename(name).startswith("."))
+
+
+def zip_source(zf: zipfile.ZipFile) -> list:
+    """(name, read) per image member, in path order; nothing is read yet."""
+    infos = sorted((i for i in zf.infolist() if not i.is_dir() and _is_image(i.filename)),
+                   key=lambda i: i.filename)
+    return [(i.filename, lambda i=i: zf.read(i)) for i in infos]
+
+
+def dir_source(path: str) -> list:
+    """(name relative to `path`, read) per image below a directory inside BULK_ROOTS."""
+    root = Path(path).resolve()
+    if not any(root == r or r in root.parents for r in (Path(b).resolve() for b in BULK_ROOTS)):
+        raise PermissionError(f"{path} is outside the allowed roots ({', '.join(BULK_ROOTS)})")
+    if not root.is_dir():
+        raise ValueError(f"Not a directory: {path}")
+    files = sorted(p for p in root.rglob("*") if p.is_file() and _is_image(p.name))
+    return [(str(p.relative_to(root)), p.read_bytes) for p in files]
+
+
+def files_source(files: list) -> list:
+    """(filename, read) per uploaded multipart file."""
+    return [(f.filename or f"image{i}", f.read) for i, f in enumerate(files)]
+
+
+class CocoWriter:
+    """
+    Streams a COCO-style file — images, categories and scored annotations —
+    to disk.  Annotations are spooled to a side file as they arrive, so
+    memory stays flat however many images pass through.  Category ids are
+    class index + 1, as Ultralytics uses for non-COCO datasets.
+    """
+
+    def __init__(self, path: str):
+        self.path    = path
+        self.names   = {}
+        self._ann_id = 0
+        self._images = open(path, "w")
+        self._anns   = tempfile.TemporaryFile("w+")
+        self._images.write('{"images":[')
+        self._first  = True
+
+    def add(self, image_id: int, file_name: str, w: int, h: int, xyxy, conf, cls, names: dict):
+        self.names.update(names)
+        self._images.write(("" if self._first else ",") + json.dumps(
+            {"id": image_id, "file_name": file_name, "width": w, "height": h}))
+        self._first = False
+        for (x1, y1, x2, y2), p, c in zip(xyxy.tolist(), conf.tolist(), cls.tolist()):
+            self._ann_id += 1
+            bw, bh = x2 - x1, y2 - y1
+            self._anns.write(("," if self._ann_id > 1 else "") + json.dumps(
+                {"id": self._ann_id, "image_id": image_id, "category_id": int(c) + 1,
+                 "bbox": [round(x1, 2), round(y1, 2), round(bw, 2), round(bh, 2)],
+                 "area": round(bw * bh, 2), "score": round(p, 4), "iscrowd": 0}))
+
+    def close(self):
+        cats = [{"id": int(k) + 1, "name": v} for k, v in sorted(self.names.items())]
+        self._images.write('],"categories":' + json.dumps(cats) + ',"annotations":[')
+        self._anns.seek(0)
+        shutil.copyfileobj(self._anns, self._images)
+        self._images.write("]}")
+        self._images.close()
+        self._anns.close()
+
+
+def detect_images(items: list, predict, summarize, arrays=None, batch: int = 8,
+                  workers: int = BULK_WORKERS, out_dir: str | None = None,
+                  annotate: bool = False, coco: bool = False):
+    """
+    Generator of one result dict per image of `items` ((name, read) pairs),
+    in input order, then a final {"summary": …}.
+
+    Images are read and decoded on a thread pool one batch ahead of the
+    model, so at most two batches of pixels are alive at once.  Each batch
+    of up to `batch` images goes through `predict(list_of_bgr) → results`
+    in one call; `summarize(result)` gives the row's detections.  With
+    `annotate`, plotted images go to <out_dir>/annotated/; with `coco`,
+    boxes (from `arrays(result)` → xyxy, conf, cls, names) go to
+    <out_dir>/coco.json and rows carry only counts.  An image that cannot
+    be read or decoded yields an {"error"} row and does not stop the run.
+    """
+    batch   = max(1, min(MAX_BATCH, int(batch)))
+    workers = workers or min(4, os.cpu_count() or 1)
+    ann_dir = os.path.join(out_dir, "annotated") if annotate else None
+    if ann_dir or coco:
+        os.makedirs(ann_dir or out_dir, exist_ok=True)
+    writer  = CocoWriter(os.path.join(out_dir, "coco.json")) if coco else None
+    counts  = {"images": 0, "failed": 0, "detections": 0}
+    t0      = time.perf_counter()
+
+    def load(item):
+        name, read = item
+        try:
+            return decode_image(read()), None
+        except Exception as exc:
+            return None, str(exc) or type(exc).__name__
+
+    chunks = [items[i:i + batch] for i in range(0, len(items), batch)]
+    with ThreadPoolExecutor(workers, thread_name_prefix="bulk-decode") as pool:
+        ahead = [pool.submit(load, it) for it in chunks[0]] if chunks else []
+        try:
+            for n, chunk in enumerate(chunks):
+                decoded = [f.result() for f in ahead]
+                ahead   = ([pool.submit(load, it) for it in chunks[n + 1]]
+                           if n + 1 < len(chunks) else [])
+                ok      = [i for i, (img, _) in enumerate(decoded) if img is not None]
+                results = dict(zip(ok, predict([decoded[i][0] for i in ok]))) if ok else {}
+                for i, (name, _) in enumerate(chunk):
+                    index    = n * batch + i
+                    img, err = decoded[i]
+                    if err is not None:
+                        counts["failed"] += 1
+                        yield {"index": index, "file": name, "error": err}
+                        continue
+                    result = results[i]
+                    h, w   = img.shape[:2]
+                    row    = {"index": index, "file": name, "width": w, "height": h,
+                              **summarize(result)}
+                    counts["images"]     += 1
+                    counts["detections"] += row["count"]
+                    if writer:
+                        writer.add(index + 1, name, w, h, *arrays(result))
+                        row.pop("detections", None)
+                    if ann_dir:
+                        row["annotated"] = _save_annotated(ann_dir, index, name, result)
+                    yield row
+        finally:
+            for f in ahead:
+                f.cancel()
+            if writer:
+                writer.close()
+
+    elapsed = time.perf_counter() - t0
+    outputs = {}
+    if ann_dir:
+        outputs["annotated"] = ann_dir
+    if writer:
+        outputs["coco"] = writer.path
+    yield {"summary": {**counts, "elapsed_s": round(elapsed, 3),
+                       "images_per_s": round(counts["images"] / elapsed, 2) if elapsed else None,
+                       "batch": batch, "outputs": outputs}}
+
+
+def _save_annotated(ann_dir: str, index: int, name: str, result) -> str:
+    import cv2
+    stem = "".join(c if c.isalnum() or c in "-_" else "_" for c in Path(name).stem)[:80]
+    path = os.path.join(ann_dir, f"{index:06d}_{stem}.jpg")
+    cv2.imwrite(path, result.plot())
+    return path
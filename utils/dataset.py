@@ -1,6 +1,23 @@
-# Zip extraction, class parsing, data.yaml builder
-import os, zipfile, shutil, json, yaml
-from pathlib import Path
+# Zip extraction, class parsing, data.yaml builder, preprocessed image cache
+import os, math, zipfile, shutil, json, yaml, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+try:
+    import fcntl
+except ImportError:          # non-POSIX: cache builds are only serialised within a process
+    fcntl = None
+
+# Members other than these are skipped during extraction
+ALLOWED_EXTS    = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".txt", ".json", ".yaml", ".yml"}
+MAX_MEMBER_MB   = int(os.environ.get("YOLO_MAX_MEMBER_MB", 200))
+MAX_RATIO       = 200          # uncompressed / compressed — zip-bomb guard
+COPY_BUFSIZE    = 1024 * 1024
+
+IMAGE_EXTS      = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+CACHE_ROOT      = os.environ.get("YOLO_CACHE_ROOT", "data/cache")
+CACHE_KEEP      = int(os.environ.get("YOLO_CACHE_KEEP", 3))   # newest caches kept on disk
+CACHE_FORMAT    = 2            # bump when cached pixels change; part of the cache key
 
 
 def extract_labelstudio_zip(zip_path: str, dest_dir: str) -> dict:
@@ -19,8 +36,7 @@ def extract_labelstudio_zip(zip_path: str, dest_dir: str) -> dict:
         shutil.rmtree(dest)          # replace previous dataset
     dest.mkdir(parents=True, exist_ok=True)
 
-    with zipfile.ZipFile(zip_path, "r") as z:
-        z.extractall(dest)
+    stream_extract(zip_path, dest)
 
     classes   = _find_classes(dest)
     img_train = _count_images(dest / "images" / "train") + _count_images(dest / "images")
@@ -36,6 +52,34 @@ def extract_labelstudio_zip(zip_path: str, dest_dir: str) -> dict:
     }
 
 
+def stream_extract(zip_path: str, dest: Path) -> int:
+    """
+    Extract member by member with bounded memory instead of `extractall`.
+
+    Each member is validated before anything is written: no absolute paths,
+    `..` components or symlinks, only dataset file types, and a per-member
+    size cap plus compression-ratio check.  Returns the number of files written.
+    """
+    written = 0
+    root    = dest.resolve()
+    with zipfile.ZipFile(zip_path, "r") as z:
+        for info in z.infolist():
+            if info.is_dir():
+                continue
+            rel = _safe_member_path(info)
+            if rel is None:
+                continue
+            out = (root / rel).resolve()
+            if root not in out.parents:
+                raise ValueError(f"Unsafe path in zip: {info.filename}")
+
+            out.parent.mkdir(parents=True, exist_ok=True)
+            with z.open(info) as src, open(out, "wb") as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFSIZE)
+            written += 1
+    return written
+
+
 def build_data_yaml(dataset_root: str, classes: list, output_path: str) -> str:
     root      = Path(dataset_root)
     train_dir = root / "images" / "train"
@@ -60,8 +104,397 @@ def build_data_yaml(dataset_root: str, classes: list, output_path: str) -> str:
     return output_path
 
 
+def snapshot_dataset(src_root: str, dest_root: str) -> str:
+    """
+    Hard-link copy of a dataset (falls back to copying across filesystems)
+    with its own data.yaml, so a queued job keeps its data even if a new
+    upload replaces the current dataset.  Returns the new data.yaml path.
+    """
+    src, dest = Path(src_root), Path(dest_root)
+    if dest.exists():
+        shutil.rmtree(dest)
+    for f in src.rglob("*"):
+        if f.is_dir() or f.name == "data.yaml":
+            continue
+        out = dest / f.relative_to(src)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(f, out)
+        except OSError:
+            shutil.copy2(f, out)
+
+    with open(src / "data.yaml") as f:
+        classes = yaml.safe_load(f).get("names", [])
+    return build_data_yaml(str(dest), classes, str(dest / "data.yaml"))
+
+
+def count_images(dataset_root: str) -> int:
+    """Number of images under <dataset_root>/images (all splits)."""
+    return _count_images(Path(dataset_root) / "images")
+
+
+# ── Preprocessed image cache ──────────────────────────────────────────────────
+# Layout of data/cache/<dataset-hash>_<imgsz>/:
+#   images.u8   every image resized so its long side == imgsz (BGR, as Ultralytics
+#               loads it), concatenated as raw uint8 — opened with np.memmap
+#   index.json  {"imgsz", "images": [[relpath, offset, h, w, h0, w0]]}
+# The web process (warm-up after upload) and training workers may build the
+# same key at once — snapshots are hardlinks and hash alike — so builds are
+# serialised by a flock on <key>.lock and written to a per-pid tmp dir.
+
+_cache_lock = threading.Lock()
+
+
+def dataset_hash(root: str) -> str:
+    """Content hash of every image and label file under root (path + bytes)."""
+    root = Path(root)
+    h    = hashlib.sha1()
+    for f in sorted(p for p in root.rglob("*")
+                    if p.suffix.lower() in IMAGE_EXTS or p.suffix == ".txt"):
+        h.update(f.relative_to(root).as_posix().encode())
+        with open(f, "rb") as fh:
+            for buf in iter(lambda: fh.read(COPY_BUFSIZE), b""):
+                h.update(buf)
+    return h.hexdigest()
+
+
+def build_image_cache(dataset_root: str, imgsz: int = 640,
+                      cache_root: str = CACHE_ROOT) -> str:
+    """
+    Decode + resize every image once and pack the results for training.
+
+    Keyed by dataset hash + imgsz, so re-running on the same data skips the
+    work entirely.  Concurrent callers for the same key wait for one build.
+    Returns the cache directory.
+    """
+    import cv2, numpy as np
+
+    root = Path(dataset_root)
+    key  = f"{dataset_hash(root)[:16]}_{imgsz}_v{CACHE_FORMAT}"
+    out  = Path(cache_root) / key
+
+    Path(cache_root).mkdir(parents=True, exist_ok=True)
+    with _cache_lock, open(Path(cache_root) / f"{key}.lock", "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if (out / "index.json").exists():
+            os.utime(out)                    # mark as recently used
+            return str(out)
+
+        for stale in Path(cache_root).glob(f"{key}.tmp*"):
+            shutil.rmtree(stale, ignore_errors=True)   # left by a builder that died
+        tmp = Path(cache_root) / f"{key}.tmp-{os.getpid()}"
+        tmp.mkdir()
+
+        files = sorted(p for p in (root / "images").rglob("*")
+                       if p.suffix.lower() in IMAGE_EXTS)
+
+        def _load(path):
+            im = cv2.imread(str(path))       # BGR, like Ultralytics
+            if im is None:
+                return None
+            h0, w0 = im.shape[:2]
+            r = imgsz / max(h0, w0)
+            if r != 1:                       # same shape + pixels as BaseDataset.load_image
+                w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+                im   = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+            return im, h0, w0
+
+        entries, offset = [], 0
+        try:
+            with open(tmp / "images.u8", "wb") as f, \
+                 ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+                for path, loaded in zip(files, pool.map(_load, files)):
+                    if loaded is None:
+                        continue             # corrupt — Ultralytics will report it
+                    im, h0, w0 = loaded
+                    f.write(np.ascontiguousarray(im).tobytes())
+                    entries.append([path.relative_to(root).as_posix(), offset,
+                                    im.shape[0], im.shape[1], h0, w0])
+                    offset += im.nbytes
+            with open(tmp / "index.json", "w") as f:
+                json.dump({"imgsz": imgsz, "images": entries}, f)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        if out.exists():
+            shutil.rmtree(out)               # incomplete: no index.json
+        os.replace(tmp, out)                 # atomic: readers see all of it or nothing
+        _prune_caches(Path(cache_root))
+    return str(out)
+
+
+class ImageCache:
+    """Read side of build_image_cache: memory-mapped, picklable for dataloader workers."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, "index.json")) as f:
+            index = json.load(f)
+        self.imgsz  = index["imgsz"]
+        self.images = {e[0]: e[1:] for e in index["images"]}
+        self._data  = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_data"] = None                # reopen the memmap in the worker
+        return state
+
+    def get(self, relpath: str):
+        """(BGR image, (h0, w0), (h, w)) — the load_image contract — or None."""
+        import numpy as np
+        e = self.images.get(relpath)
+        if e is None:
+            return None
+        if self._data is None:
+            self._data = np.memmap(os.path.join(self.cache_dir, "images.u8"),
+                                   dtype=np.uint8, mode="r")
+        off, h, w, h0, w0 = e[:5]
+        im = np.array(self._data[off:off + h * w * 3]).reshape(h, w, 3)
+        return im, (h0, w0), (h, w)
+
+class CachedImageLoader:
+    """
+    Drop-in replacement for an Ultralytics dataset's `load_image` that reads
+    from an ImageCache and falls back to the original decoder on a miss.
+
+    A hit does the same bookkeeping as BaseDataset.load_image: when
+    augmenting, the image joins `dataset.buffer` (and ims / im_hw0 / im_hw),
+    which Mosaic and MixUp draw their extra images from.
+    """
+
+    def __init__(self, dataset, cache: ImageCache, dataset_root: str):
+        self.dataset  = dataset
+        self.cache    = cache
+        self.root     = os.path.abspath(dataset_root)
+        self.fallback = dataset.load_image
+
+    def __call__(self, i, rect_mode=True, **kwargs):
+        ds = self.dataset
+        if rect_mode and not kwargs.get("resize_short") and ds.ims[i] is None:
+            rel = os.path.relpath(os.path.abspath(ds.im_files[i]), self.root)
+            hit = self.cache.get(Path(rel).as_posix())
+            if hit is not None:
+                im, hw0, hw = hit
+                if ds.augment and getattr(ds, "cache", None) != "ram":
+                    ds.ims[i], ds.im_hw0[i], ds.im_hw[i] = im, hw0, hw
+                    ds.buffer.append(i)
+                    if 1 < len(ds.buffer) >= ds.max_buffer_length:   # prevent empty buffer
+                        j = ds.buffer.pop(0)
+                        ds.ims[j], ds.im_hw0[j], ds.im_hw[j] = None, None, None
+                return hit
+        return self.fallback(i, rect_mode, **kwargs)
+
+
+def attach_image_cache(dataset, cache_dir: str, dataset_root: str) -> bool:
+    """Route `dataset.load_image` through the cache when its imgsz matches."""
+    cache = ImageCache(cache_dir)
+    if getattr(dataset, "imgsz", None) != cache.imgsz or getattr(dataset, "channels", 3) != 3:
+        return False
+    dataset.load_image = CachedImageLoader(dataset, cache, dataset_root)
+    return True
+
+
+def cached_trainer(cache_dir: str, dataset_root: str, on_attach=None):
+    """
+    DetectionTrainer subclass whose datasets read from the image cache.
+
+    The cache is attached in build_dataset(), before the dataloader exists:
+    InfiniteDataLoader starts its worker processes in __init__, and they
+    keep whatever `load_image` the dataset had at that moment.
+    """
+    from ultralytics.models.yolo.detect import DetectionTrainer
+
+    class CachedTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            dataset = super().build_dataset(img_path, mode, batch)
+            if attach_image_cache(dataset, cache_dir, dataset_root) and on_attach:
+                on_attach(dataset)
+            return dataset
+
+    return CachedTrainer
+
+
+# ── Ingest validation ─────────────────────────────────────────────────────────
+# Every image must decode and every label line must be "cls x y w h" with
+# 0 <= cls < nc and normalised coordinates, or the upload is rejected before
+# a training run can trip over it.  Checks run in a process pool; the stats
+# are then computed over all boxes at once.
+
+VALIDATE_WORKERS = int(os.environ.get("YOLO_VALIDATE_WORKERS", 0))   # 0 = auto
+VALIDATE_CHUNK   = 64          # files per pool task
+VALIDATE_SERIAL  = 200         # fewer images than this are checked in-process
+MAX_PROBLEMS     = 50          # problems listed in the report (all are counted)
+COORD_TOL        = 1e-3        # slack for coordinates rounded just past 0 / 1
+
+BOX_BINS    = (0, 8, 16, 32, 64, 128, 256, 512)          # sqrt(box area) in px
+IMAGE_BINS  = (0, 320, 480, 640, 960, 1280, 1920, 4096)   # long side in px
+IMGSZ_STEPS = (320, 416, 512, 640, 768, 960, 1280)
+
+
+def _check_files(args):
+    """Pool task: [(image, label)] → [(image, (h, w) | None, rows (n, 5), problems)]."""
+    import cv2, numpy as np
+    nc, pairs = args
+    out = []
+    for image, label in pairs:
+        problems, rows = [], []
+        im = cv2.imread(image, cv2.IMREAD_UNCHANGED)
+        if im is None:
+            problems.append(("error", image, 0, "image does not decode"))
+        if not os.path.exists(label):
+            problems.append(("warning", image, 0, "no label file (background image)"))
+        else:
+            with open(label, encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+            for n, line in enumerate(lines, 1):
+                parts = line.split()
+                if not parts:
+                    continue
+                try:
+                    vals = [float(v) for v in parts]
+                except ValueError:
+                    problems.append(("error", label, n, "non-numeric value"))
+                    continue
+                if len(vals) != 5:
+                    problems.append(("error", label, n, f"expected 5 values, got {len(vals)}"))
+                    continue
+                cls = vals[0]
+                if cls != int(cls) or not 0 <= cls < nc:
+                    problems.append(("error", label, n, f"class id {parts[0]} not in 0..{nc - 1}"))
+                    continue
+                x, y, w, h = vals[1:]
+                if (w <= 0 or h <= 0 or min(x - w / 2, y - h / 2) < -COORD_TOL
+                        or max(x + w / 2, y + h / 2) > 1 + COORD_TOL):
+                    problems.append(("error", label, n, "box outside the normalised 0–1 range"))
+                    continue
+                rows.append(vals)
+            if not rows and not any(p[0] == "error" and p[1] == label for p in problems):
+                problems.append(("warning", label, 0, "empty label file (background image)"))
+        shape = im.shape[:2] if im is not None else None
+        out.append((image, shape, np.asarray(rows, np.float32).reshape(-1, 5), problems))
+    return out
+
+
+def validate_dataset(dataset_root: str, num_classes: int, workers: int | None = None) -> dict:
+    """
+    Check a freshly extracted dataset and summarise it.
+
+    Returns {"ok", "errors", "warnings", "problems": [first MAX_PROBLEMS],
+    "stats"}: per-class instance counts, a histogram of box sizes (sqrt of
+    pixel area), image size distribution and a suggested imgsz.  "ok" is
+    False when any image fails to decode or any label line is malformed,
+    has a class id >= num_classes or a box outside the image.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from utils.resources import usable_cpus
+
+    root   = Path(dataset_root)
+    images = sorted(p for p in (root / "images").rglob("*") if p.suffix.lower() in IMAGE_EXTS)
+    pairs  = [(str(p), str(_label_path_for(root, p))) for p in images]
+    tasks  = [(num_classes, pairs[i:i + VALIDATE_CHUNK])
+              for i in range(0, len(pairs), VALIDATE_CHUNK)]
+
+    workers = workers or VALIDATE_WORKERS or min(8, usable_cpus())
+    if len(pairs) < VALIDATE_SERIAL or workers <= 1:
+        results = [r for t in tasks for r in _check_files(t)]
+    else:
+        import multiprocessing as mp
+        with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn")) as pool:
+            results = [r for chunk in pool.map(_check_files, tasks) for r in chunk]
+
+    labelled = {lab for _, lab in pairs}
+    orphans  = [str(p) for p in (root / "labels").rglob("*.txt")
+                if str(p) not in labelled] if (root / "labels").exists() else []
+
+    problems = [p for *_, probs in results for p in probs]
+    problems += [("warning", p, 0, "label file without an image") for p in orphans]
+    errors   = sum(p[0] == "error" for p in problems)
+    problems.sort(key=lambda p: p[0] != "error")             # errors first
+    return {
+        "ok":       errors == 0,
+        "errors":   errors,
+        "warnings": len(problems) - errors,
+        "problems": [{"level": lvl, "file": os.path.relpath(f, root), "line": n, "issue": msg}
+                     for lvl, f, n, msg in problems[:MAX_PROBLEMS]],
+        "stats":    _dataset_stats(results, num_classes),
+    }
+
+
+def _dataset_stats(results: list, num_classes: int) -> dict:
+    import numpy as np
+    shapes = np.array([r[1] for r in results if r[1] is not None], np.float32).reshape(-1, 2)
+    boxes  = [r[2] for r in results if r[1] is not None]
+    sizes  = np.repeat(shapes, [len(b) for b in boxes], axis=0)        # (N, 2) h, w per box
+    rows   = np.concatenate(boxes) if boxes else np.zeros((0, 5), np.float32)
+
+    counts = np.bincount(rows[:, 0].astype(np.int64), minlength=num_classes)
+    px_w   = rows[:, 3] * sizes[:, 1]
+    px_h   = rows[:, 4] * sizes[:, 0]
+    side   = np.sqrt(px_w * px_h)
+    long   = shapes.max(axis=1) if len(shapes) else np.zeros(0, np.float32)
+
+    def hist(values, bins):
+        edges = list(bins) + [np.inf]
+        n, _  = np.histogram(values, bins=edges)
+        return {f"{lo}-{hi}" if hi != np.inf else f"{lo}+": int(c)
+                for lo, hi, c in zip(edges[:-1], edges[1:], n)}
+
+    def pct(values):
+        if not len(values):
+            return None
+        p = np.percentile(values, [0, 10, 50, 90, 100])
+        return dict(zip(("min", "p10", "median", "p90", "max"), np.round(p, 1).tolist()))
+
+    # Smallest standard imgsz at which the 10th-percentile box is still >= 8 px
+    # after the long side is resized to imgsz (never above the median image)
+    suggested = None
+    if len(side) and len(long):
+        rel_small = float(np.percentile(side / sizes.max(axis=1), 10))
+        need      = 8 / max(rel_small, 1e-6)
+        median    = float(np.median(long))
+        fits      = [s for s in IMGSZ_STEPS if s >= need]
+        suggested = min(fits[0] if fits else IMGSZ_STEPS[-1],
+                        max(s for s in IMGSZ_STEPS if s <= max(median, IMGSZ_STEPS[0])))
+
+    return {
+        "images":          len(results),
+        "decoded":         int(len(shapes)),
+        "instances":       int(len(rows)),
+        "background":      int(sum(len(b) == 0 for b in boxes)),
+        "class_counts":    counts[:num_classes].tolist(),
+        "box_size_hist":   hist(side, BOX_BINS),
+        "box_px":          pct(side),
+        "image_long_hist": hist(long, IMAGE_BINS),
+        "image_width":     pct(shapes[:, 1]),
+        "image_height":    pct(shapes[:, 0]),
+        "suggested_imgsz": suggested,
+    }
+
+
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
+def _safe_member_path(info: zipfile.ZipInfo) -> PurePosixPath | None:
+    """Validated relative path for a zip member, or None to skip it."""
+    name = info.filename.replace("\\", "/")
+    path = PurePosixPath(name)
+    if path.is_absolute() or ".." in path.parts or name.startswith("/"):
+        raise ValueError(f"Unsafe path in zip: {info.filename}")
+    if (info.external_attr >> 16) & 0o170000 == 0o120000:
+        raise ValueError(f"Symlink in zip: {info.filename}")
+    if path.name.startswith(".") or "__MACOSX" in path.parts:
+        return None
+    if path.suffix.lower() not in ALLOWED_EXTS:
+        return None
+    if info.file_size > MAX_MEMBER_MB * 1_048_576:
+        raise ValueError(f"{info.filename} exceeds {MAX_MEMBER_MB} MB")
+    if (info.file_size > COPY_BUFSIZE and info.compress_size
+            and info.file_size / info.compress_size > MAX_RATIO):
+        raise ValueError(f"Suspicious compression ratio for {info.filename}")
+    return path
+
+
 def _find_classes(root: Path) -> list:
     """Try classes.txt → notes.json → return empty list."""
     for f in root.rglob("classes.txt"):
@@ -82,6 +515,35 @@ def _find_classes(root: Path) -> list:
     return []
 
 
+def _label_path_for(root: Path, image: Path) -> Path:
+    """images/<split>/x.jpg → labels/<split>/x.txt (YOLO convention)."""
+    rel = image.relative_to(root / "images")
+    return (root / "labels" / rel).with_suffix(".txt")
+
+
+def _read_label_rows(path: Path):
+    import numpy as np
+    if not path.exists():
+        return np.zeros((0, 5), np.float32)
+    rows = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        parts = line.split()
+        if len(parts) == 5:
+            try:
+                rows.append([float(v) for v in parts])
+            except ValueError:
+                continue
+    return np.asarray(rows, np.float32).reshape(-1, 5)
+
+
+def _prune_caches(cache_root: Path):
+    caches = sorted((d for d in cache_root.iterdir()
+                     if d.is_dir() and ".tmp" not in d.name),
+                    key=lambda d: d.stat().st_mtime, reverse=True)
+    for old in caches[CACHE_KEEP:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
 def _count_images(path: Path) -> int:
     if not path.exists():
         return 0
@@ -0,0 +1,188 @@
+# Detection accuracy on a labelled set: IoU matching, per-class AP, confusion matrix
+import numpy as np
+from utils.tracking import iou_matrix
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)     # COCO mAP50-95
+EVAL_CONF      = 0.001      # predict threshold — AP needs the whole precision/recall curve
+CM_CONF        = 0.25       # confusion matrix only counts boxes a user would see …
+CM_IOU         = 0.45       # … matched at this IoU (Ultralytics' defaults)
+
+
+def labels_to_xyxy(rows: np.ndarray, w: int, h: int):
+    """YOLO label rows (cls, cx, cy, bw, bh normalised) → (cls int64, xyxy px float32)."""
+    cls = rows[:, 0].astype(np.int64)
+    cx, cy, bw, bh = (rows[:, 1] * w, rows[:, 2] * h, rows[:, 3] * w, rows[:, 4] * h)
+    xyxy = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+    return cls, xyxy.astype(np.float32)
+
+
+def class_map(model_names: dict, dataset_names: list):
+    """
+    Model class index → dataset class index.  By name when every dataset
+    class exists in the model (model-only classes map to -1 and are
+    ignored), else by index.  Returns (lookup array, "name" | "index").
+    """
+    size = max(model_names, default=-1) + 1
+    if set(dataset_names) <= set(model_names.values()):
+        pos    = {n: i for i, n in enumerate(dataset_names)}
+        lookup = np.full(size, -1, np.int64)
+        for k, n in model_names.items():
+            lookup[k] = pos.get(n, -1)
+        return lookup, "name"
+    lookup = np.arange(size, dtype=np.int64)
+    lookup[lookup >= len(dataset_names)] = -1
+    return lookup, "index"
+
+
+def match_predictions(pred_cls: np.ndarray, gt_cls: np.ndarray, iou: np.ndarray,
+                      thresholds: np.ndarray = IOU_THRESHOLDS) -> np.ndarray:
+    """
+    (P, T) bool: prediction p is a true positive at threshold t.
+
+    `iou` is (G, P).  At each threshold every same-class pair above it is a
+    candidate; sorting candidates by IoU and keeping the first occurrence
+    of each prediction and then of each ground truth gives the greedy
+    one-to-one matching without a per-box loop.
+    """
+    correct = np.zeros((len(pred_cls), len(thresholds)), dtype=bool)
+    if not len(pred_cls) or not len(gt_cls):
+        return correct
+    iou = iou * (gt_cls[:, None] == pred_cls[None, :])
+    for t, thr in enumerate(thresholds):
+        gi, pi = np.nonzero(iou >= thr)
+        if not len(gi):
+            continue
+        order  = np.argsort(-iou[gi, pi], kind="stable")
+        gi, pi = gi[order], pi[order]
+        _, first = np.unique(pi, return_index=True)
+        gi, pi   = gi[first], pi[first]
+        _, first = np.unique(gi, return_index=True)
+        correct[pi[first], t] = True
+    return correct
+
+
+def _one_to_one(iou: np.ndarray, thr: float):
+    """Greedy highest-IoU pairs above `thr` → (gt indices, pred indices)."""
+    gi, pi = np.nonzero(iou > thr)
+    if len(gi) > 1:
+        order  = np.argsort(-iou[gi, pi], kind="stable")
+        gi, pi = gi[order], pi[order]
+        _, first = np.unique(pi, return_index=True)
+        gi, pi   = gi[first], pi[first]
+        _, first = np.unique(gi, return_index=True)
+        gi, pi   = gi[first], pi[first]
+    return gi, pi
+
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> np.ndarray:
+    """
+    COCO 101-point AP for every column of (N, T) recall / precision curves
+    at once: the precision envelope is a reversed running maximum.
+    """
+    t    = recall.shape[1]
+    mrec = np.vstack([np.zeros(t), recall, np.ones(t)])
+    mpre = np.vstack([np.ones(t), precision, np.zeros(t)])
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre, 0), 0), 0)
+    x    = np.linspace(0, 1, 101)
+    ap   = np.empty(t)
+    for j in range(t):
+        y     = np.interp(x, mrec[:, j], mpre[:, j])
+        ap[j] = ((y[1:] + y[:-1]) / 2 * np.diff(x)).sum()
+    return ap
+
+
+class Evaluator:
+    """
+    Accumulates per-image matches, then reduces them to metrics.
+
+    `add()` costs one IoU matrix per image; everything else is array
+    operations.  Precision / recall are reported at the confidence that
+    maximises mean F1 across classes, as Ultralytics' validator does.
+    """
+
+    def __init__(self, names: list):
+        self.names     = list(names)
+        self.nc        = len(self.names)
+        self.confusion = np.zeros((self.nc + 1, self.nc + 1), np.int64)   # [pred, gt]
+        self._tp, self._conf, self._pcls, self._gcls = [], [], [], []
+        self.images    = 0
+
+    def add(self, pred_xyxy, pred_conf, pred_cls, gt_xyxy, gt_cls):
+        """One image: predictions (cls already in dataset indices) vs ground truth."""
+        iou = iou_matrix(gt_xyxy.astype(np.float32), pred_xyxy.astype(np.float32))
+        self._tp.append(match_predictions(pred_cls, gt_cls, iou))
+        self._conf.append(pred_conf.astype(np.float32))
+        self._pcls.append(pred_cls)
+        self._gcls.append(gt_cls)
+        self._update_confusion(iou, pred_conf, pred_cls, gt_cls)
+        self.images += 1
+
+    def _update_confusion(self, iou, conf, pred_cls, gt_cls):
+        keep     = conf >= CM_CONF
+        pred_cls = pred_cls[keep]
+        gi, pi   = _one_to_one(iou[:, keep], CM_IOU)
+        bg       = self.nc
+        np.add.at(self.confusion, (pred_cls[pi], gt_cls[gi]), 1)
+        missed   = np.ones(len(gt_cls), bool)
+        missed[gi] = False
+        np.add.at(self.confusion, (bg, gt_cls[missed]), 1)
+        extra    = np.ones(len(pred_cls), bool)
+        extra[pi] = False
+        np.add.at(self.confusion, (pred_cls[extra], bg), 1)
+
+    def summary(self) -> dict:
+        tp   = np.concatenate(self._tp) if self._tp else np.zeros((0, len(IOU_THRESHOLDS)), bool)
+        conf = np.concatenate(self._conf) if self._conf else np.zeros(0, np.float32)
+        pcls = np.concatenate(self._pcls) if self._pcls else np.zeros(0, np.int64)
+        gcls = np.concatenate(self._gcls) if self._gcls else np.zeros(0, np.int64)
+        n_gt = np.bincount(gcls, minlength=self.nc)[:self.nc]
+
+        order = np.argsort(-conf, kind="stable")
+        tp, conf, pcls = tp[order], conf[order], pcls[order]
+        grid  = np.linspace(0, 1, 1000)
+        ap    = np.zeros((self.nc, len(IOU_THRESHOLDS)))
+        p_cur = np.zeros((self.nc, len(grid)))
+        r_cur = np.zeros((self.nc, len(grid)))
+        for c in np.flatnonzero(n_gt):
+            sel = pcls == c
+            if not sel.any():
+                continue
+            tpc    = tp[sel].cumsum(0)
+            fpc    = (~tp[sel]).cumsum(0)
+            recall = tpc / n_gt[c]
+            prec   = tpc / (tpc + fpc)
+            # curves are indexed by falling confidence, np.interp needs rising x
+            r_cur[c] = np.interp(-grid, -conf[sel], recall[:, 0], left=0)
+            p_cur[c] = np.interp(-grid, -conf[sel], prec[:, 0], left=1)
+            ap[c]    = average_precision(recall, prec)
+
+        present = np.flatnonzero(n_gt)
+        f1      = 2 * p_cur * r_cur / (p_cur + r_cur + 1e-16)
+        best    = int(f1[present].mean(0).argmax()) if len(present) else 0
+        p, r    = p_cur[:, best], r_cur[:, best]
+
+        def mean(v):
+            return round(float(v[present].mean()), 4) if len(present) else 0.0
+
+        return {
+            "images":         self.images,
+            "instances":      int(n_gt.sum()),
+            "precision":      mean(p),
+            "recall":         mean(r),
+            "f1":             mean(f1[:, best]),
+            "mAP50":          mean(ap[:, 0]),
+            "mAP50_95":       mean(ap.mean(1)),
+            "conf_threshold": round(float(grid[best]), 3),
+            "per_class": [
+                {"class": self.names[c], "instances": int(n_gt[c]),
+                 "precision": round(float(p[c]), 4), "recall": round(float(r[c]), 4),
+                 "mAP50": round(float(ap[c, 0]), 4), "mAP50_95": round(float(ap[c].mean()), 4)}
+                for c in range(self.nc)
+            ],
+            "confusion_matrix": {
+                "labels": self.names + ["background"],
+                "matrix": self.confusion.tolist(),       # rows: predicted, columns: true
+                "conf":   CM_CONF,
+                "iou":    CM_IOU,
+            },
+        }
@@ -0,0 +1,89 @@
+# JPEG ↔ BGR numpy for the detection hot path (OpenCV, no PIL round-trips)
+import threading
+import numpy as np
+
+# Start-of-frame markers carrying the image size (baseline, progressive, …)
+_SOF     = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_NO_LEN  = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+_REDUCED = (8, 4, 2)     # libjpeg DCT scaling factors OpenCV exposes
+
+_local = threading.local()
+
+
+def jpeg_size(raw: bytes):
+    """(width, height) from a JPEG header without decoding, or None if not a JPEG."""
+    if raw[:2] != b"\xff\xd8":
+        return None
+    i, n = 2, len(raw)
+    while i + 4 <= n:
+        if raw[i] != 0xFF:
+            return None
+        marker = raw[i + 1]
+        if marker == 0xFF:                   # fill byte
+            i += 1
+            continue
+        if marker in _NO_LEN:
+            i += 2
+            continue
+        if marker in _SOF and i + 9 <= n:
+            h = int.from_bytes(raw[i + 5:i + 7], "big")
+            w = int.from_bytes(raw[i + 7:i + 9], "big")
+            return w, h
+        i += 2 + int.from_bytes(raw[i + 2:i + 4], "big")
+    return None
+
+
+def _buffer(shape: tuple) -> np.ndarray:
+    """This thread's reusable output buffer, reallocated only when the shape changes."""
+    buf = getattr(_local, "buf", None)
+    if buf is None or buf.shape != shape:
+        buf = _local.buf = np.empty(shape, dtype=np.uint8)
+    return buf
+
+
+def decode_image(raw: bytes, max_w: int | None = None) -> np.ndarray:
+    """
+    Encoded image bytes → contiguous BGR uint8, at most `max_w` px wide.
+
+    JPEGs wider than `max_w` are decoded DCT-scaled (1/2, 1/4 or 1/8 — the
+    largest reduction that still leaves at least `max_w` px), so most of the
+    downscale costs nothing; the remainder is resized into a per-thread
+    buffer that is reused across frames.  A resized result is therefore only
+    valid until the same thread decodes its next frame.
+    """
+    import cv2
+    data = np.frombuffer(raw, dtype=np.uint8)          # no copy
+    flag = cv2.IMREAD_COLOR
+    size = jpeg_size(raw) if max_w else None
+    if size:
+        for f in _REDUCED:
+            if -(-size[0] // f) >= max_w:
+                flag = getattr(cv2, f"IMREAD_REDUCED_COLOR_{f}")
+                break
+    img = cv2.imdecode(data, flag)
+    if img is None:
+        raise ValueError("Could not decode image")
+    h, w = img.shape[:2]
+    if max_w and w > max_w:
+        dst = _buffer((max(1, round(h * max_w / w)), max_w, 3))
+        cv2.resize(img, (max_w, dst.shape[0]), dst=dst, interpolation=cv2.INTER_LINEAR)
+        img = dst
+    return img
+
+
+def encode_jpeg(bgr: np.ndarray, quality: int = 75) -> np.ndarray:
+    """BGR array → JPEG as a 1-D uint8 buffer (bytes-like; base64 encodes it directly)."""
+    import cv2
+    ok, buf = cv2.imencode(".jpg", bgr, (cv2.IMWRITE_JPEG_QUALITY, int(quality)))
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buf
+
+
+def thumbnail(bgr: np.ndarray, width: int, quality: int = 40) -> np.ndarray:
+    """Downscaled (never enlarged) JPEG preview `width` px wide."""
+    import cv2
+    h, w = bgr.shape[:2]
+    if w > width:
+        bgr = cv2.resize(bgr, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    return encode_jpeg(bgr, quality)
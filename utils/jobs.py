@@ -0,0 +1,459 @@
+# Job queue: per-job state records, bounded worker-process pool, progress over pipes
+import os, re, json, time, uuid, heapq, atexit, threading
+from collections import deque
+import multiprocessing as mp
+
+try:
+    import fcntl
+except ImportError:          # non-POSIX: worker slots are only limited per process
+    fcntl = None
+
+MAX_WORKERS   = int(os.environ.get("YOLO_TRAIN_WORKERS", 1))
+RESERVE_CORES = int(os.environ.get("YOLO_TRAIN_RESERVE_CORES", -1))   # -1 = auto
+PIN_CORES     = os.environ.get("YOLO_TRAIN_PIN_CORES", "1") == "1"
+LOG_LIMIT     = 200
+EVENT_LIMIT   = 1000     # per-job change events kept for SSE resume
+# Records are mirrored here so every server process (gunicorn worker) can
+# read, list and stop jobs owned by another one.  "" disables the store.
+STORE_DIR     = os.environ.get("YOLO_JOBS_DIR", "runs/jobs")
+POLL_S        = 1.0      # how often stop markers / foreign-held slots are rechecked
+
+FINISHED = ("done", "error", "stopped")
+
+
+def new_job_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+class Reporter:
+    """Child-process side of the progress pipe."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def _send(self, kind, payload):
+        with self._lock:
+            try:
+                self._conn.send((kind, payload))
+            except (OSError, ValueError):
+                pass                         # parent went away — keep training
+
+    def set(self, **kw):
+        self._send("set", kw)
+
+    def log(self, msg: str):
+        self._send("log", msg)
+
+    def append(self, key: str, item):
+        self._send("append", (key, item))
+
+
+def _child_entry(target, job_id, cfg, conn, cancel, cores):
+    if cores:
+        try:
+            os.sched_setaffinity(0, cores)
+        except (AttributeError, OSError):
+            pass
+    try:
+        target(job_id, cfg, Reporter(conn), cancel)
+    finally:
+        conn.close()
+
+
+class JobManager:
+    """
+    Priority/FIFO queue of jobs run in separate worker processes.
+
+    Each job owns a state record (a plain dict, same shape the UI polls)
+    that the parent updates from messages the child sends over a pipe.  At
+    most `max_workers` jobs run at once; each worker slot can be pinned to
+    its own share of the CPU cores, leaving `reserve_cores` for the server.
+    Higher `priority` runs first; equal priorities run in submission order.
+
+    Every change to a record is also appended, with a per-job sequence
+    number, to a bounded event ring so watchers can block in
+    `events_since()` and receive only what changed.
+
+    With a `store_dir`, several server processes can share one queue: each
+    record is mirrored to <store_dir>/<id>.json, worker slots are claimed
+    with flock() so `max_workers` holds across processes, and a job owned by
+    another process is stopped by dropping a <id>.stop marker its owner
+    polls for.
+    """
+
+    def __init__(self, target, initial_state, max_workers: int = MAX_WORKERS,
+                 pin_cores: bool = PIN_CORES, reserve_cores: int = RESERVE_CORES,
+                 on_finish=None, store_dir: str = STORE_DIR):
+        self._target      = target
+        self._initial     = initial_state
+        self.max_workers  = max(1, max_workers)
+        self._on_finish   = on_finish
+        self._ctx         = mp.get_context("spawn")
+        self._cv          = threading.Condition()
+        self._jobs        = {}      # id → state record
+        self._events      = {}      # id → deque[(seq, kind, payload)]
+        self._running     = {}      # id → {"cancel", "process", "slot"}
+        self._heap        = []
+        self._seq         = 0
+        self._free_slots  = list(range(self.max_workers))
+        self._slot_cores  = self._partition_cores(pin_cores, reserve_cores)
+        self._dispatcher  = None
+        self._store       = store_dir
+        self._persisted   = {}      # id → time of last store write
+        atexit.register(self.shutdown)
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    def submit(self, cfg: dict, priority: int = 0, job_id: str | None = None) -> str:
+        job_id = job_id or new_job_id()
+        rec = {
+            **self._initial(cfg),
+            "id":          job_id,
+            "status":      "queued",
+            "priority":    priority,
+            "config":      cfg,
+            "queued_at":   time.time(),
+            "started_at":  None,
+            "finished_at": None,
+            "cores":       None,
+            "owner":       os.getpid(),
+            "log":         deque(maxlen=LOG_LIMIT),
+            "seq":         0,
+        }
+        with self._cv:
+            self._jobs[job_id] = rec
+            self._events[job_id] = deque(maxlen=EVENT_LIMIT)
+            self._persist(rec)
+            heapq.heappush(self._heap, (-priority, self._seq, job_id))
+            self._seq += 1
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+                self._dispatcher.start()
+            self._cv.notify_all()
+        return job_id
+
+    def cancel(self, job_id: str, force: bool = False) -> bool:
+        """Stop a job: queued jobs are dropped, running ones stop after the epoch."""
+        with self._cv:
+            rec = self._jobs.get(job_id)
+            if rec is None:
+                return self._request_stop(job_id, force)
+            if rec["status"] in FINISHED:
+                return False
+            if rec["status"] == "queued":
+                self._set(rec, status="stopped", finished_at=time.time())
+                finished = dict(rec)
+            else:
+                run = self._running[job_id]
+                run["cancel"].set()
+                if force:
+                    run["process"].terminate()
+                return True
+        if self._on_finish:
+            self._on_finish(finished)
+        return True
+
+    def is_local(self, job_id: str) -> bool:
+        """True when this process owns the job (and so has its event ring)."""
+        with self._cv:
+            return job_id in self._jobs
+
+    def snapshot(self, job_id: str) -> dict | None:
+        with self._cv:
+            rec = self._jobs.get(job_id)
+            if rec is None:
+                return self._load(job_id)
+            snap = dict(rec)
+            snap["log"] = list(rec["log"])
+            if "history" in rec:
+                snap["history"] = list(rec["history"])
+            return snap
+
+    def status(self, job_id: str) -> str | None:
+        with self._cv:
+            rec = self._jobs.get(job_id)
+        if rec is None:
+            rec = self._load(job_id)
+        return rec["status"] if rec else None
+
+    def events_since(self, job_id: str, after: int, timeout: float = 15.0):
+        """
+        Block until the job has events newer than `after` (or it finishes, or
+        `timeout` passes).  Returns (events, seq) — possibly an empty list —
+        or None when `after` has already dropped off the ring and the caller
+        should start over from a snapshot.
+        """
+        with self._cv:
+            rec = self._jobs.get(job_id)
+            if rec is None:
+                return None
+            self._cv.wait_for(lambda: rec["seq"] > after or rec["status"] in FINISHED,
+                              timeout)
+            ring = self._events[job_id]
+            if rec["seq"] > after and (not ring or ring[0][0] > after + 1):
+                return None
+            out = []
+            for ev in reversed(ring):
+                if ev[0] <= after:
+                    break
+                out.append(ev)
+            out.reverse()
+            return out, rec["seq"]
+
+    def list_jobs(self) -> list:
+        """Summaries (no log / history), newest first — across all processes."""
+        with self._cv:
+            recs = list(self._jobs.values())
+            local = set(self._jobs)
+        recs += [rec for rec in map(self._load, self._stored_ids() - local) if rec]
+        jobs = [{k: v for k, v in rec.items() if k not in ("log", "history")} for rec in recs]
+        jobs.sort(key=lambda j: j["queued_at"], reverse=True)
+        return jobs
+
+    def latest(self) -> str | None:
+        jobs = self.list_jobs()
+        return jobs[0]["id"] if jobs else None
+
+    def queue_position(self, job_id: str) -> int:
+        with self._cv:
+            queued = sorted(e for e in self._heap
+                            if self._jobs.get(e[2], {}).get("status") == "queued")
+            ids = [e[2] for e in queued]
+            return ids.index(job_id) + 1 if job_id in ids else 0
+
+    def active_count(self) -> int:
+        """Queued + running jobs in every process sharing the store."""
+        return sum(1 for j in self.list_jobs() if j["status"] not in FINISHED)
+
+    def counts(self) -> dict:
+        """Jobs by status owned by this process."""
+        with self._cv:
+            out = {}
+            for r in self._jobs.values():
+                out[r["status"]] = out.get(r["status"], 0) + 1
+            return out
+
+    def shutdown(self):
+        with self._cv:
+            procs = [r["process"] for r in self._running.values()]
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+
+    def _partition_cores(self, pin: bool, reserve: int) -> list:
+        if not pin:
+            return [None] * self.max_workers
+        try:
+            cpus = sorted(os.sched_getaffinity(0))
+        except (AttributeError, OSError):
+            return [None] * self.max_workers
+        if reserve < 0:
+            reserve = 1 if len(cpus) > 2 else 0
+        pool = cpus[reserve:] or cpus
+        per  = max(1, len(pool) // self.max_workers)
+        return [pool[i * per:(i + 1) * per] or pool for i in range(self.max_workers)]
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cv:
+                while True:
+                    self._check_stop_markers()
+                    # Drop heap entries cancelled while queued
+                    while self._heap and self._jobs[self._heap[0][2]]["status"] != "queued":
+                        heapq.heappop(self._heap)
+                    claim = self._claim_slot() if self._heap else None
+                    if claim:
+                        break
+                    self._cv.wait(POLL_S)
+                _, _, job_id = heapq.heappop(self._heap)
+                rec         = self._jobs[job_id]
+                slot, lock  = claim
+                cores  = self._slot_cores[slot]
+                cancel = self._ctx.Event()
+                parent_conn, child_conn = self._ctx.Pipe(duplex=False)
+                # Not a daemon: Ultralytics dataloader workers are child processes
+                proc = self._ctx.Process(
+                    target=_child_entry,
+                    args=(self._target, job_id, rec["config"], child_conn, cancel, cores),
+                    name=f"train-{job_id}",
+                )
+                self._set(rec, status="running", started_at=time.time(), cores=cores)
+                self._running[job_id] = {"cancel": cancel, "process": proc, "slot": slot,
+                                         "lock": lock}
+            try:
+                proc.start()
+            except Exception as exc:
+                child_conn.close()
+                self._finish(job_id, error=f"Could not start worker: {exc}")
+                continue
+            child_conn.close()
+            threading.Thread(target=self._pump, args=(job_id, parent_conn),
+                             daemon=True).start()
+
+    def _pump(self, job_id: str, conn):
+        while True:
+            try:
+                if not conn.poll(POLL_S):
+                    with self._cv:
+                        self._check_stop_markers()
+                    continue
+                kind, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            self._apply(job_id, kind, payload)
+        conn.close()
+        self._running[job_id]["process"].join()
+        self._finish(job_id)
+
+    def _emit(self, rec: dict, kind: str, payload):
+        """Record one change on the job's event ring; caller holds _cv."""
+        rec["seq"] += 1
+        self._events[rec["id"]].append((rec["seq"], kind, payload))
+        self._cv.notify_all()
+        # Log lines are frequent — mirror them at most once a second
+        if kind != "log" or time.time() - self._persisted.get(rec["id"], 0) > 1.0:
+            self._persist(rec)
+
+    def _set(self, rec: dict, **fields):
+        rec.update(fields)
+        self._emit(rec, "set", fields)
+
+    def _apply(self, job_id: str, kind: str, payload):
+        with self._cv:
+            rec = self._jobs[job_id]
+            if kind == "set":
+                rec.update(payload)
+            elif kind == "log":
+                rec["log"].append(payload)
+            elif kind == "append":
+                key, item = payload
+                rec.setdefault(key, []).append(item)
+            self._emit(rec, kind, payload)
+
+    def _finish(self, job_id: str, error: str | None = None):
+        with self._cv:
+            rec = self._jobs[job_id]
+            run = self._running.pop(job_id)
+            final = {"finished_at": time.time()}
+            if rec["status"] not in FINISHED:
+                # Worker exited without reporting a final status
+                if run["cancel"].is_set():
+                    final["status"] = "stopped"
+                else:
+                    code = run["process"].exitcode
+                    final.update(status="error",
+                                 error=error or f"Training worker exited with code {code}")
+            self._set(rec, **final)
+            if run["lock"] is not None:
+                os.close(run["lock"])            # releases the flock
+            self._free_slots.append(run["slot"])
+            self._free_slots.sort()
+            finished = dict(rec)
+        if self._on_finish:
+            self._on_finish(finished)
+
+    # ── Cross-process store ───────────────────────────────────────────────────
+
+    def _path(self, job_id: str, ext: str) -> str:
+        return os.path.join(self._store, f"{job_id}.{ext}")
+
+    def _persist(self, rec: dict):
+        """Mirror a record to the store; caller holds _cv."""
+        if not self._store:
+            return
+        self._persisted[rec["id"]] = time.time()
+        path = self._path(rec["id"], "json")
+        tmp  = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self._store, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump({**rec, "log": list(rec["log"])}, f, default=str)
+            os.replace(tmp, path)
+        except OSError as exc:
+            print(f"[jobs] could not persist {rec['id']}: {exc}")
+
+    def _stored_ids(self) -> set:
+        if not self._store or not os.path.isdir(self._store):
+            return set()
+        return {n[:-5] for n in os.listdir(self._store) if n.endswith(".json")}
+
+    def _load(self, job_id: str) -> dict | None:
+        """Read a record owned by another process from the store."""
+        if not self._store or not re.fullmatch(r"[\w-]+", job_id or ""):
+            return None
+        try:
+            with open(self._path(job_id, "json")) as f:
+                rec = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if rec["status"] not in FINISHED and not _pid_alive(rec.get("owner")):
+            rec.update(status="error", error="Server process exited before the job finished")
+        return rec
+
+    def _request_stop(self, job_id: str, force: bool) -> bool:
+        """Ask the owning process to stop a job this process does not own."""
+        rec = self._load(job_id)
+        if rec is None or rec["status"] in FINISHED:
+            return False
+        try:
+            with open(self._path(job_id, "stop"), "w") as f:
+                f.write("force" if force else "")
+        except OSError:
+            return False
+        return True
+
+    def _check_stop_markers(self):
+        """Act on stop requests other processes left for our jobs; caller holds _cv."""
+        if not self._store:
+            return
+        for job_id, rec in list(self._jobs.items()):
+            if rec["status"] in FINISHED:
+                continue
+            marker = self._path(job_id, "stop")
+            try:
+                with open(marker) as f:
+                    force = f.read() == "force"
+                os.remove(marker)
+            except OSError:
+                continue
+            if rec["status"] == "queued":
+                self._set(rec, status="stopped", finished_at=time.time())
+                if self._on_finish:
+                    threading.Thread(target=self._on_finish, args=(dict(rec),),
+                                     daemon=True).start()
+            else:
+                run = self._running[job_id]
+                run["cancel"].set()
+                if force:
+                    run["process"].terminate()
+
+    def _claim_slot(self):
+        """Claim a free worker slot → (slot, lock fd | None), or None; caller holds _cv."""
+        for slot in self._free_slots:
+            fd = None
+            if self._store and fcntl:
+                try:
+                    os.makedirs(self._store, exist_ok=True)
+                    fd = os.open(os.path.join(self._store, f"slot-{slot}.lock"),
+                                 os.O_CREAT | os.O_RDWR)
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    if fd is not None:
+                        os.close(fd)
+                    continue                 # held by another server process
+            self._free_slots.remove(slot)
+            return slot, fd
+        return None
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except (TypeError, ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,167 @@
+# Hot-path timing & Prometheus-style text metrics
+import os, time, threading
+from contextlib import contextmanager
+from functools import wraps
+
+SERVER_TIMING = os.environ.get("YOLO_SERVER_TIMING", "1") == "1"
+
+# Seconds; covers sub-ms decode stages up to multi-second cold model loads
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Registry:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text
+    exposition format.  Histograms and counters are recorded on the hot
+    path; gauges are callbacks evaluated only when /metrics is scraped.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets  = buckets
+        self._lock    = threading.Lock()
+        self._help    = {}       # name → (type, help)
+        self._hist    = {}       # (name, labels) → [bucket counts…, sum, count]
+        self._counter = {}       # (name, labels) → value
+        self._gauges  = []       # (name, fn) — fn() → number | {labels-tuple: number}
+
+    def _declare(self, name, kind, help_text):
+        self._help.setdefault(name, (kind, help_text))
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            h = self._hist.get(key)
+            if h is None:
+                h = self._hist[key] = [0] * (len(self.buckets) + 2)
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def inc(self, name: str, amount: float = 1, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            self._counter[key] = self._counter.get(key, 0) + amount
+
+    def gauge(self, name: str, help_text: str, fn, kind: str = "gauge"):
+        """Register a callback; it may return a number or {(("label", "v"),): number}."""
+        with self._lock:
+            self._declare(name, kind, help_text)
+            self._gauges.append((name, fn))
+
+    def render(self) -> str:
+        with self._lock:
+            hist    = {k: list(v) for k, v in self._hist.items()}
+            counter = dict(self._counter)
+            gauges  = list(self._gauges)
+            helps   = dict(self._help)
+
+        samples = {}     # name → [line, …]
+        for (name, labels), h in hist.items():
+            lab   = dict(labels)
+            lines = samples.setdefault(name, [])
+            for b, c in zip(self.buckets, h):
+                lines.append(f"{name}_bucket{_labels({**lab, 'le': b})} {c}")
+            lines.append(f"{name}_bucket{_labels({**lab, 'le': '+Inf'})} {h[-1]}")
+            lines.append(f"{name}_sum{_labels(lab)} {h[-2]:.6f}")
+            lines.append(f"{name}_count{_labels(lab)} {h[-1]}")
+        for (name, labels), v in counter.items():
+            samples.setdefault(name, []).append(f"{name}{_labels(dict(labels))} {v}")
+        for name, fn in gauges:
+            try:
+                val = fn()
+            except Exception:
+                continue
+            lines = samples.setdefault(name, [])
+            if isinstance(val, dict):
+                for labels, v in val.items():
+                    lines.append(f"{name}{_labels(dict(labels))} {v}")
+            elif val is not None:
+                lines.append(f"{name} {val}")
+
+        out = []
+        for name in sorted(samples):
+            kind, help_text = helps.get(name, ("untyped", ""))
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(samples[name])
+        return "\n".join(out) + "\n"
+
+
+registry = Registry()
+
+
+# ── Per-request stage timing ──────────────────────────────────────────────────
+
+class StageTimer:
+    """Times the stages of one request into `yolo_stage_seconds{route,stage}`."""
+
+    def __init__(self, route: str):
+        self.route  = route
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t
+            self.stages.append((name, dt))
+            registry.observe("yolo_stage_seconds", dt, "Per-stage request latency",
+                             route=self.route, stage=name)
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{n};dur={dt * 1000:.1f}" for n, dt in self.stages)
+
+
+class _NullTimer(StageTimer):
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+
+NULL_TIMER = _NullTimer("")
+
+_inflight      = {}
+_inflight_lock = threading.Lock()
+registry.gauge("yolo_inflight_requests", "Requests currently being handled",
+               lambda: {(("route", r),): n for r, n in _inflight.items()})
+
+
+def timed(route: str):
+    """
+    View decorator: puts a StageTimer on flask.g, tracks in-flight requests
+    and total latency, and adds a Server-Timing header to the response.
+    """
+    def deco(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import g, make_response
+            g.timer = StageTimer(route)
+            with _inflight_lock:
+                _inflight[route] = _inflight.get(route, 0) + 1
+            t = time.perf_counter()
+            try:
+                resp = make_response(view(*args, **kwargs))
+            finally:
+                with _inflight_lock:
+                    _inflight[route] -= 1
+                registry.observe("yolo_request_seconds", time.perf_counter() - t,
+                                 "End-to-end request latency", route=route)
+            registry.inc("yolo_requests_total", 1, "Requests by route and status",
+                         route=route, status=resp.status_code)
+            if SERVER_TIMING and g.timer.stages:
+                resp.headers["Server-Timing"] = g.timer.server_timing()
+            return resp
+        return wrapper
+    return deco
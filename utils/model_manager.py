@@ -1,29 +1,482 @@
 # Model discovery & caching
+import os, gc, json, time, hashlib, threading
+from collections import OrderedDict
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:          # non-POSIX: registry writes are not serialised across processes
+    fcntl = None
+
+MODEL_CACHE_MAX    = int(os.environ.get("YOLO_MODEL_CACHE_MAX", 3))
+MODEL_CACHE_MB     = float(os.environ.get("YOLO_MODEL_CACHE_MB", 0))   # summed model size, 0 = no budget
+
+# Inference backends, in the order "auto" prefers them on CPU
+BACKENDS        = ("openvino", "onnx", "pytorch")
+DEFAULT_BACKEND = os.environ.get("YOLO_BACKEND", "auto")
+
 
 def get_best_model_path() -> str | None:
-    """Return path of the most recently trained best.pt, or None."""
-    runs = Path("runs/detect")
-    if not runs.exists():
-        runs = Path("runs")
-    candidates = sorted(
-        runs.rglob("best.pt"),
-        key=lambda p: p.stat().st_mtime,
-        reverse=True,
-    )
-    return str(candidates[0]) if candidates else None
+    """Weights of the active model (set explicitly, else the newest run), or None."""
+    entry = model_registry().active()
+    return entry["path"] if entry else None
 
 
 def list_trained_models() -> list[dict]:
-    """List all best.pt weights found under runs/."""
-    runs   = Path("runs")
-    models = []
-    for pt in runs.rglob("best.pt"):
-        models.append({
-            "name":    pt.parent.parent.name,
-            "path":    str(pt),
-            "size_mb": round(pt.stat().st_size / 1_000_000, 1),
-        })
-    models.sort(key=lambda m: m["name"])
-    return models
\ No newline at end of file
+    """Registered trained models, sorted by run name."""
+    return sorted(model_registry().entries(), key=lambda m: m["name"])
+
+
+# ── Model registry ────────────────────────────────────────────────────────────
+# runs/registry.json indexes every trained model so page loads never walk
+# runs/; each training run writes its own entry when it finishes.
+
+REGISTRY_PATH = os.environ.get("YOLO_MODEL_REGISTRY", "runs/registry.json")
+REGISTRY_POLL = float(os.environ.get("YOLO_REGISTRY_POLL", 5))     # watcher period, seconds
+REGISTRY_SCAN = 12            # watcher passes between scans for unregistered run dirs
+RUNS_ROOT     = "runs/detect"
+
+
+def file_sha256(path: str, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _fitness(m: dict) -> float:
+    """Ultralytics' default model fitness: 0.1 × mAP50 + 0.9 × mAP50-95."""
+    return 0.1 * (m.get("mAP50") or 0.0) + 0.9 * (m.get("mAP50_95") or 0.0)
+
+
+class ModelRegistry:
+    """
+    Persistent JSON index of trained models with in-memory lookups.
+
+    The parsed index is reloaded only when the file's mtime changes, and
+    the newest, best (highest fitness) and active entries are resolved at
+    load time, so reads are dict lookups.  A watcher thread re-checks the
+    mtime every `poll` seconds and, every few passes, picks up run
+    directories that appeared without going through training (copied-in
+    weights) or lost their weights — one listdir of runs/detect, not a tree
+    walk.  Writes are read-modify-write under an flock so training worker
+    processes and every web worker can share the file.
+    """
+
+    def __init__(self, path: str = REGISTRY_PATH, runs_root: str = RUNS_ROOT,
+                 poll: float = REGISTRY_POLL):
+        self.path        = path
+        self.runs_root   = runs_root
+        self.poll        = poll
+        self._lock       = threading.Lock()
+        self._mtime      = None
+        self._models     = {}           # run_id → entry
+        self._ordered    = []           # newest first
+        self._active_id  = None
+        self._newest     = None
+        self._best       = None
+        self._watcher    = None         # pid that started the watcher (threads don't survive fork)
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+
+    def entries(self) -> list[dict]:
+        self._refresh()
+        return [dict(m) for m in self._ordered]
+
+    def get(self, run_id: str) -> dict | None:
+        self._refresh()
+        m = self._models.get(run_id)
+        return dict(m) if m else None
+
+    def active(self) -> dict | None:
+        """The explicitly activated model, else the newest one."""
+        self._refresh()
+        m = self._models.get(self._active_id) or self._newest
+        return dict(m) if m else None
+
+    def best(self) -> dict | None:
+        """The model with the highest validation fitness."""
+        self._refresh()
+        return dict(self._best) if self._best else None
+
+    def active_id(self) -> str | None:
+        self._refresh()
+        return self._active_id if self._active_id in self._models else None
+
+    def _refresh(self):
+        self._ensure_watcher()
+        if self._mtime is None and not os.path.exists(self.path):
+            self._migrate()
+        self._reload_if_changed()
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = 0
+        if mtime == self._mtime:
+            return
+        data = self._read()
+        with self._lock:
+            models = data.get("models", {})
+            self._models    = models
+            self._ordered   = sorted(models.values(), key=lambda m: m.get("finished_at") or 0,
+                                     reverse=True)
+            self._active_id = data.get("active")
+            self._newest    = self._ordered[0] if self._ordered else None
+            scored          = [m for m in self._ordered if m.get("metrics")]
+            self._best      = max(scored, key=lambda m: _fitness(m["metrics"])) if scored else None
+            self._mtime     = mtime
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # ── Writes ────────────────────────────────────────────────────────────────
+
+    def register(self, run_id: str, weights: str, hyperparams: dict | None = None,
+                 metrics: dict | None = None, started_at: float | None = None,
+                 status: str = "done") -> dict:
+        """Add or replace the entry for one run (called at the end of training)."""
+        st    = os.stat(weights)
+        entry = {
+            "run_id":      run_id,
+            "name":        os.path.basename(os.path.dirname(os.path.dirname(weights))),
+            "path":        weights,
+            "size_mb":     round(st.st_size / 1_000_000, 1),
+            "sha256":      file_sha256(weights),
+            "mtime":       st.st_mtime,
+            "started_at":  started_at,
+            "finished_at": time.time(),
+            "status":      status,
+            "hyperparams": hyperparams or {},
+            "metrics":     metrics or {},
+        }
+        self._update(lambda data: data["models"].__setitem__(run_id, entry))
+        return entry
+
+    def set_active(self, run_id: str | None):
+        """Pin the model /detect/ selects by default; None reverts to the newest."""
+        if run_id is not None and self.get(run_id) is None:
+            raise KeyError(run_id)
+        self._update(lambda data: data.__setitem__("active", run_id))
+
+    def _update(self, fn):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._read()
+            data.setdefault("models", {})
+            fn(data)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.path)
+        self._reload_if_changed()
+
+    # ── Discovery ─────────────────────────────────────────────────────────────
+
+    def _migrate(self):
+        """First start without an index: register every best.pt under runs/ once."""
+        found = {_run_id(pt): pt for pt in Path(os.path.dirname(self.path) or ".").rglob("best.pt")}
+
+        def apply(data):
+            for rid, pt in found.items():
+                data["models"].setdefault(rid, _discovered(rid, pt))
+        self._update(apply)
+
+    def scan(self):
+        """Register new run dirs under runs_root, update changed weights, drop deleted ones."""
+        known   = {m["path"]: m for m in self.entries()}
+        changes = {}
+        try:
+            dirs = [d for d in os.scandir(self.runs_root) if d.is_dir()]
+        except OSError:
+            dirs = []
+        for d in dirs:
+            pt = os.path.join(self.runs_root, d.name, "weights", "best.pt")
+            m  = known.get(pt)
+            try:
+                mtime = os.path.getmtime(pt)
+            except OSError:
+                continue
+            if m is None or m.get("mtime") != mtime:
+                changes[m["run_id"] if m else _run_id(Path(pt))] = pt
+        gone = [m["run_id"] for p, m in known.items() if not os.path.exists(p)]
+        if not changes and not gone:
+            return
+
+        def apply(data):
+            for rid, pt in changes.items():
+                old = data["models"].get(rid, {})
+                data["models"][rid] = {**_discovered(rid, Path(pt)),
+                                       **{k: old[k] for k in ("started_at", "hyperparams",
+                                                              "metrics") if old.get(k)}}
+            for rid in gone:
+                data["models"].pop(rid, None)
+        self._update(apply)
+
+    def _ensure_watcher(self):
+        if self.poll <= 0 or self._watcher == os.getpid():
+            return
+        with self._lock:
+            if self._watcher == os.getpid():
+                return
+            self._watcher = os.getpid()
+        threading.Thread(target=self._watch, name="model-registry", daemon=True).start()
+
+    def _watch(self):
+        passes = 0
+        while True:
+            time.sleep(self.poll)
+            passes += 1
+            try:
+                if passes % REGISTRY_SCAN == 0:
+                    self.scan()
+                self._reload_if_changed()
+            except Exception as exc:
+                print(f"[registry] watcher: {exc}")
+
+
+def _run_id(pt: Path) -> str:
+    """<run> for runs/detect/<run>/weights/best.pt, "<parent>/<run>" for other layouts."""
+    run = pt.parent.parent
+    return f"{run.parent.name}/{run.name}" if run.parent.name != "detect" else run.name
+
+
+def _discovered(run_id: str, pt: Path) -> dict:
+    st = pt.stat()
+    return {
+        "run_id":      run_id,
+        "name":        pt.parent.parent.name,
+        "path":        str(pt),
+        "size_mb":     round(st.st_size / 1_000_000, 1),
+        "sha256":      file_sha256(str(pt)),
+        "mtime":       st.st_mtime,
+        "started_at":  None,
+        "finished_at": st.st_mtime,
+        "status":      "discovered",
+        "hyperparams": {},
+        "metrics":     {},
+    }
+
+
+_registry      = None
+_registry_lock = threading.Lock()
+
+
+def model_registry() -> ModelRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+# ── Exported runtimes ─────────────────────────────────────────────────────────
+
+def exported_artifacts(pt_path: str) -> dict:
+    """
+    Exported siblings of a .pt file, using Ultralytics' naming:
+        best.onnx | best_openvino_model/ | best_int8_openvino_model/
+    """
+    pt   = Path(pt_path)
+    stem = pt.with_suffix("")
+    found = {}
+    for backend, candidates in (
+        ("openvino", [Path(f"{stem}_int8_openvino_model"), Path(f"{stem}_openvino_model")]),
+        ("onnx",     [pt.with_suffix(".onnx")]),
+    ):
+        for c in candidates:
+            if c.exists():
+                found[backend] = str(c)
+                break
+    return found
+
+
+def resolve_backend(pt_path: str, backend: str | None = None) -> str:
+    """
+    Pick the weights to load for `backend` ("auto" | "openvino" | "onnx" |
+    "pytorch").  "auto" prefers an exported artifact when one exists; an
+    explicit backend without an artifact falls back to the .pt file.
+    """
+    backend = (backend or DEFAULT_BACKEND).lower()
+    if backend == "pytorch":
+        return pt_path
+    found = exported_artifacts(pt_path)
+    if backend == "auto":
+        return next((found[b] for b in BACKENDS if b in found), pt_path)
+    return found.get(backend, pt_path)
+
+
+def export_model(pt_path: str, fmt: str, imgsz: int = 640, int8: bool = False,
+                 data: str | None = None) -> str:
+    """
+    Export trained weights to an optimised CPU runtime and return its path.
+
+    Exports use a dynamic batch axis so the micro-batcher can feed them.
+    INT8 is only supported for OpenVINO; calibration images come from the
+    val split of `data`, so the dataset must still be on disk.
+    """
+    from ultralytics import YOLO
+    if fmt not in ("onnx", "openvino"):
+        raise ValueError(f"Unsupported export format: {fmt}")
+    kwargs = dict(format=fmt, imgsz=imgsz, dynamic=True, verbose=False)
+    if int8 and fmt == "openvino":
+        kwargs.update(int8=True, data=data)
+    return str(YOLO(pt_path).export(**kwargs))
+
+
+# ── Model cache ───────────────────────────────────────────────────────────────
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB (0 when unknown)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1_048_576
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _path_bytes(path: str) -> int:
+    """Size of a weights file, or of every file under an exported model dir."""
+    p = Path(path)
+    try:
+        if p.is_dir():
+            return sum(f.stat().st_size for f in p.rglob("*") if f.is_file())
+        return p.stat().st_size
+    except OSError:
+        return 0
+
+
+def model_bytes(model, path: str) -> int:
+    """
+    Memory held by a loaded model: parameter + buffer bytes of the torch
+    module, else the on-disk size of an exported runtime (ONNX / OpenVINO
+    weights are mapped into memory at roughly that size).
+    """
+    module = getattr(model, "model", None)
+    try:
+        tensors = [*module.parameters(), *module.buffers()]
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except (AttributeError, TypeError):
+        return _path_bytes(path)
+
+
+class ModelCache:
+    """
+    Thread-safe LRU of loaded models keyed by (path, mtime).
+
+    A retrained best.pt gets a new mtime and therefore a new key, so stale
+    weights are never served.  Concurrent misses on the same key are
+    single-flight: one thread loads while the others wait for it.  The
+    optional memory budget is checked against each entry's size measured
+    at load time — process RSS rarely drops after a model is freed, so it
+    cannot tell whether evicting helped.  Values derived from a model
+    (`meta()`) live and die with its entry.
+    """
+
+    def __init__(self, loader, max_entries: int = MODEL_CACHE_MAX,
+                 budget_mb: float = MODEL_CACHE_MB, sizer=model_bytes):
+        self._loader     = loader
+        self._sizer      = sizer
+        self.max_entries = max(1, max_entries)
+        self.budget_mb   = budget_mb
+        self._entries    = OrderedDict()     # key → model
+        self._sizes      = {}                # key → bytes
+        self._meta       = {}                # key → {name: value derived from the model}
+        self._loading    = {}                # key → threading.Event
+        self._lock       = threading.Lock()
+        self.hits        = 0
+        self.misses      = 0
+
+    @staticmethod
+    def key(path: str) -> tuple:
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = 0.0                      # e.g. weights Ultralytics will download
+        return (str(path), mtime)
+
+    def get(self, path: str):
+        key = self.key(path)
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+                event = self._loading.get(key)
+                owner = event is None
+                if owner:
+                    event = self._loading[key] = threading.Event()
+                    self.misses += 1
+            if owner:
+                break
+            event.wait()                     # another thread is loading it
+
+        try:
+            model = self._loader(path)
+            size  = self._sizer(model, path)
+        except Exception:
+            with self._lock:
+                self._loading.pop(key, None)
+            event.set()
+            raise
+
+        with self._lock:
+            evicted = [self._drop(k) for k in [k for k in self._entries if k[0] == key[0]]]  # older mtime
+            self._entries[key] = model
+            self._sizes[key]   = size
+            self._loading.pop(key, None)
+            evicted += self._evict()
+        event.set()
+        if evicted:
+            del evicted
+            gc.collect()                     # outside the lock: lookups never wait on it
+        return model
+
+    def meta(self, path: str, name: str, compute):
+        """`compute(model)` for the model at `path`, cached alongside its entry."""
+        key = self.key(path)
+        with self._lock:
+            if name in self._meta.get(key, ()):
+                self._entries.move_to_end(key)
+                return self._meta[key][name]
+        value = compute(self.get(path))
+        with self._lock:
+            if key in self._entries:         # not evicted (or retrained) meanwhile
+                self._meta.setdefault(key, {})[name] = value
+        return value
+
+    def _drop(self, key):
+        self._sizes.pop(key, None)
+        self._meta.pop(key, None)
+        return self._entries.pop(key)
+
+    def _evict(self) -> list:
+        """Pop least-recently-used entries over the count / size budget → the evicted models."""
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            evicted.append(self._drop(next(iter(self._entries))))
+        if self.budget_mb > 0:
+            budget = self.budget_mb * 1_048_576
+            while len(self._entries) > 1 and sum(self._sizes.values()) > budget:
+                evicted.append(self._drop(next(iter(self._entries))))
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries":  [k[0] for k in self._entries],
+                "hits":     self.hits,
+                "misses":   self.misses,
+                "model_mb": round(sum(self._sizes.values()) / 1_048_576, 1),
+                "rss_mb":   round(_rss_mb(), 1),
+            }
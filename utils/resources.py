@@ -0,0 +1,87 @@
+# CPU / memory topology & training resource auto-tuning
+import os
+
+# "image" = the preprocessed image cache (utils/dataset.py); opt-in, never chosen by "auto"
+CACHE_MODES = ("auto", "ram", "disk", "none", "image")
+
+
+def usable_cpus() -> int:
+    """CPUs this process may run on (respects affinity / container cpusets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def available_memory_mb() -> float:
+    """MemAvailable from /proc/meminfo, falling back to free physical pages."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1_048_576
+    except (ValueError, OSError, AttributeError):
+        return 0.0
+
+
+def training_resources(cfg: dict | None = None, n_images: int = 0, imgsz: int = 640,
+                       cuda: bool = False, cpus: int | None = None) -> dict:
+    """
+    Resolve dataloader / threading / caching settings for one training run.
+
+    Any key in `cfg` that is missing or "auto" is tuned from the CPU count and
+    available memory: roughly half the cores feed the dataloader (capped at
+    8), the rest run torch intra-op kernels.  RAM caching is chosen only when
+    the decoded images fit comfortably in available memory, else disk.
+    The preprocessed image cache ("image") is only used when asked for.
+    """
+    cfg  = cfg or {}
+    cpus = cpus or usable_cpus()
+
+    def pick(key, auto):
+        v = cfg.get(key, "auto")
+        return auto if v in (None, "", "auto") else v
+
+    workers = int(pick("workers", min(8, max(0, (cpus - 2) // 2))))
+    threads = int(pick("threads", max(1, cpus - workers)))
+    interop = int(pick("interop_threads", max(1, min(4, cpus // 8))))
+    pin     = pick("pin_memory", cuda)
+    pin     = pin if isinstance(pin, bool) else str(pin).lower() in ("1", "true", "yes")
+
+    # Decoded uint8 images at imgsz (long side) ≈ 0.75 × square each.
+    ram_mb = n_images * imgsz * imgsz * 3 * 0.75 / 1_048_576
+    avail  = available_memory_mb()
+    if ram_mb and avail and ram_mb < 0.4 * avail:
+        auto_cache = "ram"
+    else:
+        auto_cache = "disk"
+    cache = str(pick("cache", auto_cache)).lower()
+    if cache not in CACHE_MODES[1:]:
+        raise ValueError(f"cache must be one of {', '.join(CACHE_MODES)}")
+
+    return {
+        "workers":          workers,
+        "threads":          threads,
+        "interop_threads":  interop,
+        "pin_memory":       pin,
+        "cache":            cache,
+        "cpus":             cpus,
+        "mem_available_mb": round(avail),
+    }
+
+
+def apply_torch_threads(threads: int, interop: int) -> list:
+    """Set torch thread pools; returns warnings for settings that could not apply."""
+    import torch
+    warnings = []
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(interop)
+    except RuntimeError:
+        # Only settable once per process, before any inter-op parallel work
+        warnings.append(f"inter-op threads already fixed at {torch.get_num_interop_threads()}")
+    return warnings
@@ -0,0 +1,106 @@
+# Detection result cache keyed by image content + model version
+import os, json, time, hashlib, threading
+from collections import OrderedDict
+
+RESULT_CACHE_MB  = float(os.environ.get("YOLO_RESULT_CACHE_MB", 64))    # 0 = disabled
+RESULT_CACHE_MAX = int(os.environ.get("YOLO_RESULT_CACHE_MAX", 1024))
+RESULT_CACHE_TTL = float(os.environ.get("YOLO_RESULT_CACHE_TTL", 600))
+
+
+def content_hash(raw: bytes) -> str:
+    """SHA-256 hex of the uploaded bytes — what browsers compute with crypto.subtle."""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def cache_key(digest: str, model_key: tuple, conf: float, imgsz: int,
+              variant: str = "") -> tuple:
+    """(content hash, model path, model mtime, conf, imgsz (0 = model default), response variant)."""
+    return (digest, model_key[0], model_key[1], round(float(conf), 4), int(imgsz), variant)
+
+
+def etag(key: tuple) -> str:
+    """Strong ETag value (unquoted): changes with the image, the weights' mtime and every option."""
+    return hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of detection responses with a TTL and a size budget.
+
+    Values are the JSON payloads a route returned; their serialized size is
+    charged against `budget_mb`.  The model's mtime is part of every key, so
+    a retrained best.pt never serves stale boxes — `invalidate()` only frees
+    the memory of entries that can no longer be hit.
+    """
+
+    def __init__(self, budget_mb: float = RESULT_CACHE_MB, max_entries: int = RESULT_CACHE_MAX,
+                 ttl: float = RESULT_CACHE_TTL):
+        self.budget      = int(budget_mb * 1_048_576)
+        self.max_entries = max(1, max_entries)
+        self.ttl         = ttl
+        self._entries    = OrderedDict()      # key → (payload, size, stored_at)
+        self._bytes      = 0
+        self._lock       = threading.Lock()
+        self.hits        = 0
+        self.misses      = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget > 0
+
+    def get(self, key: tuple) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] > self.ttl:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: tuple, payload: dict):
+        if not self.enabled:
+            return
+        size = len(json.dumps(payload, separators=(",", ":")))
+        if size > self.budget:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (payload, size, time.monotonic())
+            self._bytes       += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._bytes > self.budget):
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, model_path: str | None = None) -> int:
+        """
+        Drop entries for `model_path` and its exported siblings (best.onnx,
+        best_openvino_model/, …) — all entries when None.  Returns the count.
+        """
+        stem = os.path.splitext(os.path.abspath(model_path))[0] if model_path else None
+        with self._lock:
+            stale = [k for k in self._entries
+                     if stem is None or os.path.abspath(k[1]).startswith(stem)]
+            for k in stale:
+                self._drop(k)
+            return len(stale)
+
+    def _drop(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled":  self.enabled,
+                "entries":  len(self._entries),
+                "bytes":    self._bytes,
+                "hits":     self.hits,
+                "misses":   self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,116 @@
+# Server-Sent Events for JobManager jobs: one snapshot, then deltas; Last-Event-ID resume
+import os, json, time, threading
+from flask import Response, jsonify, request, stream_with_context
+from utils.jobs import FINISHED
+
+SSE_KEEPALIVE = 15.0     # seconds between keepalive comments on an idle stream
+# Each open stream holds a server thread for its whole life (gthread has no async
+# hand-off), so both kinds of long-lived connection are capped per worker process;
+# gunicorn.conf.py sizes the thread pool above the sum.  Past SSE_MAX clients poll
+# the status route; past WS_MAX the webcam page falls back to POST /detect/frame.
+SSE_MAX       = int(os.environ.get("YOLO_SSE_MAX", 8))
+WS_MAX        = int(os.environ.get("YOLO_WS_MAX", 4))
+_slots        = threading.BoundedSemaphore(SSE_MAX)
+ws_slots      = threading.BoundedSemaphore(WS_MAX)
+
+
+def job_stream(jobs, job_id: str | None, idle: dict | None = None) -> Response:
+    """
+    SSE response for one job.  The first message (event "snapshot") carries
+    the full state; each later one (event "delta") carries only what changed
+    — merged field updates, appended items (e.g. history epochs) and new log
+    lines.  Message ids are "<job_id>:<seq>", so a reconnecting EventSource
+    resumes from its Last-Event-ID instead of re-downloading everything.  A
+    job owned by another server process has no local event ring, so its
+    stream sends a fresh snapshot whenever the shared record changes.
+    With no job, a single `idle` snapshot is sent.
+    """
+    last = request.headers.get("Last-Event-ID") or request.args.get("last_event_id", "")
+    seq  = _resume_seq(job_id, last)
+    if not _slots.acquire(blocking=False):
+        resp = jsonify({"error": "Too many progress streams — poll the status endpoint"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "5"
+        return resp
+
+    def _gen():
+        nonlocal seq
+        if not job_id:
+            yield sse("snapshot", idle or {})
+            return
+        if not jobs.is_local(job_id):
+            yield from _poll_foreign(jobs, job_id)
+            return
+        if seq is None:
+            seq = yield from _snapshot(jobs, job_id)
+        while True:
+            got = jobs.events_since(job_id, seq, timeout=SSE_KEEPALIVE)
+            if got is None:                  # fell behind the event ring — resync
+                seq = yield from _snapshot(jobs, job_id)
+                continue
+            events, seq = got
+            if events:
+                yield sse("delta", _delta(events), f"{job_id}:{seq}")
+            else:
+                yield ": keepalive\n\n"
+            if not events and jobs.status(job_id) in FINISHED:
+                break
+
+    resp = Response(
+        stream_with_context(_gen()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    resp.call_on_close(_slots.release)
+    return resp
+
+
+def sse(event: str, data: dict, event_id: str | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def _snapshot(jobs, job_id: str):
+    snap = jobs.snapshot(job_id)
+    snap["log_tail"] = snap.pop("log")[-30:]
+    yield sse("snapshot", snap, f"{job_id}:{snap['seq']}")
+    return snap["seq"]
+
+
+def _poll_foreign(jobs, job_id: str):
+    last, idle = None, 0.0
+    while True:
+        snap = jobs.snapshot(job_id)
+        if snap["seq"] != last:
+            last, idle = snap["seq"], 0.0
+            snap["log_tail"] = snap.pop("log")[-30:]
+            yield sse("snapshot", snap)
+        elif idle >= SSE_KEEPALIVE:
+            idle = 0.0
+            yield ": keepalive\n\n"
+        if snap["status"] in FINISHED:
+            return
+        time.sleep(1.5)
+        idle += 1.5
+
+
+def _resume_seq(job_id: str | None, last_event_id: str) -> int | None:
+    """Sequence number to resume after, or None to start from a snapshot."""
+    jid, _, seq = last_event_id.rpartition(":")
+    if not job_id or jid != job_id or not seq.isdigit():
+        return None
+    return int(seq)
+
+
+def _delta(events: list) -> dict:
+    """Fold a run of job events into one message: field updates + appended items."""
+    out = {"set": {}, "log": []}
+    for _, kind, payload in events:
+        if kind == "set":
+            out["set"].update(payload)
+        elif kind == "log":
+            out["log"].append(payload)
+        elif kind == "append":
+            key, item = payload
+            out.setdefault(key, []).append(item)
+    return out
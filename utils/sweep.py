@@ -0,0 +1,371 @@
+# Hyperparameter sweeps: search-space expansion, successive-halving pruning, leaderboard
+import os, re, json, math, time, random, itertools, threading
+from utils.jobs import FINISHED, _pid_alive
+
+SWEEP_DIR  = os.environ.get("YOLO_SWEEP_DIR", "runs/sweeps")
+MAX_TRIALS = int(os.environ.get("YOLO_SWEEP_MAX_TRIALS", 64))
+ETA        = 3          # keep the top 1/ETA of trials at every rung
+MIN_EPOCHS = 3          # first rung — earlier mAP is mostly warm-up noise
+POLL_S     = 2.0        # how often the controller reads trial progress
+SEARCHES   = ("grid", "random")
+
+
+def expand_space(space: dict, search: str = "grid", n_trials: int | None = None,
+                 seed: int | None = None) -> list:
+    """
+    Search space → list of parameter dicts, one per trial.
+
+    Every value of `space` is either a list of choices or, for random search
+    only, a range {"min", "max", "log"} sampled uniformly (log-uniformly
+    with "log").  Grid search enumerates the full cross product, truncated
+    to `n_trials`; random search draws `n_trials` independent samples.
+    """
+    if search not in SEARCHES:
+        raise ValueError(f"search must be one of {', '.join(SEARCHES)}")
+    if not space:
+        raise ValueError("Search space is empty")
+    limit = min(MAX_TRIALS, n_trials or MAX_TRIALS)
+    keys  = list(space)
+    for k in keys:
+        v = space[k]
+        if isinstance(v, list):
+            if not v:
+                raise ValueError(f"{k}: no values to search")
+        elif isinstance(v, dict) and search == "random":
+            if not {"min", "max"} <= v.keys() or float(v["min"]) > float(v["max"]):
+                raise ValueError(f"{k}: a range needs min <= max")
+            if v.get("log") and float(v["min"]) <= 0:
+                raise ValueError(f"{k}: a log range needs min > 0")
+        else:
+            raise ValueError(f"{k}: expected a list of values"
+                             + (" or a {min, max} range" if search == "random" else ""))
+
+    if search == "grid":
+        combos = itertools.islice(itertools.product(*(space[k] for k in keys)), limit)
+        return [dict(zip(keys, combo)) for combo in combos]
+
+    rng = random.Random(seed)
+
+    def sample(v):
+        if isinstance(v, list):
+            return rng.choice(v)
+        lo, hi = float(v["min"]), float(v["max"])
+        if v.get("log"):
+            return round(math.exp(rng.uniform(math.log(lo), math.log(hi))), 6)
+        return round(rng.uniform(lo, hi), 6)
+
+    return [{k: sample(space[k]) for k in keys} for _ in range(limit)]
+
+
+def rungs(min_epochs: int, max_epochs: int, eta: int = ETA) -> list:
+    """Epochs at which trials are compared: min_epochs · eta^k, below max_epochs."""
+    out, r = [], max(1, min_epochs)
+    while r < max_epochs:
+        out.append(r)
+        r *= max(2, eta)
+    return out
+
+
+class SuccessiveHalving:
+    """
+    Asynchronous successive halving (ASHA) as an early-stopping rule.
+
+    When a trial reaches a rung its metric is recorded there and compared
+    with every trial that reached the same rung before it: once at least
+    `eta` results exist, a trial outside the top 1/eta is pruned.  No trial
+    waits for a rung to fill, so worker slots never idle — early arrivals are
+    judged against fewer peers, which only makes pruning more lenient.
+    """
+
+    def __init__(self, rung_epochs: list, eta: int = ETA):
+        self.rungs = list(rung_epochs)
+        self.eta   = max(2, eta)
+        self.seen  = {r: {} for r in self.rungs}    # rung → {trial: metric}
+
+    def report(self, trial: int, epoch: int, metric: float) -> bool:
+        """Record one epoch's metric; True when the trial should stop now."""
+        for r in self.rungs:
+            if epoch >= r and trial not in self.seen[r]:
+                self.seen[r][trial] = metric
+                if self._below_cutoff(r, metric):
+                    return True
+        return False
+
+    def _below_cutoff(self, rung: int, metric: float) -> bool:
+        vals = sorted(self.seen[rung].values(), reverse=True)
+        if len(vals) < self.eta:
+            return False
+        return metric < vals[max(1, len(vals) // self.eta) - 1]
+
+
+def _metric(v) -> float | None:
+    """A history value as a float — live epochs hold numbers, results.csv rows may hold strings."""
+    if isinstance(v, bool):
+        return None
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None                         # "—": no validation that epoch
+    return v if math.isfinite(v) else None
+
+
+class SweepManager:
+    """
+    Runs sweeps as sequences of ordinary training jobs.
+
+    `launch(sweep, params)` submits one trial and returns its job id; the
+    sweep's controller thread reads progress through `jobs.snapshot()`,
+    feeds each epoch's mAP50-95 to a SuccessiveHalving rule and stops losing
+    trials with `jobs.cancel()` (they finish the epoch they are in).  At most
+    `parallel` trials are queued or running at once so the epoch `budget` —
+    summed over every trial — is charged for work actually done; once it is
+    spent, running trials are stopped and no more are started.  When the
+    sweep ends, `promote(job_id)` is called with the leader's job.
+
+    State is mirrored to <store_dir>/<id>.json so any server process can
+    read it; a <id>.stop marker stops a sweep owned by another process.
+    """
+
+    def __init__(self, jobs, launch, promote=None, store_dir: str = SWEEP_DIR,
+                 on_finish=None):
+        self._jobs      = jobs
+        self._launch    = launch
+        self._promote   = promote
+        self._on_finish = on_finish
+        self._store     = store_dir
+        self._lock      = threading.Lock()
+        self._sweeps    = {}      # id → state dict (owned by this process)
+        self._stop      = {}      # id → threading.Event
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    def start(self, sweep_id: str, trials: list, epochs: int, budget: int | None = None,
+              eta: int = ETA, min_epochs: int = MIN_EPOCHS, parallel: int = 1,
+              promote: bool = True, extra: dict | None = None) -> dict:
+        rung_epochs = rungs(min(min_epochs, epochs), epochs, eta)
+        state = {
+            "id":          sweep_id,
+            "status":      "running",
+            "epochs":      epochs,
+            "budget":      budget or epochs * len(trials),
+            "used":        0,
+            "eta":         max(2, eta),
+            "rungs":       rung_epochs,
+            "parallel":    max(1, parallel),
+            "promote":     promote,
+            "promoted":    None,
+            "owner":       os.getpid(),
+            "created_at":  time.time(),
+            "finished_at": None,
+            "error":       None,
+            "ended_by":    None,      # complete | budget | stopped | error
+            "trials":      [{"trial": i, "params": p, "job_id": None, "status": "pending",
+                             "epochs": 0, "mAP50_95": None, "mAP50": None,
+                             "best_epoch": None, "pruned_at": None, "model_path": None}
+                            for i, p in enumerate(trials)],
+            **(extra or {}),
+        }
+        with self._lock:
+            self._sweeps[sweep_id] = state
+            self._stop[sweep_id]   = threading.Event()
+            self._persist(state)
+        threading.Thread(target=self._run, args=(sweep_id,), daemon=True).start()
+        return self.get(sweep_id)
+
+    def get(self, sweep_id: str) -> dict | None:
+        with self._lock:
+            state = self._sweeps.get(sweep_id)
+            if state is not None:
+                return self._view(state)
+        state = self._load(sweep_id)
+        return self._view(state) if state else None
+
+    def list_sweeps(self) -> list:
+        """Summaries (no per-trial rows), newest first — across all processes."""
+        with self._lock:
+            states = list(self._sweeps.values())
+            local  = set(self._sweeps)
+        if self._store and os.path.isdir(self._store):
+            ids     = {n[:-5] for n in os.listdir(self._store) if n.endswith(".json")}
+            states += [s for s in map(self._load, ids - local) if s]
+        out = []
+        for s in states:
+            view = self._view(s)
+            view.pop("trials")
+            view["n_trials"] = len(s["trials"])
+            out.append(view)
+        out.sort(key=lambda s: s["created_at"], reverse=True)
+        return out
+
+    def latest(self) -> str | None:
+        sweeps = self.list_sweeps()
+        return sweeps[0]["id"] if sweeps else None
+
+    def stop(self, sweep_id: str) -> bool:
+        with self._lock:
+            ev = self._stop.get(sweep_id)
+            if ev is not None:
+                if self._sweeps[sweep_id]["status"] != "running":
+                    return False
+                ev.set()
+                return True
+        state = self._load(sweep_id)
+        if state is None or state["status"] != "running":
+            return False
+        try:
+            with open(self._path(sweep_id, "stop"), "w"):
+                pass
+        except OSError:
+            return False
+        return True
+
+    # ── Controller ────────────────────────────────────────────────────────────
+
+    def _run(self, sweep_id: str):
+        state  = self._sweeps[sweep_id]
+        stop   = self._stop[sweep_id]
+        rule   = SuccessiveHalving(state["rungs"], state["eta"])
+        first  = state["rungs"][0] if state["rungs"] else state["epochs"]
+        ended  = None
+        try:
+            while True:
+                if self._stop_marker(sweep_id):
+                    stop.set()
+                with self._lock:
+                    for t in state["trials"]:
+                        if t["status"] in ("queued", "running"):
+                            self._poll_trial(t, rule)
+                    state["used"] = sum(t["epochs"] for t in state["trials"])
+                    active  = [t for t in state["trials"] if t["status"] in ("queued", "running")]
+                    pending = [t for t in state["trials"] if t["status"] == "pending"]
+                    if ended is None and stop.is_set():
+                        ended = "stopped"
+                    elif ended is None and state["used"] >= state["budget"] and (active or pending):
+                        ended = "budget"
+                    if ended:
+                        for t in active:
+                            self._jobs.cancel(t["job_id"])
+                        for t in pending:
+                            t["status"] = "skipped"
+                        pending = []
+                    committed = state["used"] + first * len(active)
+                    while pending and len(active) < state["parallel"]:
+                        if committed + first > state["budget"]:
+                            for t in pending:
+                                t["status"] = "skipped"
+                            pending = []
+                            break
+                        t = pending.pop(0)
+                        t["job_id"] = self._launch(state, t["params"])
+                        t["status"] = "queued"
+                        active.append(t)
+                        committed += first
+                    self._persist(state)
+                    if not active and not pending:
+                        break
+                time.sleep(POLL_S)
+            self._finish(state, "stopped" if ended == "stopped" else "done", reason=ended)
+        except Exception as exc:
+            with self._lock:
+                for t in state["trials"]:
+                    if t["status"] in ("queued", "running"):
+                        self._jobs.cancel(t["job_id"])
+            self._finish(state, "error", str(exc))
+
+    def _poll_trial(self, t: dict, rule: SuccessiveHalving):
+        """Fold a trial job's latest snapshot into its row and apply the pruning rule."""
+        snap = self._jobs.snapshot(t["job_id"])
+        if snap is None:
+            t["status"] = "error"
+            return
+        for row in snap.get("history") or []:
+            ep, m = row.get("epoch", 0), _metric(row.get("mAP50_95"))
+            if ep <= t["epochs"]:
+                continue
+            t["epochs"] = ep
+            if m is None:
+                continue
+            if t["mAP50_95"] is None or m > t["mAP50_95"]:
+                t.update(mAP50_95=m, mAP50=_metric(row.get("mAP50")), best_epoch=ep)
+            if t["pruned_at"] is None and snap["status"] == "running" and rule.report(t["trial"], ep, m):
+                t["pruned_at"] = ep
+                self._jobs.cancel(t["job_id"])
+        if snap["status"] in FINISHED:
+            t["model_path"] = snap.get("model_path")
+            t["status"]     = ("pruned" if t["pruned_at"] is not None and snap["status"] == "stopped"
+                               else snap["status"])
+            if snap.get("error"):
+                t["error"] = snap["error"]
+        else:
+            t["status"] = snap["status"]
+
+    def _finish(self, state: dict, status: str, error: str | None = None,
+                reason: str | None = None):
+        leader = next((t for t in _leaderboard(state["trials"]) if t["model_path"]), None)
+        if status != "error" and state["promote"] and leader and self._promote:
+            try:
+                self._promote(leader["job_id"])
+                state["promoted"] = leader["job_id"]
+            except Exception as exc:
+                error = f"Promotion failed: {exc}"
+        with self._lock:
+            state.update(status=status, error=error, finished_at=time.time(),
+                         ended_by=reason or ("error" if error else "complete"))
+            self._persist(state)
+        if self._on_finish:
+            self._on_finish(dict(state))
+
+    # ── Views & store ─────────────────────────────────────────────────────────
+
+    def _view(self, state: dict) -> dict:
+        view = json.loads(json.dumps(state))
+        view["leaderboard"] = [
+            {k: t[k] for k in ("trial", "job_id", "params", "status", "mAP50_95",
+                               "mAP50", "best_epoch", "epochs")}
+            for t in _leaderboard(state["trials"]) if t["mAP50_95"] is not None
+        ]
+        return view
+
+    def _path(self, sweep_id: str, ext: str) -> str:
+        return os.path.join(self._store, f"{sweep_id}.{ext}")
+
+    def _persist(self, state: dict):
+        """Mirror a sweep to the store; caller holds _lock."""
+        if not self._store:
+            return
+        path = self._path(state["id"], "json")
+        tmp  = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self._store, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(state, f, default=str)
+            os.replace(tmp, path)
+        except OSError as exc:
+            print(f"[sweep] could not persist {state['id']}: {exc}")
+
+    def _load(self, sweep_id: str) -> dict | None:
+        if not self._store or not re.fullmatch(r"[\w-]+", sweep_id or ""):
+            return None
+        try:
+            with open(self._path(sweep_id, "json")) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state["status"] == "running" and not _pid_alive(state.get("owner")):
+            state.update(status="error", error="Server process exited before the sweep finished")
+        return state
+
+    def _stop_marker(self, sweep_id: str) -> bool:
+        if not self._store:
+            return False
+        try:
+            os.remove(self._path(sweep_id, "stop"))
+        except OSError:
+            return False
+        return True
+
+
+def _leaderboard(trials: list) -> list:
+    """Trials by best validation mAP50-95, unscored ones last."""
+    return sorted(trials, key=lambda t: (t["mAP50_95"] is None, -(t["mAP50_95"] or 0.0), t["trial"]))
+
@@ -0,0 +1,107 @@
+# Sliced (tiled) inference for high-resolution images: tile → batched predict → merge
+import numpy as np
+from utils.tracking import iou_matrix
+
+TILE_OVERLAP = 0.2      # fraction of the tile shared with each neighbour
+MERGE_THR    = 0.5      # overlap above which two same-class boxes are one object
+MAX_TILES    = 256      # refuse grids larger than this (tiny tiles on huge images)
+METRICS      = ("ios", "iou")
+
+
+def tile_grid(h: int, w: int, tile: int, overlap: float = TILE_OVERLAP) -> np.ndarray:
+    """
+    (K, 4) xyxy tile windows covering an h × w image.  Neighbours overlap by
+    `overlap` × tile; the last row / column is shifted back to end exactly
+    at the border, so every tile is full size unless the image is smaller.
+    """
+    def starts(n):
+        if n <= tile:
+            return np.zeros(1, np.int64)
+        step = max(1, int(tile * (1 - overlap)))
+        s    = np.arange(0, n - tile, step)
+        return np.append(s, n - tile)
+
+    ys, xs = np.meshgrid(starts(h), starts(w), indexing="ij")
+    x0, y0 = xs.ravel(), ys.ravel()
+    return np.stack([x0, y0, np.minimum(x0 + tile, w), np.minimum(y0 + tile, h)], axis=1)
+
+
+def overlap_matrix(a: np.ndarray, b: np.ndarray, metric: str = "ios") -> np.ndarray:
+    """
+    Pairwise box overlap (N, M).  "ios" — intersection over the smaller box —
+    also matches an object with the truncated copy a tile border cut off,
+    which plain IoU would keep as a duplicate.
+    """
+    if metric == "iou":
+        return iou_matrix(a, b)
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    tl     = np.maximum(a[:, None, :2], b[None, :, :2])
+    br     = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter  = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / (np.minimum(area_a[:, None], area_b[None, :]) + 1e-9)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray,
+        thr: float = MERGE_THR, metric: str = "ios") -> np.ndarray:
+    """
+    Class-aware greedy NMS → indices to keep, highest score first.  The
+    overlap matrix is computed once; each kept box then suppresses its whole
+    row in one vector operation.
+    """
+    order = np.argsort(-scores, kind="stable")
+    ov    = overlap_matrix(boxes[order], boxes[order], metric)
+    ov[classes[order][:, None] != classes[order][None, :]] = 0.0
+    over  = ov > thr
+    dead  = np.zeros(len(order), dtype=bool)
+    keep  = []
+    for i in range(len(order)):
+        if not dead[i]:
+            keep.append(i)
+            dead |= over[i]
+    return order[np.asarray(keep, dtype=np.int64)]
+
+
+def sliced_predict(img: np.ndarray, detect_batch, tile: int, overlap: float = TILE_OVERLAP,
+                   batch: int = 8, full: bool = True, thr: float = MERGE_THR,
+                   metric: str = "ios"):
+    """
+    Detect on overlapping `tile` px windows of `img` and merge the results.
+
+    `detect_batch(list_of_images)` → [(xyxy, conf, cls, names)] runs up to
+    `batch` tiles per call (one forward pass each).  With `full`, the whole
+    image goes through as well so objects larger than a tile are still
+    found.  Boxes are shifted to image coordinates, then merged with
+    class-aware NMS across tiles.  Returns (xyxy, conf, cls, names, info).
+    """
+    h, w  = img.shape[:2]
+    grid  = tile_grid(h, w, tile, overlap)
+    if len(grid) > MAX_TILES:
+        raise ValueError(f"{len(grid)} tiles exceeds the limit of {MAX_TILES} — use a larger tile")
+    crops = [img[y0:y1, x0:x1] for x0, y0, x1, y1 in grid]
+    offs  = [(x0, y0) for x0, y0, _, _ in grid]
+    if full and len(grid) > 1:
+        crops.append(img)
+        offs.append((0, 0))
+
+    boxes, confs, clss, names, calls = [], [], [], {}, 0
+    for i in range(0, len(crops), max(1, batch)):
+        for (xyxy, conf, cls, names), (dx, dy) in zip(detect_batch(crops[i:i + batch]),
+                                                      offs[i:i + batch]):
+            boxes.append(xyxy + np.array([dx, dy, dx, dy], dtype=xyxy.dtype))
+            confs.append(conf)
+            clss.append(cls)
+        calls += 1
+
+    xyxy = np.concatenate(boxes).astype(np.float32) if boxes else np.zeros((0, 4), np.float32)
+    conf = np.concatenate(confs) if confs else np.zeros(0, np.float32)
+    cls  = np.concatenate(clss) if clss else np.zeros(0, np.int64)
+    raw  = len(xyxy)
+    if raw:
+        keep = nms(xyxy, conf, cls, thr, metric)
+        xyxy, conf, cls = xyxy[keep], conf[keep], cls[keep]
+    info = {"tiles": len(grid), "tile": tile, "overlap": overlap, "full_image": full and len(grid) > 1,
+            "forward_passes": calls, "raw_boxes": raw, "merged_boxes": len(xyxy)}
+    return xyxy, conf, cls, names, info
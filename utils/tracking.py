@@ -0,0 +1,197 @@
+# Multi-object tracking & temporal detector skipping for webcam streams
+import os, time, threading
+from collections import OrderedDict
+import numpy as np
+
+# Run the detector at least every k frames, or sooner when the frame has
+# changed by this much (mean absolute difference, 0–1) since the last run.
+TRACK_EVERY  = int(os.environ.get("YOLO_TRACK_EVERY", 5))
+TRACK_DIFF   = float(os.environ.get("YOLO_TRACK_DIFF", 0.06))
+SESSION_TTL  = float(os.environ.get("YOLO_TRACK_SESSION_TTL", 60))
+MAX_SESSIONS = int(os.environ.get("YOLO_TRACK_MAX_SESSIONS", 256))
+
+HIGH_CONF = 0.5     # ByteTrack: detections above this are associated first
+MATCH_IOU = 0.3
+MAX_AGE   = 30      # detector runs a lost track survives, for re-association
+THUMB_W   = 64      # width of the grey thumbnail the frame-change metric uses
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of xyxy boxes: (N, 4) × (M, 4) → (N, M)."""
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter  = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def _greedy_match(iou: np.ndarray, thr: float):
+    """Highest-IoU-first assignment → (pairs, unmatched rows, unmatched cols)."""
+    pairs, rows, cols = [], set(), set()
+    if iou.size:
+        for flat in np.argsort(-iou, axis=None):
+            r, c = divmod(int(flat), iou.shape[1])
+            if iou[r, c] < thr:
+                break
+            if r not in rows and c not in cols:
+                rows.add(r)
+                cols.add(c)
+                pairs.append((r, c))
+    return (pairs,
+            [r for r in range(iou.shape[0]) if r not in rows],
+            [c for c in range(iou.shape[1]) if c not in cols])
+
+
+class Tracker:
+    """
+    ByteTrack-style tracker with a constant-velocity motion model.
+
+    `update()` associates one frame's detections in two stages — confident
+    boxes against every track, then the low-confidence ones against the
+    tracks still unmatched, which keeps IDs alive through partial occlusion
+    — matching only within a class.  `predict()` advances every track along
+    its velocity for frames where the detector did not run.
+    """
+
+    def __init__(self, high: float = HIGH_CONF, match_iou: float = MATCH_IOU,
+                 max_age: int = MAX_AGE):
+        self.high      = high
+        self.match_iou = match_iou
+        self.max_age   = max_age
+        self.tracks    = []     # dicts: id, box, obs, vel, since, cls, conf, hits, misses
+        self._next_id  = 1
+
+    def predict(self):
+        for t in self.tracks:
+            t["box"]    = t["box"] + t["vel"]
+            t["since"] += 1
+
+    def update(self, boxes: np.ndarray, confs: np.ndarray, clss: np.ndarray) -> list:
+        self.predict()
+        tracks = self.tracks
+        tboxes = np.array([t["box"] for t in tracks], dtype=np.float32).reshape(-1, 4)
+        tcls   = np.array([t["cls"] for t in tracks], dtype=np.int64)
+
+        def associate(t_idx, d_idx):
+            iou = iou_matrix(tboxes[t_idx], boxes[d_idx])
+            iou[tcls[t_idx][:, None] != clss[d_idx][None, :]] = 0.0
+            pairs, ut, ud = _greedy_match(iou, self.match_iou)
+            return ([(t_idx[i], d_idx[j]) for i, j in pairs],
+                    t_idx[ut] if ut else t_idx[:0], d_idx[ud] if ud else d_idx[:0])
+
+        all_t     = np.arange(len(tracks))
+        hi, lo    = np.flatnonzero(confs >= self.high), np.flatnonzero(confs < self.high)
+        m1, ut, ud_hi = associate(all_t, hi)
+        m2, ut, _     = associate(ut, lo)
+
+        for ti, di in m1 + m2:
+            self._refresh(tracks[ti], boxes[di], confs[di], clss[di])
+        for ti in ut:
+            tracks[ti]["misses"] += 1
+        for di in ud_hi:
+            tracks.append(self._new(boxes[di], confs[di], clss[di]))
+        self.tracks = [t for t in tracks if t["misses"] <= self.max_age]
+        return self.visible()
+
+    def visible(self) -> list:
+        """Tracks matched on the latest detector run (propagated since)."""
+        return [t for t in self.tracks if t["misses"] == 0]
+
+    def _new(self, box, conf, cls) -> dict:
+        t = {"id": self._next_id, "box": box.astype(np.float32), "obs": box.astype(np.float32),
+             "vel": np.zeros(4, dtype=np.float32), "since": 0, "cls": int(cls),
+             "conf": float(conf), "hits": 1, "misses": 0}
+        self._next_id += 1
+        return t
+
+    def _refresh(self, t: dict, box, conf, cls):
+        vel = (box - t["obs"]) / max(1, t["since"])
+        t["vel"]    = vel if t["hits"] == 1 else 0.6 * vel + 0.4 * t["vel"]
+        t["box"]    = t["obs"] = box.astype(np.float32)
+        t["since"]  = 0
+        t["conf"]   = float(conf)
+        t["cls"]    = int(cls)
+        t["hits"]  += 1
+        t["misses"] = 0
+
+
+def _grey_thumb(arr: np.ndarray) -> np.ndarray:
+    step = max(1, arr.shape[1] // THUMB_W)
+    return arr[::step, ::step].mean(axis=2, dtype=np.float32)
+
+
+class TrackSession:
+    """Tracker plus the frame-change gate for one client stream."""
+
+    def __init__(self):
+        self.tracker   = Tracker()
+        self.names     = {}
+        self.lock      = threading.Lock()
+        self.last_seen = time.monotonic()
+        self._thumb    = None     # grey thumbnail of the last detector frame
+        self._since    = 0        # frames since the detector last ran
+
+    def step(self, arr: np.ndarray, detect, every: int = TRACK_EVERY,
+             diff: float = TRACK_DIFF):
+        """
+        Advance one frame.  `detect(arr)` → (xyxy, conf, cls, names) is only
+        called when `every` frames have passed or the frame changed by at
+        least `diff`; otherwise tracks are propagated.  Returns
+        (detections, detector_ran, motion).
+        """
+        with self.lock:
+            self.last_seen = time.monotonic()
+            thumb  = _grey_thumb(arr)
+            motion = 1.0
+            if self._thumb is not None and self._thumb.shape == thumb.shape:
+                motion = float(np.abs(thumb - self._thumb).mean() / 255.0)
+            ran = motion >= diff or self._since + 1 >= max(1, every)
+            if ran:
+                xyxy, conf, cls, names = detect(arr)
+                self.names  = names
+                self.tracker.update(xyxy.astype(np.float32), conf, cls.astype(np.int64))
+                self._thumb = thumb
+                self._since = 0
+            else:
+                self.tracker.predict()
+                self._since += 1
+            return self._detections(arr.shape), ran, round(motion, 4)
+
+    def _detections(self, shape) -> list:
+        h, w = shape[:2]
+        out  = []
+        for t in self.tracker.visible():
+            x1, y1, x2, y2 = np.clip(t["box"], 0, [w, h, w, h]).round(1).tolist()
+            out.append({"class": self.names.get(t["cls"], str(t["cls"])),
+                        "conf": round(t["conf"], 3), "bbox": [x1, y1, x2, y2],
+                        "track_id": t["id"]})
+        return out
+
+
+class SessionStore:
+    """TrackSessions keyed by client session id; idle ones expire, oldest evicted first."""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS):
+        self.ttl      = ttl
+        self.max      = max(1, max_sessions)
+        self._lock    = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, session_id: str) -> TrackSession:
+        with self._lock:
+            now     = time.monotonic()
+            session = self._entries.pop(session_id, None) or TrackSession()
+            # Least recently used first: drop expired sessions and any overflow
+            while self._entries:
+                oldest = next(iter(self._entries.values()))
+                if now - oldest.last_seen <= self.ttl and len(self._entries) < self.max:
+                    break
+                self._entries.popitem(last=False)
+            self._entries[session_id] = session
+            return session
+
+    def __len__(self) -> int:
+        return len(self._entries)
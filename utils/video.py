@@ -0,0 +1,240 @@
+# Offline video / stream detection: decode → sample → batched predict → write
+import os, json, time, queue, socket, ipaddress, threading
+from urllib.parse import urlsplit
+
+VIDEO_EXTS      = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v", ".mpg", ".mpeg")
+STREAM_PREFIXES = ("rtsp://", "rtmp://", "http://", "https://")
+# Stream URLs are opened by the server, so they are restricted: schemes allowed, and hosts
+# (comma-separated; "host", "host:port" or ".example.com" for a domain and its subdomains)
+# that may be reached even on a private address.  Other hosts must resolve to public IPs.
+STREAM_SCHEMES  = {s.strip().lower() for s in
+                   os.environ.get("YOLO_STREAM_SCHEMES", "rtsp,rtmp,http,https").split(",") if s.strip()}
+STREAM_HOSTS    = [h.strip().lower() for h in os.environ.get("YOLO_STREAM_HOSTS", "").split(",")
+                   if h.strip()]
+STREAM_PUBLIC   = os.environ.get("YOLO_STREAM_PUBLIC", "1") == "1"   # 0 = allowlisted hosts only
+QUEUE_FRAMES    = 32         # frames buffered between each pair of stages
+
+_DONE = object()
+
+
+def is_stream_url(source: str) -> bool:
+    return source.lower().startswith(STREAM_PREFIXES)
+
+
+def _host_allowed(host: str, port: int | None) -> bool:
+    for entry in STREAM_HOSTS:
+        if entry.startswith("."):
+            if host == entry[1:] or host.endswith(entry):
+                return True
+        elif entry in (host, f"{host}:{port}"):
+            return True
+    return False
+
+
+def check_stream_url(url: str):
+    """
+    Refuse stream URLs the server should not open on a client's behalf.
+
+    Raises ValueError for a malformed URL or a scheme outside
+    STREAM_SCHEMES, PermissionError for a host that is neither in
+    STREAM_HOSTS nor (with STREAM_PUBLIC) resolving only to public
+    addresses — loopback, private, link-local (cloud metadata) and
+    reserved ranges are rejected.  The decoder resolves the name again,
+    so an allowlist is the only guard against DNS rebinding.
+    """
+    try:
+        parts = urlsplit(url)
+        host  = (parts.hostname or "").lower()
+        port  = parts.port
+    except ValueError as exc:
+        raise ValueError(f"Invalid url: {exc}") from None
+    if parts.scheme.lower() not in STREAM_SCHEMES or not is_stream_url(url):
+        raise ValueError(f"url scheme must be one of {', '.join(sorted(STREAM_SCHEMES))}")
+    if not host:
+        raise ValueError("url has no host")
+    if _host_allowed(host, port):
+        return
+    if not STREAM_PUBLIC:
+        raise PermissionError(f"{host} is not in the stream host allowlist (YOLO_STREAM_HOSTS)")
+    try:
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as exc:
+        raise ValueError(f"Cannot resolve {host}: {exc}") from None
+    for info in infos:
+        addr = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not addr.is_global or addr.is_multicast:
+            raise PermissionError(f"{host} resolves to a non-public address ({addr}); "
+                                  "add it to YOLO_STREAM_HOSTS to allow it")
+
+
+def _put(q: queue.Queue, item, stop: threading.Event):
+    """Blocking put that gives up once the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def process_video(source: str, out_dir: str, predict, summarize, stride: int = 1,
+                  batch: int = 8, annotate: bool = False, max_frames: int = 0,
+                  on_progress=None, cancel=None) -> dict:
+    """
+    Run a video file or stream URL through the detector.
+
+    Three stages connected by bounded queues, so a slow stage back-pressures
+    the others instead of buffering the whole video:
+
+      decode thread  — reads frames, keeping every `stride`-th (the skipped
+                       ones are only grabbed, never decoded to pixels)
+      caller thread  — groups sampled frames into batches of up to `batch`
+                       and calls `predict(list_of_bgr_frames) → results`
+      writer thread  — appends `summarize(result)` per frame to
+                       detections.jsonl and, if `annotate`, the plotted frame
+                       to annotated.mp4
+
+    `on_progress(**fields)` is called about twice a second; `cancel` is an
+    Event checked between batches.  Returns a summary dict.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video source: {source}")
+    src_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    total   = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)   # 0 for live streams
+    stride  = max(1, int(stride))
+    batch   = max(1, int(batch))
+    expect  = -(-total // stride) if total > 0 else 0
+    if max_frames:
+        expect = min(expect, max_frames) if expect else max_frames
+
+    os.makedirs(out_dir, exist_ok=True)
+    jsonl_path = os.path.join(out_dir, "detections.jsonl")
+    mp4_path   = os.path.join(out_dir, "annotated.mp4") if annotate else None
+
+    frames_q  = queue.Queue(QUEUE_FRAMES)
+    results_q = queue.Queue(QUEUE_FRAMES)
+    stop      = threading.Event()
+    errors    = []
+    counts    = {"decoded": 0, "written": 0}
+    report    = on_progress or (lambda **kw: None)
+    report(total_frames=expect or None, src_fps=round(src_fps, 2), stride=stride)
+
+    def _decode():
+        idx = sampled = 0
+        try:
+            while not stop.is_set():
+                if idx % stride:
+                    ok = cap.grab()
+                else:
+                    ok, frame = cap.read()
+                    if ok:
+                        if not _put(frames_q, (idx, frame), stop):
+                            break
+                        sampled += 1
+                if not ok or (max_frames and sampled >= max_frames):
+                    break
+                idx += 1
+        except Exception as exc:
+            errors.append(exc)
+            stop.set()
+        finally:
+            counts["decoded"] = idx
+            cap.release()
+            _put(frames_q, _DONE, stop)
+
+    def _write():
+        writer, last = None, 0.0
+        t0 = time.perf_counter()
+        try:
+            with open(jsonl_path, "w") as f:
+                while True:
+                    item = results_q.get()
+                    if item is _DONE:
+                        break
+                    idx, frame, result = item
+                    row = {"frame": idx, "t": round(idx / src_fps, 3), **summarize(result)}
+                    f.write(json.dumps(row, separators=(",", ":")) + "\n")
+                    if mp4_path:
+                        plotted = result.plot()
+                        if writer is None:
+                            writer = _open_writer(mp4_path, src_fps / stride, plotted.shape)
+                        writer.write(plotted)
+                    counts["written"] += 1
+                    now = time.perf_counter()
+                    if now - last >= 0.5:
+                        last = now
+                        report(frames=counts["written"], frame_index=idx,
+                               fps=round(counts["written"] / (now - t0), 2))
+        except Exception as exc:
+            errors.append(exc)
+            stop.set()
+            # keep draining so the predict stage never blocks on a dead writer
+            while results_q.get() is not _DONE:
+                pass
+        finally:
+            if writer is not None:
+                writer.release()
+
+    decoder = threading.Thread(target=_decode, name="video-decode", daemon=True)
+    writer  = threading.Thread(target=_write,  name="video-write",  daemon=True)
+    decoder.start()
+    writer.start()
+
+    t0, done = time.perf_counter(), False
+    try:
+        while not done and not stop.is_set():
+            try:
+                item = frames_q.get(timeout=0.2)
+            except queue.Empty:
+                continue                  # re-check stop (decoder may have failed)
+            if item is _DONE:
+                break
+            items = [item]
+            while len(items) < batch:
+                try:
+                    nxt = frames_q.get(timeout=0.05)
+                except queue.Empty:
+                    break
+                if nxt is _DONE:
+                    done = True
+                    break
+                items.append(nxt)
+            results = predict([frame for _, frame in items])
+            for (idx, frame), res in zip(items, results):
+                results_q.put((idx, frame, res))
+            if cancel is not None and cancel.is_set():
+                break
+    finally:
+        stop.set()                    # stops the decoder if we left early
+        results_q.put(_DONE)
+        writer.join()
+        decoder.join(timeout=5)
+
+    if errors:
+        raise errors[0]
+    elapsed = time.perf_counter() - t0
+    summary = {
+        "frames":         counts["written"],
+        "frames_decoded": counts["decoded"],
+        "elapsed_s":      round(elapsed, 2),
+        "fps":            round(counts["written"] / elapsed, 2) if elapsed else None,
+        "outputs":        {"detections": jsonl_path, "video": mp4_path},
+    }
+    report(**summary)
+    return summary
+
+
+def _open_writer(path: str, fps: float, shape):
+    """H.264 when this OpenCV build can encode it (plays in browsers), else MPEG-4 Part 2."""
+    import cv2
+    h, w = shape[:2]
+    for codec in ("avc1", "mp4v"):
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), max(1.0, fps), (w, h))
+        if writer.isOpened():
+            return writer
+        writer.release()
+    raise RuntimeError("No MP4 encoder available in this OpenCV build")
@@ -0,0 +1,5 @@
+# Production entry point — gunicorn -c gunicorn.conf.py wsgi:app
+from app import create_app
+
+# Warmup runs per worker after fork (see gunicorn.conf.py), never in the master
+app = create_app(warmup=False)